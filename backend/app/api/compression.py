@@ -0,0 +1,150 @@
+import asyncio
+import gzip
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import brotli
+import zstandard
+from starlette.concurrency import run_in_threadpool
+
+# A response body, a memoryview when it points into a buffer shared with the calculation
+Body = Union[bytes, memoryview]
+
+# Content codings we can serve, in order of preference when the client accepts several
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    "br": lambda body: brotli.compress(body, quality=5),
+    "zstd": lambda body: zstandard.ZstdCompressor(level=10).compress(body),
+    "gzip": lambda body: gzip.compress(body, compresslevel=6),
+}
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """
+    Pick the content coding for a response from the request's Accept-Encoding header.
+
+    Args:
+        accept_encoding: The Accept-Encoding header, if any
+
+    Returns:
+        One of the COMPRESSORS keys, or "identity"
+    """
+    if not accept_encoding:
+        return "identity"
+
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+
+    for coding in COMPRESSORS:
+        if coding in accepted or "*" in accepted:
+            return coding
+    return "identity"
+
+
+async def encode_body(body: Body, encoding: str) -> Body:
+    """
+    Compress a body in the given content coding.
+
+    Args:
+        body: The uncompressed body
+        encoding: "identity" or one of the COMPRESSORS keys
+
+    Returns:
+        The encoded body, `body` itself for "identity"
+    """
+    if encoding == "identity":
+        return body
+    # compressing a large body takes a while, keep it off the event loop
+    return await run_in_threadpool(COMPRESSORS[encoding], body)
+
+
+class PayloadCache:
+    """
+    Keeps the encoded response bodies for the latest version, so a body is compressed once per version
+    instead of once per request.
+    """
+
+    def __init__(self):
+        self._version: Optional[int] = None
+        self._bodies: Dict[Tuple[str, str], Body] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    async def get(self, version: int, encoding: str, build: Callable[[], Body], representation: str = "json") -> Body:
+        """
+        Get the body for `version` in the given content coding.
+
+        Args:
+            version: Version of the payload, older versions are dropped when it changes
+            encoding: "identity" or one of the COMPRESSORS keys
+            build: Builds the uncompressed body, only called once per version and representation
+            representation: Format of the body, each one is cached separately
+
+        Returns:
+            The encoded body
+        """
+        if self._version is not None and version < self._version:
+            # a request still holding an older version, don't evict the newer bodies for it
+            return await encode_body(build(), encoding)
+        if version != self._version:
+            self._version = version
+            self._bodies = {}
+
+        bodies = self._bodies  # stays the dict of this version even if a newer one arrives meanwhile
+        body = bodies.get((representation, encoding))
+        if body is not None:
+            return body
+
+        lock = self._locks.setdefault((representation, encoding), asyncio.Lock())
+        async with lock:
+            # another request may have encoded it while we waited
+            body = bodies.get((representation, encoding))
+            if body is None:
+                identity = bodies.get((representation, "identity"))
+                if identity is None:
+                    identity = bodies[(representation, "identity")] = build()
+                body = bodies[(representation, encoding)] = await encode_body(identity, encoding)
+            return body
+
+
+def make_etag(version: int, encoding: str, representation: str = "json") -> str:
+    """Strong ETag for a version, each format and content coding is a different representation."""
+    parts = [str(version)]
+    if representation != "json":
+        parts.append(representation)
+    if encoding != "identity":
+        parts.append(encoding)
+    return '"' + "-".join(parts) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against the ETag of the representation about to be sent.
+
+    Args:
+        if_none_match: The If-None-Match header, "*" or a comma-separated list of tags, if any
+        etag: The ETag from make_etag, a tag of another format or content coding doesn't match
+
+    Returns:
+        True if the client already has this representation
+    """
+    if not if_none_match:
+        return False
+
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]  # If-None-Match uses the weak comparison
+        if tag == etag:
+            return True
+    return False
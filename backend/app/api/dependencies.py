@@ -1,27 +1,130 @@
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+from app.api.compression import PayloadCache
 from app.config import settings
-from app.libs.pi_calculator import PiCalculator
+from app.libs.calculator_registry import create_calculator
+from app.libs.split_checkpoint import SplitCheckpoint
+from app.repositories.async_redis_repository import AsyncRedisRepository
 from app.repositories.redis_repository import RedisRepository
+from app.repositories.reference_repository import ReferenceRepository
+from app.repositories.shared_buffer_repository import SharedBufferRepository
+from app.repositories.split_job_repository import SplitJobRepository
+from app.services.hex_digit_service import HexDigitService
+from app.services.leader_election import LeaderElection
+from app.services.memory_budget import MemoryBudget
 from app.services.pi_service import PiService
+from app.services.pi_verifier import PiVerifier
+from app.services.precision_scheduler import PrecisionScheduler
+from app.services.split_coordinator import SplitCoordinator
 
 
 # Singleton instances and their getters
 limiter = Limiter(key_func=get_remote_address, default_limits=[f"{settings.RATE_LIMIT_CALLS}/{settings.RATE_LIMIT_PERIOD}"])
 
-redis_repository = RedisRepository(settings.REDIS_URL)
+redis_repository = RedisRepository(settings.REDIS_URL, encoding=settings.PI_STORAGE_ENCODING)
 def get_redis_repository():
     """Get the Redis repository instance."""
     return redis_repository
 
-pi_calculator = PiCalculator()
+async_redis_repository = AsyncRedisRepository(
+    settings.REDIS_URL,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    pool_timeout=settings.REDIS_POOL_TIMEOUT,
+    encoding=settings.PI_STORAGE_ENCODING,
+)
+def get_async_redis_repository():
+    """Get the async Redis repository instance."""
+    return async_redis_repository
+
+shared_buffer_repository = (
+    SharedBufferRepository(settings.PI_SHARED_BUFFER_PATH, settings.MAX_DECIMAL_POINTS)
+    if settings.PI_SHARED_BUFFER_PATH else None
+)
+def get_shared_buffer_repository():
+    """Get the shared buffer repository instance, None when the hand-off is disabled."""
+    return shared_buffer_repository
+
+reference_repository = ReferenceRepository(settings.PI_REFERENCE_FILE) if settings.PI_REFERENCE_FILE else None
+def get_reference_repository():
+    """Get the reference file repository instance, None when there is no reference file."""
+    return reference_repository
+
+pi_verifier = PiVerifier(get_reference_repository()) if settings.PI_VERIFICATION_ENABLED else None
+def get_pi_verifier():
+    """Get the Pi verifier instance, None when verification is disabled."""
+    return pi_verifier
+
+split_job_repository = SplitJobRepository(settings.REDIS_URL, job_timeout=settings.PI_SPLIT_JOB_TIMEOUT)
+def get_split_job_repository():
+    """Get the distributed split job repository instance."""
+    return split_job_repository
+
+split_coordinator = (
+    SplitCoordinator(
+        get_split_job_repository(),
+        leaf_terms=settings.PI_SPLIT_LEAF_TERMS,
+        min_terms=settings.PI_SPLIT_MIN_TERMS,
+    )
+    if settings.PI_SPLIT_MODE == "distributed" else None
+)
+def get_split_coordinator():
+    """Get the distributed split coordinator instance, None when the split runs locally."""
+    return split_coordinator
+
+split_checkpoint = (
+    SplitCheckpoint(
+        settings.PI_CHECKPOINT_DIR,
+        interval=settings.PI_CHECKPOINT_INTERVAL,
+        out_of_core_bytes=settings.PI_OUT_OF_CORE_MERGE_BYTES,
+    )
+    if settings.PI_CHECKPOINT_DIR else None
+)
+def get_split_checkpoint():
+    """Get the binary split checkpoint instance, None when checkpointing is disabled."""
+    return split_checkpoint
+
+calculator_name = settings.PI_CALCULATOR
+if calculator_name == "chudnovsky" and settings.PI_CALCULATOR_BACKEND == "integer":
+    calculator_name = "chudnovsky-integer"
+pi_calculator = create_calculator(
+    calculator_name,
+    workers=settings.PI_WORKERS,
+    crossovers=settings.PI_AUTO_CROSSOVERS,
+    split=split_coordinator.binary_split if split_coordinator else None,
+    checkpoint=get_split_checkpoint(),
+)
 def get_pi_calculator():
     """Get the Pi calculator instance."""
     return pi_calculator
 
 
-pi_service = PiService(get_pi_calculator(), get_redis_repository())
+precision_scheduler = PrecisionScheduler(
+    settings.PI_PRECISION_SCHEDULE,
+    settings.MAX_DECIMAL_POINTS,
+    step=settings.PI_PRECISION_STEP,
+    growth=settings.PI_PRECISION_GROWTH,
+    time_budget=settings.PI_STEP_TIME_BUDGET,
+)
+def get_precision_scheduler():
+    """Get the precision scheduler instance."""
+    return precision_scheduler
+
+memory_budget = MemoryBudget(settings.PI_MEMORY_BUDGET_BYTES, sample_interval=settings.PI_MEMORY_SAMPLE_INTERVAL)
+def get_memory_budget():
+    """Get the memory budget instance."""
+    return memory_budget
+
+pi_service = PiService(
+    get_pi_calculator(),
+    get_redis_repository(),
+    get_async_redis_repository(),
+    get_shared_buffer_repository(),
+    get_reference_repository(),
+    get_pi_verifier(),
+    get_precision_scheduler(),
+    get_memory_budget(),
+)
 def get_pi_service():
     """
     Get the Pi service instance.
@@ -29,4 +132,21 @@ def get_pi_service():
     Returns:
         PiService instance
     """
-    return pi_service 
\ No newline at end of file
+    return pi_service
+
+leader_election = LeaderElection(get_pi_service(), get_redis_repository(), lease_ttl=settings.LEADER_LEASE_TTL)
+def get_leader_election():
+    """Get the leader election instance."""
+    return leader_election
+
+hex_digit_service = HexDigitService(
+    workers=settings.PI_HEX_WORKERS, max_pending_blocks=settings.PI_HEX_MAX_PENDING_BLOCKS
+)
+def get_hex_digit_service():
+    """Get the hexadecimal digit service instance."""
+    return hex_digit_service
+
+pi_payload_cache = PayloadCache()
+def get_pi_payload_cache():
+    """Get the cache of encoded /api/pi response bodies."""
+    return pi_payload_cache
@@ -0,0 +1,52 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import REQUEST_SECONDS, RESPONSE_SIZE_BYTES
+
+# routes whose responses stay open, their duration says nothing about the serving latency
+UNTIMED_ROUTES = {"/api/pi/stream", "/metrics"}
+
+
+class RequestMetricsMiddleware:
+    """
+    Records the duration and body size of every API response.
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware, so the bodies aren't buffered or copied:
+    it only sums the lengths of the messages as they are sent. Requests are labelled by route
+    template, not path, to keep the label values bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        encoding = "identity"
+        size = 0
+
+        async def send_wrapper(message: Message):
+            nonlocal status, encoding, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-encoding":
+                        encoding = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # the router sets the matched route on the scope, unmatched paths share one label
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            if path not in UNTIMED_ROUTES:
+                REQUEST_SECONDS.labels(path, scope["method"], str(status)).observe(time.perf_counter() - started)
+                RESPONSE_SIZE_BYTES.labels(path, encoding).observe(size)
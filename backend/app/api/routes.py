@@ -1,8 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+import math
+from typing import AsyncIterator, Literal, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from app.api.auth_guard import verify_api_key
-from app.api.dependencies import get_pi_service
+from app.api.compression import PayloadCache, encode_body, etag_matches, make_etag, negotiate_encoding
+from app.api.dependencies import get_hex_digit_service, get_pi_payload_cache, get_pi_service
+from app.config import settings
+from app.libs.digit_codec import pack_digits
+from app.services.hex_digit_service import HexDigitService, HexDigitServiceBusy
 from app.services.pi_service import PiService
 
 class PiResponse(BaseModel):
@@ -11,23 +21,86 @@ class PiResponse(BaseModel):
     dp: str
 
 
+class PiPendingResponse(BaseModel):
+    """Response model for an on-demand precision that is still being calculated."""
+    dp: str  # requested decimal places
+    status: Literal["calculating", "queued"]
+    available_dp: str  # decimal places that can be requested right away
+    elapsed: float  # seconds the running calculation has taken so far
+
+
+class PiDigitsResponse(BaseModel):
+    """Response model for a window of Pi digits."""
+    digits: str
+    start: int
+    dp: str
+
+
+class PiHexResponse(BaseModel):
+    """Response model for hexadecimal digits of Pi."""
+    digits: str
+    start: int
+
+
+# media types of the raw /api/pi formats, their bodies skip the model and JSON encoding
+RAW_MEDIA_TYPES = {
+    "text": "text/plain; charset=us-ascii",
+    "packed": "application/octet-stream",
+}
+
+
+# seconds between keep-alive comments on an idle digits stream
+STREAM_KEEPALIVE_SECONDS = 15
+
+
 router = APIRouter(prefix="/api", dependencies=[Depends(verify_api_key)])
 
-@router.get("/pi", response_model=PiResponse)
-async def get_pi(pi_service: PiService = Depends(get_pi_service)):
+@router.get("/pi", response_model=PiResponse, responses={202: {"model": PiPendingResponse}})
+async def get_pi(
+    request: Request,
+    format: Literal["json", "text", "packed"] = Query("json", description="Response body format"),
+    dp: Optional[int] = Query(None, ge=1, le=min(settings.PI_ON_DEMAND_MAX_DECIMAL_PLACES, settings.MAX_DECIMAL_POINTS),
+                              description="Decimal places to return, calculated on demand if needed"),
+    pi_service: PiService = Depends(get_pi_service),
+    payload_cache: PayloadCache = Depends(get_pi_payload_cache),
+):
     """
     Get the current Pi value with its decimal places.
     
+    The ETag changes with the decimal places, so clients can poll with If-None-Match and get a 304
+    until a new value is published. The body is compressed according to Accept-Encoding.
+    
+    Besides the default JSON body, `format=text` returns the value as stored ("3.14159...") and
+    `format=packed` returns the decimal places as 4-bit BCD (see app.libs.digit_codec). Both carry
+    the decimal places in the X-Pi-Decimal-Places header.
+    
+    With `dp`, Pi is returned to exactly that many decimal places. Beyond the published value they are
+    calculated on demand, once for all the requests asking for them. If that takes longer than
+    PI_ON_DEMAND_TIMEOUT the response is 202 with the progress, poll again after Retry-After.
+    
     Args:
+        request: The incoming request, for the conditional and encoding headers
+        format: "json", "text" or "packed"
+        dp: Decimal places to return, or None for the current value
         pi_service: Pi service instance
+        payload_cache: Cache of the encoded response bodies
     
     Returns:
-        PiResponse which containing Pi value and decimal places
+        PiResponse which containing Pi value and decimal places, or the raw body for the other formats
     
     Raises:
         HTTPException: If Pi value is not available
     """
-    pi_value, decimal_places = pi_service.get_current_pi()
+    if dp is not None:
+        return await _get_pi_on_demand(request, format, dp, pi_service)
+    
+    if format == "json":
+        pi_value, decimal_places = await pi_service.get_current_pi()
+        build = lambda: PiResponse(pi=pi_value, dp=str(decimal_places)).model_dump_json().encode("utf-8")
+    else:
+        # the stored bytes go out as they are, without decoding or copying them
+        pi_value, decimal_places = await pi_service.get_current_pi_bytes()
+        build = (lambda: pi_value) if format == "text" else (lambda: pack_digits(pi_value[2:]))
     
     if pi_value is None or decimal_places is None:
         raise HTTPException(
@@ -35,4 +108,226 @@ async def get_pi(pi_service: PiService = Depends(get_pi_service)):
             detail="Pi value not available. Calculation in progress."
         )
     
-    return PiResponse(pi=pi_value, dp=str(decimal_places)) 
\ No newline at end of file
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": make_etag(decimal_places, encoding, format),
+        "Cache-Control": "no-cache",  # may be stored, but must be revalidated
+        "Vary": "Accept-Encoding",
+    }
+    if format != "json":
+        headers["X-Pi-Decimal-Places"] = str(decimal_places)
+    
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    body = await payload_cache.get(decimal_places, encoding, build, format)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    
+    return Response(content=body, media_type=RAW_MEDIA_TYPES.get(format, "application/json"), headers=headers)
+
+async def _get_pi_on_demand(request: Request, format: str, dp: int, pi_service: PiService) -> Response:
+    """Pi to `dp` decimal places, or 202 with the progress of its calculation."""
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": make_etag(dp, encoding, format),
+        "Cache-Control": "public, max-age=31536000, immutable",  # the digits up to dp never change
+        "Vary": "Accept-Encoding",
+    }
+    if format != "json":
+        headers["X-Pi-Decimal-Places"] = str(dp)
+    
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    pi_value = await pi_service.get_pi_on_demand(dp, settings.PI_ON_DEMAND_TIMEOUT)
+    if pi_value is None:
+        progress = pi_service.get_on_demand_progress(dp)
+        return JSONResponse(
+            status_code=202,
+            content=PiPendingResponse(
+                dp=str(dp), status=progress.status, available_dp=str(progress.available_dp), elapsed=progress.elapsed,
+            ).model_dump(),
+            headers={"Retry-After": str(math.ceil(settings.PI_ON_DEMAND_TIMEOUT))},
+        )
+    
+    if format == "json":
+        body = PiResponse(pi=pi_value, dp=str(dp)).model_dump_json().encode("utf-8")
+    elif format == "text":
+        body = pi_value.encode("ascii")
+    else:
+        body = pack_digits(pi_value[2:])
+    
+    body = await encode_body(body, encoding)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    
+    return Response(content=body, media_type=RAW_MEDIA_TYPES.get(format, "application/json"), headers=headers)
+
+@router.get("/pi/digits", response_model=PiDigitsResponse)
+async def get_pi_digits(
+    start: Optional[int] = Query(None, ge=1, description="First decimal place to return, omit for the last `length` digits"),
+    length: int = Query(100, ge=1, le=settings.MAX_DIGITS_RANGE_LENGTH),
+    format: Literal["json", "packed"] = Query("json", description="Response body format"),
+    pi_service: PiService = Depends(get_pi_service),
+):
+    """
+    Get a window of Pi digits without transferring the whole value.
+    
+    With `format=packed` the body is the digits as 4-bit BCD (see app.libs.digit_codec), with the
+    decimal place of the first one and the current decimal places in the X-Pi-Start and
+    X-Pi-Decimal-Places headers.
+    
+    Args:
+        start: First decimal place to return (1-based), or None for the last `length` digits
+        length: Number of digits to return
+        format: "json" or "packed"
+        pi_service: Pi service instance
+    
+    Returns:
+        PiDigitsResponse which containing the digits, the decimal place of the first one and the current decimal places,
+        or the packed digits. The digits are shorter than `length` when the window goes past the current decimal places.
+    
+    Raises:
+        HTTPException: If Pi value is not available
+    """
+    digits, decimal_places = await pi_service.get_pi_digits(start, length)
+    
+    if digits is None or decimal_places is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Pi value not available. Calculation in progress."
+        )
+    
+    if start is None:
+        start = decimal_places - len(digits) + 1
+    
+    if format == "packed":
+        return Response(
+            content=pack_digits(digits),
+            media_type=RAW_MEDIA_TYPES["packed"],
+            headers={"X-Pi-Start": str(start), "X-Pi-Decimal-Places": str(decimal_places)},
+        )
+    
+    return PiDigitsResponse(digits=digits, start=start, dp=str(decimal_places))
+
+
+@router.get("/pi/hex/{n}", response_model=PiHexResponse)
+async def get_pi_hex_digits(
+    n: int = Path(..., ge=1, le=settings.MAX_HEX_POSITION, description="Hexadecimal place of the first digit"),
+    length: int = Query(8, ge=1, le=settings.MAX_HEX_DIGITS_LENGTH),
+    hex_digit_service: HexDigitService = Depends(get_hex_digit_service),
+):
+    """
+    Get hexadecimal digits of Pi from any position, without the digits before it.
+    
+    The digits are extracted with the Bailey-Borwein-Plouffe formula, so positions far beyond the
+    calculated decimal places are available (pi = 3.243f6a88..., n=1 starts at "2").
+    
+    Args:
+        n: Hexadecimal place of the first digit (1-based)
+        length: Number of digits to return
+        hex_digit_service: Hexadecimal digit service instance
+    
+    Returns:
+        PiHexResponse which containing the digits and the position of the first one
+    
+    Raises:
+        HTTPException: If too many digits are being extracted already
+    """
+    try:
+        digits = await hex_digit_service.get_hex_digits(n, length)
+    except HexDigitServiceBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many hexadecimal digit extractions in progress, try again later.",
+            headers={"Retry-After": "1"},
+        )
+    return PiHexResponse(digits=digits, start=n)
+
+
+def _digits_event(start: int, digits: str, decimal_places: int) -> str:
+    """Format new digits as a server-sent event, the id is the decimal places reached."""
+    data = json.dumps({"start": start, "digits": digits, "dp": str(decimal_places)})
+    return f"id: {decimal_places}\nevent: digits\ndata: {data}\n\n"
+
+
+async def _missing_digits(pi_service: PiService, sent_dp: int, decimal_places: int) -> AsyncIterator[Tuple[str, int]]:
+    """
+    Events for the decimal places after `sent_dp` up to `decimal_places`, in windows of the max range length.
+    
+    Yields:
+        Tuple of (event, decimal places sent so far)
+    """
+    while sent_dp < decimal_places:
+        length = min(decimal_places - sent_dp, settings.MAX_DIGITS_RANGE_LENGTH)
+        digits, _ = await pi_service.get_pi_digits(sent_dp + 1, length)
+        if not digits:
+            return
+        yield _digits_event(sent_dp + 1, digits, sent_dp + len(digits)), sent_dp + len(digits)
+        sent_dp += len(digits)
+
+
+@router.get("/pi/stream")
+async def stream_pi_digits(
+    dp: int = Query(0, ge=0, description="Decimal places the client already has"),
+    last_event_id: Optional[str] = Header(None),
+    pi_service: PiService = Depends(get_pi_service),
+):
+    """
+    Stream the newly calculated digits as server-sent events.
+    
+    Each event carries only the digits after the previous one. A reconnecting client resumes from
+    its Last-Event-ID (or the `dp` it already has) and first receives the digits it missed.
+    
+    Args:
+        dp: Decimal places the client already has
+        last_event_id: Id of the last event received, sent by EventSource when reconnecting
+        pi_service: Pi service instance
+    
+    Returns:
+        A text/event-stream response
+    """
+    if last_event_id is not None and last_event_id.isdigit():
+        dp = int(last_event_id)
+    
+    # subscribe before catching up, so nothing published in between is lost
+    queue = pi_service.subscribe_digits()
+    
+    async def events() -> AsyncIterator[str]:
+        sent_dp = dp
+        try:
+            _, decimal_places = await pi_service.get_current_pi()
+            if decimal_places is not None:
+                async for event, sent_dp in _missing_digits(pi_service, sent_dp, decimal_places):
+                    yield event
+            
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                if event is None:
+                    # fell behind, the client reconnects with its Last-Event-ID
+                    return
+                if event.dp <= sent_dp:
+                    continue
+                
+                if event.start > sent_dp + 1:
+                    async for missing, sent_dp in _missing_digits(pi_service, sent_dp, event.start - 1):
+                        yield missing
+                    if event.start > sent_dp + 1:
+                        continue  # the gap isn't readable yet, the next event or reconnect fills it
+                
+                yield _digits_event(sent_dp + 1, event.digits[sent_dp + 1 - event.start:], event.dp)
+                sent_dp = event.dp
+        finally:
+            pi_service.unsubscribe_digits(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
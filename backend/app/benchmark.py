@@ -0,0 +1,307 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import signal
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from mpmath.libmp import BACKEND
+
+from app.libs.calculator_registry import CALCULATORS, POOLED_CALCULATORS, create_calculator
+from app.repositories.reference_repository import ReferenceRepository
+from app.services.pi_verifier import PiVerifier
+
+# Times every calculator of the registry over a grid of decimal places and pool sizes:
+#   python -m app.benchmark --output benchmark.json
+#   python -m app.benchmark --baseline benchmark.json  # exits with 1 on regressions
+# Each case runs cold in a fresh process, so its peak RSS isn't inherited from the previous ones.
+
+DEFAULT_DECIMAL_PLACES = "1000,10000,100000,1000000"
+
+# seconds a case may run before it is killed, the larger precisions of that calculator are then skipped
+DEFAULT_TIMEOUT = 300.0
+
+# a case is a regression when its wall time exceeds the baseline's by more than this fraction
+DEFAULT_THRESHOLD = 0.2
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+# trusted decimal places the results are compared with, the ones beyond it are spot checked with BBP
+REFERENCE_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "resources",
+                              "compressed_1m_university_minnesota.txt")
+
+
+@dataclass
+class BenchmarkResult:
+    """Measurements of one calculation."""
+    calculator: str
+    decimal_places: int
+    workers: int
+    status: str  # "ok", "timeout", "error" (failed or wrong digits) or "skipped"
+    wall_time: float = 0.0  # seconds
+    cpu_time: float = 0.0  # seconds, of the process and its pool workers
+    peak_rss: int = 0  # bytes, of the process
+    peak_worker_rss: int = 0  # bytes, of the largest pool worker
+    digits_per_second: float = 0.0
+
+    @property
+    def key(self) -> Tuple[str, int, int]:
+        return self.calculator, self.decimal_places, self.workers
+
+
+def _cpu_time() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def check_digits(pi_value: str, decimal_places: int, reference_file: str = REFERENCE_FILE) -> bool:
+    """
+    Whether a calculated value is Pi to `decimal_places`, not just a string of the right length.
+
+    The decimal places the reference file covers are compared with it, and a BBP window of hexadecimal digits
+    near the last decimal place checks the ones beyond: a wrong digit anywhere before the window changes it.
+
+    Args:
+        pi_value: The calculated value
+        decimal_places: Decimal places it should have
+        reference_file: Trusted Pi digits ("3.14159...")
+
+    Returns:
+        True if it passed every check that applies
+    """
+    if len(pi_value) != decimal_places + 2 or not pi_value.startswith("3."):
+        return False
+
+    reference = ReferenceRepository(reference_file)
+    verifier = PiVerifier(reference)
+    checked = verifier.check_reference(pi_value)
+    if checked is not None and not checked.passed:
+        return False
+    if checked is not None and checked.last >= decimal_places:
+        return True
+
+    # the window is moved down to the last one the decimal places determine
+    checked = verifier.check_bbp(pi_value, position=decimal_places)
+    return checked is None or checked.passed
+
+
+def _measure(name: str, decimal_places: int, workers: int, connection):
+    """Run one calculation in a fresh process and send its BenchmarkResult fields back."""
+    os.setpgid(0, 0)  # so a timeout kills the pool workers along with it
+    calculator = create_calculator(name, workers=workers)
+
+    started_cpu = _cpu_time()
+    started = time.perf_counter()
+    pi_value = calculator.calculate_pi(decimal_places)
+    wall_time = time.perf_counter() - started
+
+    # pool workers only count in RUSAGE_CHILDREN once they are reaped
+    calculator.shutdown()
+    for child in multiprocessing.active_children():
+        child.join()
+    cpu_time = _cpu_time() - started_cpu
+
+    valid = check_digits(pi_value, decimal_places)
+    connection.send(asdict(BenchmarkResult(
+        calculator=name,
+        decimal_places=decimal_places,
+        workers=workers,
+        status="ok" if valid else "error",
+        wall_time=wall_time,
+        cpu_time=cpu_time,
+        peak_rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT,
+        peak_worker_rss=resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * RSS_UNIT,
+        digits_per_second=decimal_places / wall_time if wall_time else 0.0,
+    )))
+
+
+def run_case(name: str, decimal_places: int, workers: int, timeout: float = DEFAULT_TIMEOUT) -> BenchmarkResult:
+    """
+    Time one cold calculation in a fresh process.
+
+    Args:
+        name: Calculator name, see CALCULATORS
+        decimal_places: Precision to calculate
+        workers: Size of the process pool of the calculator
+        timeout: Seconds before the process is killed
+
+    Returns:
+        The measurements, or only the status if it timed out or failed
+    """
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_measure, args=(name, decimal_places, workers, sender))
+    process.start()
+    sender.close()
+
+    try:
+        if not receiver.poll(timeout):
+            os.killpg(process.pid, signal.SIGKILL)
+            return BenchmarkResult(name, decimal_places, workers, "timeout", wall_time=timeout)
+        try:
+            return BenchmarkResult(**receiver.recv())
+        except EOFError:  # the process died without a result
+            return BenchmarkResult(name, decimal_places, workers, "error")
+    finally:
+        process.join()
+        receiver.close()
+
+
+def run_grid(calculators: Iterable[str], decimal_places: Iterable[int], workers: Iterable[int],
+             timeout: float = DEFAULT_TIMEOUT, repeat: int = 1, report=None) -> List[BenchmarkResult]:
+    """
+    Time every calculator at every precision, the pooled ones with every pool size.
+
+    Args:
+        calculators: Calculator names
+        decimal_places: Precisions, run in increasing order
+        workers: Pool sizes, calculators without a pool run with 1
+        timeout: Seconds per case, a calculator that times out or fails skips its larger precisions
+        repeat: Runs per case, the fastest one is kept
+        report: Called with each result as it is measured
+
+    Returns:
+        One result per case
+    """
+    results = []
+    for name in calculators:
+        for pool_size in (sorted(set(workers)) if name in POOLED_CALCULATORS else [1]):
+            failed = False
+            for precision in sorted(set(decimal_places)):
+                if failed:
+                    result = BenchmarkResult(name, precision, pool_size, "skipped")
+                else:
+                    runs = [run_case(name, precision, pool_size, timeout) for _ in range(repeat)]
+                    result = min(runs, key=lambda run: (run.status != "ok", run.wall_time))
+                    failed = result.status != "ok"
+                results.append(result)
+                if report:
+                    report(result)
+    return results
+
+
+def compare(results: List[BenchmarkResult], baseline: List[BenchmarkResult],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[BenchmarkResult, BenchmarkResult]]:
+    """
+    Find the cases slower than in a baseline run.
+
+    Args:
+        results: Current results
+        baseline: Results of the baseline run, matched by calculator, decimal places and workers
+        threshold: Tolerated slowdown, as a fraction of the baseline wall time
+
+    Returns:
+        (result, baseline result) pairs of the regressions, including cases that no longer finish
+    """
+    previous = {result.key: result for result in baseline if result.status == "ok"}
+    regressions = []
+    for result in results:
+        before = previous.get(result.key)
+        if before is None or result.status == "skipped":
+            continue
+        if result.status != "ok" or result.wall_time > before.wall_time * (1 + threshold):
+            regressions.append((result, before))
+    return regressions
+
+
+def suggest_crossovers(results: List[BenchmarkResult]) -> Optional[str]:
+    """
+    PI_AUTO_CROSSOVERS with the fastest calculator at each measured precision.
+
+    Returns:
+        "name:first decimal place" pairs, or None if nothing finished
+    """
+    fastest: Dict[int, BenchmarkResult] = {}
+    for result in results:
+        best = fastest.get(result.decimal_places)
+        if result.status == "ok" and (best is None or result.wall_time < best.wall_time):
+            fastest[result.decimal_places] = result
+
+    crossovers = []
+    for precision in sorted(fastest):
+        name = fastest[precision].calculator
+        if not crossovers or crossovers[-1][1] != name:
+            crossovers.append((precision if crossovers else 0, name))
+    return ",".join(f"{name}:{start}" for start, name in crossovers) or None
+
+
+def load_results(path: str) -> List[BenchmarkResult]:
+    """Read the results of a previous run from its JSON output."""
+    with open(path) as f:
+        return [BenchmarkResult(**result) for result in json.load(f)["results"]]
+
+
+def machine_info() -> dict:
+    """Describes where the results were measured, they are only comparable on the same machine."""
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "mpmath_backend": BACKEND,
+    }
+
+
+def _integers(value: str) -> List[int]:
+    return [int(float(item)) for item in value.split(",")]  # float() accepts 1e6
+
+
+def _format(result: BenchmarkResult) -> str:
+    line = f"{result.calculator:<20} {result.decimal_places:>9} dp {result.workers:>3} workers  "
+    if result.status != "ok":
+        return line + result.status
+    return line + (f"{result.wall_time:9.3f}s wall {result.cpu_time:9.3f}s cpu "
+                   f"{result.peak_rss / 2**20:8.1f} MiB {result.digits_per_second:12.0f} digits/s")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.benchmark", description="Benchmark the Pi calculators")
+    parser.add_argument("--calculators", default=",".join(CALCULATORS),
+                        help="comma separated calculator names (default: all)")
+    parser.add_argument("--decimal-places", type=_integers, default=_integers(DEFAULT_DECIMAL_PLACES),
+                        help=f"comma separated precisions (default: {DEFAULT_DECIMAL_PLACES})")
+    parser.add_argument("--workers", type=_integers, default=sorted({1, os.cpu_count() or 1}),
+                        help="comma separated pool sizes for the pooled calculators (default: 1 and the CPU count)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case, the fastest is kept (default: 1)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"seconds per case (default: {DEFAULT_TIMEOUT:g})")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON output of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"tolerated slowdown against the baseline (default: {DEFAULT_THRESHOLD:g})")
+    args = parser.parse_args(argv)
+
+    calculators = [name.strip() for name in args.calculators.split(",")]
+    unknown = [name for name in calculators if name not in CALCULATORS]
+    if unknown:
+        parser.error(f"unknown calculators: {', '.join(unknown)}")
+
+    results = run_grid(calculators, args.decimal_places, args.workers, args.timeout, args.repeat,
+                       report=lambda result: print(_format(result), flush=True))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"machine": machine_info(), "results": [asdict(result) for result in results]}, f, indent=2)
+
+    crossovers = suggest_crossovers(results)
+    if crossovers:
+        print(f"\nSuggested PI_AUTO_CROSSOVERS={crossovers}")
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.threshold)
+        for result, before in regressions:
+            print(f"REGRESSION {_format(result)} (baseline {before.wall_time:.3f}s)")
+        if regressions:
+            return 1
+        print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
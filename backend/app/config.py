@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict
 
@@ -12,9 +14,108 @@ class Settings(BaseSettings):
     MAX_DECIMAL_POINTS: int = 10000
 
     START_DECIMAL_POINTS: int = 0
+
+    # size of the process pool used for binary splitting (0 = number of CPUs)
+    PI_WORKERS: int = 0
+
+    # algorithm, see app/libs/calculator_registry.py, "auto" picks one per range of decimal places from
+    # PI_AUTO_CROSSOVERS ("name:first decimal place" pairs)
+    PI_CALCULATOR: Literal["chudnovsky", "chudnovsky-serial", "chudnovsky-integer", "gauss-legendre", "machin", "auto"] = "chudnovsky"
+    PI_AUTO_CROSSOVERS: str = "chudnovsky-serial:0,chudnovsky-integer:20000"
+    
+    # where the binary split of large steps runs: "local" process pool, or "distributed" over the split workers
+    # of any number of nodes (python -m app.split_worker) through a Redis job queue. Steps adding at least
+    # PI_SPLIT_MIN_TERMS terms are split into jobs of PI_SPLIT_LEAF_TERMS terms, a job whose worker stops
+    # renewing its lease for PI_SPLIT_JOB_TIMEOUT seconds is retried
+    PI_SPLIT_MODE: Literal["local", "distributed"] = "local"
+    PI_SPLIT_MIN_TERMS: int = 10000
+    PI_SPLIT_LEAF_TERMS: int = 5000
+    PI_SPLIT_JOB_TIMEOUT: float = 30.0
+    
+    # directory the accumulated binary split state is checkpointed to at most every PI_CHECKPOINT_INTERVAL
+    # seconds, a restarted calculation resumes from it ("" = off). Merges of states with operands larger than
+    # PI_OUT_OF_CORE_MERGE_BYTES memory-map them from the same directory instead (0 = in memory)
+    PI_CHECKPOINT_DIR: str = ""
+    PI_CHECKPOINT_INTERVAL: float = 60.0
+    PI_OUT_OF_CORE_MERGE_BYTES: int = 0
+    
+    # arithmetic used for the final division of "chudnovsky": "mpmath" floats or exact "integer" fixed-point
+    PI_CALCULATOR_BACKEND: Literal["mpmath", "integer"] = "mpmath"
+    
+    # decimal places each calculation step goes to: "linear" adds PI_PRECISION_STEP, "geometric" multiplies
+    # by PI_PRECISION_GROWTH, "time-budget" sizes the steps to take about PI_STEP_TIME_BUDGET seconds
+    PI_PRECISION_SCHEDULE: Literal["linear", "geometric", "time-budget"] = "linear"
+    PI_PRECISION_STEP: int = 1
+    PI_PRECISION_GROWTH: float = 1.25
+    PI_STEP_TIME_BUDGET: float = 1.0
+    # seconds between the longer prefixes of a step revealed to the readers while the next one is calculated
+    # (0 = publish each step at once)
+    PI_PUBLISH_INTERVAL: float = 0.1
+    
+    # GET /api/pi?dp=N above the published decimal places calculates N on demand, up to this many decimal places
+    # and never beyond MAX_DECIMAL_POINTS. With PI_CALCULATION_MODE=worker the worker calculates it next
+    PI_ON_DEMAND_MAX_DECIMAL_PLACES: int = 10000
+    # seconds a request waits for its calculation before getting 202 with the progress
+    PI_ON_DEMAND_TIMEOUT: float = 10.0
+    # requests waiting for on-demand calculations, the ones beyond get 202 right away
+    PI_ON_DEMAND_QUEUE_SIZE: int = 100
+    
+    # how each step is written to Redis: "append" only the new digits, or rewrite the "full" value
+    PI_STORAGE_MODE: Literal["append", "full"] = "append"
+    
+    # how the digits are kept in Redis: "ascii", one byte per digit, or "packed" 4-bit BCD, half the memory
+    PI_STORAGE_ENCODING: Literal["ascii", "packed"] = "ascii"
+    
+    # max number of digits returned by a single /api/pi/digits request
+    MAX_DIGITS_RANGE_LENGTH: int = 100000
+    
+    # /api/pi/hex/{n}: highest hexadecimal place and max number of digits per request, and the size of
+    # the process pool the BBP extraction runs on (0 = number of CPUs). The cost grows linearly with the place,
+    # about a CPU-second per 100000 places, and requests needing more than PI_HEX_MAX_PENDING_BLOCKS blocks of
+    # 64 digits computed at the same time get 503 (0 = no limit)
+    MAX_HEX_POSITION: int = 1000000
+    MAX_HEX_DIGITS_LENGTH: int = 256
+    PI_HEX_WORKERS: int = 0
+    PI_HEX_MAX_PENDING_BLOCKS: int = 8
     
     # Redis connection string
     REDIS_URL: str
+
+    # connection pool used to serve requests, a request waits up to REDIS_POOL_TIMEOUT seconds for a free connection
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0
+
+    # seconds between checks for a newer Pi version, in case an update notification was missed
+    PI_CACHE_VERSION_CHECK_INTERVAL: float = 1.0
+    
+    # trusted file of Pi digits ("3.14159...") the cache is seeded from on a cold start ("" = off)
+    PI_REFERENCE_FILE: str = ""
+    
+    # check every calculated step against the reference file, plus a BBP spot check and a checksum of the
+    # binary split state every PI_VERIFICATION_INTERVAL seconds
+    PI_VERIFICATION_ENABLED: bool = True
+    PI_VERIFICATION_INTERVAL: float = 60.0
+    
+    # most bytes of RSS the calculating process and its pool workers may use together: each step is estimated
+    # first and runs with fewer workers, merges in the calculating process or pauses to fit (0 = no budget).
+    # The RSS is sampled every PI_MEMORY_SAMPLE_INTERVAL seconds during a step
+    PI_MEMORY_BUDGET_BYTES: int = 0
+    PI_MEMORY_SAMPLE_INTERVAL: float = 0.2
+    
+    # where the calculation runs: in a "thread" of the API process, or in a separate "worker" (python -m app.worker)
+    PI_CALCULATION_MODE: Literal["thread", "worker"] = "thread"
+    # memory-mapped file the calculating process hands Pi over to the API processes on the same host ("" = off)
+    PI_SHARED_BUFFER_PATH: str = ""
+    
+    # only the process holding the calculation lease in Redis calculates, the others just serve requests
+    LEADER_ELECTION_ENABLED: bool = True
+    # seconds until the lease of a leader that stopped renewing it expires and another process takes over
+    LEADER_LEASE_TTL: float = 10.0
+    
+    # serve Prometheus metrics at /metrics and record the request metrics
+    METRICS_ENABLED: bool = True
+    # port python -m app.worker serves its metrics on, it has no API (0 = off)
+    WORKER_METRICS_PORT: int = 0
     
     # Rate limiting configuration
     RATE_LIMIT_CALLS: int = 10
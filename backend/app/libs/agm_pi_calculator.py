@@ -0,0 +1,26 @@
+import math
+
+import mpmath
+
+from app.libs.from_scratch_pi_calculator import FromScratchPiCalculator
+
+# Gauss-Legendre (arithmetic-geometric mean) with mpmath
+# Doubles the number of correct digits with every iteration, each one costs a full precision
+# multiplication and square root.
+
+
+class AgmPiCalculator(FromScratchPiCalculator):
+    """ Pi calculator using the Gauss-Legendre algorithm """
+
+    def _fixed_point_pi(self, digits: int) -> int:
+        with mpmath.workdps(digits + 10):  # extra digits for accuracy
+            a = mpmath.mpf(1)
+            b = 1 / mpmath.sqrt(2)
+            t = mpmath.mpf(1) / 4
+            p = mpmath.mpf(1)
+
+            for _ in range(max(1, math.ceil(math.log2(digits + 10)))):
+                a, b, t, p = (a + b) / 2, mpmath.sqrt(a * b), t - p * ((a - b) / 2) ** 2, 2 * p
+
+            pi = (a + b) ** 2 / (4 * t)
+            return int(pi * mpmath.mpf(10) ** digits)
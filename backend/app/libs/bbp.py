@@ -0,0 +1,84 @@
+from typing import Dict
+
+from mpmath.libmp import MPZ
+
+# Bailey-Borwein-Plouffe digit extraction
+# pi = sum_k 1/16^k * (4/(8k+1) - 2/(8k+4) - 1/(8k+5) - 1/(8k+6)), so the hexadecimal digits of pi
+# from any position n on only need the fractional part of 16^n * pi, computed with modular
+# exponentiation in O(n log n) time and constant memory, without the digits before n.
+
+# j -> coefficient of the sum over 1/(16^k * (8k+j))
+SERIES = {1: 4, 4: -2, 5: -1, 6: -1}
+
+# fractional bits carried beyond the requested digits, covers the rounding of every term
+_GUARD_BITS = 32
+
+
+def window_bits(n: int, count: int) -> int:
+    """Fractional bits needed for `count` hexadecimal digits after hexadecimal place n."""
+    return 4 * count + _GUARD_BITS + n.bit_length()
+
+
+def series_terms(j: int, n: int, start: int, stop: int, bits: int) -> int:
+    """
+    Part of the fractional part of 16^n * sum_k 1/(16^k * (8k+j)) for the terms k in [start, stop), k <= n.
+
+    Terms with k <= n contribute a whole part, only their remainder modulo (8k+j) matters. Ranges can be
+    summed separately (e.g. in different processes) and added up modulo 2^bits.
+
+    Returns:
+        Fixed-point number with `bits` fractional bits, modulo 1
+    """
+    total = MPZ(0)
+    for k in range(start, min(stop, n + 1)):
+        denominator = 8 * k + j
+        total += (MPZ(pow(16, n - k, denominator)) << bits) // denominator
+    return total % (MPZ(1) << bits)
+
+
+def series_tail(j: int, n: int, bits: int) -> int:
+    """The terms k > n of 16^n * sum_k 1/(16^k * (8k+j)), which shrink by 16 each, as a fixed-point number."""
+    total = MPZ(0)
+    k = n + 1
+    numerator = MPZ(1) << (bits - 4)
+    while numerator:
+        total += numerator // (8 * k + j)
+        numerator >>= 4
+        k += 1
+    return total
+
+
+def hex_digits(series: Dict[int, int], bits: int, count: int) -> str:
+    """
+    Combine the four series of SERIES into hexadecimal digits.
+
+    Args:
+        series: j -> fractional part of its sum (head terms plus tail), with `bits` fractional bits
+        bits: Fractional bits of the sums, from window_bits
+        count: Number of digits
+
+    Returns:
+        `count` lowercase hexadecimal digits
+    """
+    fraction = sum(coefficient * series[j] for j, coefficient in SERIES.items()) % (MPZ(1) << bits)
+    return format(int(fraction >> (bits - 4 * count)), f"0{count}x")
+
+
+def pi_hex_digits(position: int, count: int = 8) -> str:
+    """
+    Hexadecimal digits of pi after the point, without computing the ones before them.
+
+    Args:
+        position: Hexadecimal place of the first digit (1-based, pi = 3.243f6a88... has "2" at place 1)
+        count: Number of digits to return
+
+    Returns:
+        `count` lowercase hexadecimal digits
+    """
+    if position < 1 or count < 1:
+        raise ValueError("position and count must be positive")
+
+    n = position - 1
+    bits = window_bits(n, count)
+    series = {j: series_terms(j, n, 0, n + 1, bits) + series_tail(j, n, bits) for j in SERIES}
+    return hex_digits(series, bits, count)
@@ -0,0 +1,77 @@
+from mpmath.libmp import BACKEND, MPZ
+
+# Big integer helpers for the exact-integer calculators
+# CPython's built-in long division is quadratic, so large divisions go through a Newton reciprocal
+# (only multiplications, which are Karatsuba). With gmpy2 installed the native division is used instead.
+
+# below this many bits the built-in division is faster than the Newton iteration
+NEWTON_THRESHOLD_BITS = 20000
+
+# extra bits carried by the reciprocal so the estimated quotient is off by at most a few units
+_GUARD_BITS = 64
+
+
+def _reciprocal(d: int, bits: int) -> int:
+    """
+    Approximate 2**(2*bits) / d for a `bits`-bit integer d, doubling the precision with Newton steps.
+
+    The result is within a few units of the exact quotient.
+    """
+    if bits <= NEWTON_THRESHOLD_BITS:
+        return (MPZ(1) << (2 * bits)) // d
+
+    half = bits // 2 + _GUARD_BITS
+    r = _reciprocal(d >> (bits - half), half) << (bits - half)
+
+    # r += r * (2^(2*bits) - d * r) / 2^(2*bits)
+    error = (MPZ(1) << (2 * bits)) - d * r
+    return r + ((r * error) >> (2 * bits))
+
+
+class Divisor:
+    """A divisor with a cached reciprocal, for dividing several dividends by the same large number."""
+
+    def __init__(self, divisor: int, quotient_bits: int):
+        """
+        Initialize Divisor.
+
+        Args:
+            divisor: The (positive) number to divide by
+            quotient_bits: Largest quotient size, in bits, this divisor will be used for
+        """
+        self.divisor = MPZ(divisor)
+        self._native = BACKEND == "gmpy" or self.divisor.bit_length() <= NEWTON_THRESHOLD_BITS
+
+        if not self._native:
+            # reciprocal of the divisor's top `precision` bits, scaled by 2^(2*precision)
+            self._precision = quotient_bits + _GUARD_BITS
+            self._shift = self.divisor.bit_length() - self._precision
+            top = self.divisor >> self._shift if self._shift >= 0 else self.divisor << -self._shift
+            self._reciprocal = _reciprocal(top, self._precision)
+            self._max_dividend_bits = self.divisor.bit_length() + quotient_bits
+
+    def divmod(self, dividend: int):
+        """Return (dividend // divisor, dividend % divisor) for a non-negative dividend."""
+        if self._native or not NEWTON_THRESHOLD_BITS < dividend.bit_length() <= self._max_dividend_bits:
+            return divmod(dividend, self.divisor)
+
+        # only the top bits of the dividend matter for the estimate
+        drop = max(0, dividend.bit_length() - 2 * self._precision)
+        quotient = ((dividend >> drop) * self._reciprocal) >> (2 * self._precision + self._shift - drop)
+
+        # the estimate is within a few units, fix it up with the exact remainder
+        remainder = dividend - quotient * self.divisor
+        while remainder < 0:
+            quotient -= 1
+            remainder += self.divisor
+        while remainder >= self.divisor:
+            quotient += 1
+            remainder -= self.divisor
+
+        return quotient, remainder
+
+
+def divide(dividend: int, divisor: int) -> int:
+    """Floor division of non-negative integers that stays sub-quadratic for large operands."""
+    quotient_bits = max(dividend.bit_length() - divisor.bit_length() + 1, 1)
+    return Divisor(divisor, quotient_bits).divmod(dividend)[0]
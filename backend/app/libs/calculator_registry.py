@@ -0,0 +1,189 @@
+import logging
+from typing import Callable, Dict, List, Optional, Protocol, Tuple
+
+from app.libs.agm_pi_calculator import AgmPiCalculator
+from app.libs.int_pi_calculator import IntPiCalculator
+from app.libs.machin_pi_calculator import MachinPiCalculator
+from app.libs.pi_calculator import PiCalculator
+from app.libs.split_checkpoint import SplitCheckpoint
+
+logger = logging.getLogger(__name__)
+
+# computes the (P, Q, T) binary split of the terms [a, b) elsewhere, or None to leave it to the local pool
+Split = Callable[[int, int], Optional[Tuple[int, int, int]]]
+
+
+class Calculator(Protocol):
+    """ Interface shared by the Pi calculators """
+
+    def calculate_pi(self, decimal_places: int) -> str: ...
+
+    def calculate_pi_digits(self, decimal_places: int, start: int) -> str: ...
+
+    def series_state(self) -> Tuple[int, Optional[int], Optional[int], Optional[int]]: ...
+
+    def pop_stats(self) -> Dict[str, float]: ...
+
+    @property
+    def workers(self) -> int: ...
+
+    def set_parallelism(self, workers: Optional[int] = None, pooled_merge: bool = True): ...
+
+    def estimate_peak_bytes(self, decimal_places: int, workers: Optional[int] = None,
+                            pooled_merge: Optional[bool] = None) -> int: ...
+
+    def worker_pids(self) -> List[int]: ...
+
+    def terminate_workers(self): ...
+
+    def shutdown(self): ...
+
+
+# name -> factory taking the process pool size, and the binary split options of the Chudnovsky calculators
+# (split, checkpoint), see PiCalculator
+CALCULATORS: Dict[str, Callable[..., Calculator]] = {
+    "chudnovsky": lambda workers, **options: PiCalculator(workers=workers, **options),
+    "chudnovsky-serial": lambda workers, **options: PiCalculator(workers=1, **options),
+    "chudnovsky-integer": lambda workers, **options: IntPiCalculator(workers=workers, **options),
+    "gauss-legendre": lambda workers, **options: AgmPiCalculator(workers=workers),
+    "machin": lambda workers, **options: MachinPiCalculator(workers=workers),
+}
+
+# calculators that split their work over a process pool of `workers`, the others ignore it
+POOLED_CALCULATORS = frozenset({"chudnovsky", "chudnovsky-integer"})
+
+# "name:first decimal place" pairs for the auto policy: below 20000 decimal places the steps are too small
+# for the process pool to pay off, above it the integer final division is the fastest
+DEFAULT_AUTO_CROSSOVERS = "chudnovsky-serial:0,chudnovsky-integer:20000"
+
+
+def parse_crossovers(spec: str) -> List[Tuple[int, str]]:
+    """
+    Parse an auto policy such as "chudnovsky-serial:0,chudnovsky-integer:20000".
+
+    Args:
+        spec: Comma separated "name:first decimal place" pairs
+
+    Returns:
+        List of (first decimal place, name), sorted, starting at 0
+
+    Raises:
+        ValueError: If a name isn't registered or the ranges don't start at 0
+    """
+    crossovers = []
+    for item in spec.split(","):
+        name, _, start = item.strip().rpartition(":")
+        if name not in CALCULATORS:
+            raise ValueError(f"Unknown Pi calculator {name!r} in {spec!r}")
+        crossovers.append((int(start), name))
+
+    crossovers.sort()
+    if not crossovers or crossovers[0][0] != 0:
+        raise ValueError(f"Pi calculator crossovers {spec!r} must start at 0")
+    return crossovers
+
+
+def create_calculator(name: str, workers: Optional[int] = None, crossovers: str = DEFAULT_AUTO_CROSSOVERS,
+                      split: Optional[Split] = None, checkpoint: Optional[SplitCheckpoint] = None) -> Calculator:
+    """
+    Create a calculator by name.
+
+    Args:
+        name: One of CALCULATORS, or "auto" to pick one per range of decimal places
+        workers: Size of the process pool, for the calculators that use one
+        crossovers: Policy of "auto", see parse_crossovers
+        split: Computes large binary splits elsewhere, for the Chudnovsky calculators (None = locally)
+        checkpoint: Disk checkpoints and out-of-core merges of the Chudnovsky calculators (None = off)
+
+    Raises:
+        ValueError: If the name isn't registered
+    """
+    if name == "auto":
+        return AutoPiCalculator(parse_crossovers(crossovers), workers, split=split, checkpoint=checkpoint)
+    if name not in CALCULATORS:
+        raise ValueError(f"Unknown Pi calculator {name!r}")
+    return CALCULATORS[name](workers, split=split, checkpoint=checkpoint)
+
+
+class AutoPiCalculator:
+    """ Delegates each precision to the calculator measured fastest for its range of decimal places """
+
+    def __init__(self, crossovers: List[Tuple[int, str]], workers: Optional[int] = None,
+                 split: Optional[Split] = None, checkpoint: Optional[SplitCheckpoint] = None):
+        """
+        Initialize AutoPiCalculator.
+
+        Args:
+            crossovers: Sorted (first decimal place, name) ranges, from parse_crossovers
+            workers: Size of the process pool, for the calculators that use one
+            split: Computes large binary splits elsewhere, for the Chudnovsky calculators
+            checkpoint: Disk checkpoints of the Chudnovsky calculators, the next one resumes from them
+        """
+        self._crossovers = crossovers
+        self._workers = workers
+        self._options = {"split": split, "checkpoint": checkpoint}
+        self._calculators = {name: CALCULATORS[name](workers, **self._options) for _, name in crossovers}
+        self._parallelism: Tuple[Optional[int], bool] = (None, True)  # from set_parallelism
+        self._current = 0  # index of the range in use
+        self._current_name = crossovers[0][1]
+
+    def _index(self, decimal_places: int) -> int:
+        # only move on to later ranges: a lower precision (e.g. the background steps behind an on-demand
+        # request) is a prefix of what the current calculator already has
+        index = self._current
+        while index + 1 < len(self._crossovers) and decimal_places >= self._crossovers[index + 1][0]:
+            index += 1
+        return index
+
+    def _select(self, decimal_places: int) -> Calculator:
+        index = self._index(decimal_places)
+        name = self._crossovers[index][1]
+
+        if name != self._current_name:
+            logger.info(f"Switching Pi calculator from {self._current_name} to {name} at {decimal_places} decimal places")
+            # the precision mostly goes up, don't keep the state of the one we leave
+            previous = self._calculators[self._current_name]
+            previous.shutdown()
+            self._calculators[self._current_name] = CALCULATORS[self._current_name](self._workers, **self._options)
+            self._calculators[self._current_name].set_parallelism(*self._parallelism)
+            self._current_name = name
+        self._current = index
+
+        return self._calculators[name]
+
+    def calculate_pi(self, decimal_places: int) -> str:
+        return self._select(decimal_places).calculate_pi(decimal_places)
+
+    def calculate_pi_digits(self, decimal_places: int, start: int) -> str:
+        return self._select(decimal_places).calculate_pi_digits(decimal_places, start)
+
+    def series_state(self) -> Tuple[int, Optional[int], Optional[int], Optional[int]]:
+        return self._calculators[self._current_name].series_state()
+
+    def pop_stats(self) -> Dict[str, float]:
+        return self._calculators[self._current_name].pop_stats()
+
+    @property
+    def workers(self) -> int:
+        return max(calculator.workers for calculator in self._calculators.values())
+
+    def set_parallelism(self, workers: Optional[int] = None, pooled_merge: bool = True):
+        self._parallelism = (workers, pooled_merge)
+        for calculator in self._calculators.values():
+            calculator.set_parallelism(workers, pooled_merge)
+
+    def estimate_peak_bytes(self, decimal_places: int, workers: Optional[int] = None,
+                            pooled_merge: Optional[bool] = None) -> int:
+        name = self._crossovers[self._index(decimal_places)][1]
+        return self._calculators[name].estimate_peak_bytes(decimal_places, workers, pooled_merge)
+
+    def worker_pids(self) -> List[int]:
+        return [pid for calculator in self._calculators.values() for pid in calculator.worker_pids()]
+
+    def terminate_workers(self):
+        for calculator in self._calculators.values():
+            calculator.terminate_workers()
+
+    def shutdown(self):
+        for calculator in self._calculators.values():
+            calculator.shutdown()
@@ -0,0 +1,106 @@
+from typing import Dict, List
+
+from mpmath.libmp import MPZ
+
+from app.libs.bigint import Divisor
+
+# Divide-and-conquer binary to decimal conversion (and back)
+# The number is split on powers of ten of size leaf_digits * 2^j, which are cached (together with their
+# reciprocals) between calls, and only the halves that overlap the requested digit range are converted.
+
+
+class DecimalConverter:
+    """Converts large integers to decimal digit strings, in full or by digit range."""
+
+    def __init__(self, leaf_digits: int = 512):
+        """
+        Initialize DecimalConverter.
+
+        Args:
+            leaf_digits: Pieces of at most this many digits are converted with str()
+        """
+        self._leaf_digits = leaf_digits
+        self._divisors: Dict[int, Divisor] = {}  # digits -> Divisor for 10^digits
+
+    def to_digits(self, n: int, width: int) -> str:
+        """
+        Convert a non-negative integer to exactly `width` decimal digits, zero padded on the left.
+
+        Args:
+            n: The integer to convert, must be below 10^width
+            width: Number of digits to return
+        """
+        return self.digit_range(n, width, 0, width)
+
+    def digit_range(self, n: int, width: int, start: int, stop: int) -> str:
+        """
+        Return digits [start, stop) of the `width`-digit representation of n, without converting the rest.
+
+        Args:
+            n: The integer to convert, must be below 10^width
+            width: Number of digits of the full representation
+            start: Index of the first digit to return, 0 is the most significant digit
+            stop: Index one past the last digit to return
+
+        Returns:
+            The requested digits
+        """
+        start, stop = max(start, 0), min(stop, width)
+        if start >= stop:
+            return ""
+
+        # a range close to the end only needs the remainder by a small power of ten
+        if width - start <= self._leaf_digits:
+            tail = n % (MPZ(10) ** (width - start))
+            return str(tail).zfill(width - start)[:stop - start]
+
+        parts: List[str] = []
+        self._emit(MPZ(n), width, start, stop, parts)
+        return "".join(parts)
+
+    def from_digits(self, digits: str) -> int:
+        """
+        Convert a decimal digit string to an integer, the reverse of to_digits.
+
+        Args:
+            digits: Decimal digits, leading zeros allowed
+        """
+        width = len(digits)
+        if width <= self._leaf_digits:
+            return MPZ(int(digits or "0"))
+
+        low = self._split_digits(width)
+        high = self.from_digits(digits[:width - low])
+        return high * self._divisor(low).divisor + self.from_digits(digits[width - low:])
+
+    def _emit(self, n: int, width: int, start: int, stop: int, parts: List[str]):
+        if width <= self._leaf_digits:
+            parts.append(str(n).zfill(width)[start:stop])
+            return
+
+        low = self._split_digits(width)
+        high = width - low  # never more than low, so one cached reciprocal per power covers the quotient
+        divisor = self._divisor(low)
+
+        if stop <= high:
+            self._emit(divisor.divmod(n)[0], high, start, stop, parts)
+        elif start >= high:
+            self._emit(divisor.divmod(n)[1], low, start - high, stop - high, parts)
+        else:
+            q, r = divisor.divmod(n)
+            self._emit(q, high, start, high, parts)
+            self._emit(r, low, 0, stop - high, parts)
+
+    def _split_digits(self, width: int) -> int:
+        """Largest leaf_digits * 2^j below width, so the split points repeat across calls."""
+        low = self._leaf_digits
+        while low * 2 < width:
+            low *= 2
+        return low
+
+    def _divisor(self, digits: int) -> Divisor:
+        divisor = self._divisors.get(digits)
+        if divisor is None:
+            power = MPZ(10) ** digits
+            divisor = self._divisors[digits] = Divisor(power, power.bit_length())
+        return divisor
@@ -0,0 +1,85 @@
+from typing import Optional, Tuple, Union
+
+# Packed digits: 4-bit BCD, two decimal digits per byte with the first digit in the high nibble.
+# An odd number of digits is padded with a 0xF nibble. Packing and unpacking go through the
+# hex codec of bytes, which runs in C: BCD digits are exactly the hex digits 0-9.
+
+PAD_NIBBLE = "f"
+
+
+def pack_digits(digits: Union[str, bytes, memoryview]) -> bytes:
+    """
+    Pack decimal digits into 4-bit BCD.
+
+    Args:
+        digits: Decimal digits only, as text or ASCII bytes
+
+    Returns:
+        The packed digits, (len(digits) + 1) // 2 bytes
+    """
+    if not isinstance(digits, str):
+        digits = str(digits, "ascii")
+    if digits and not (digits.isascii() and digits.isdigit()):
+        raise ValueError("Only decimal digits can be packed")
+    if len(digits) % 2:
+        digits += PAD_NIBBLE
+    return bytes.fromhex(digits)
+
+
+def unpack_digits(packed: Union[bytes, memoryview], count: int = -1) -> str:
+    """
+    Unpack 4-bit BCD digits.
+
+    Args:
+        packed: The packed digits
+        count: Number of digits to return, all of them (without the padding) if negative
+
+    Returns:
+        The decimal digits
+    """
+    digits = bytes(packed).hex()
+    if count >= 0:
+        return digits[:count]
+    return digits[:-1] if digits.endswith(PAD_NIBBLE) else digits
+
+
+def packed_size(count: int) -> int:
+    """Number of bytes holding `count` packed digits."""
+    return (count + 1) // 2
+
+
+def packed_byte_range(start: int, length: int) -> Tuple[int, int]:
+    """
+    Inclusive range of the bytes holding a window of packed decimal places.
+
+    Args:
+        start: First decimal place of the window (1-based)
+        length: Number of decimal places in the window
+
+    Returns:
+        Tuple of (first byte, last byte)
+    """
+    return (start - 1) // 2, (start + length - 2) // 2
+
+
+def unpack_window(packed: Union[bytes, memoryview], start: Optional[int], length: int, decimal_places: int) -> str:
+    """
+    Unpack a window of decimal places read from packed storage.
+
+    Args:
+        packed: The bytes of packed_byte_range(start, length), or at least the last length // 2 + 1 bytes
+            when start is None
+        start: First decimal place of the window (1-based), or None for the last `length` decimal places
+        length: Number of decimal places in the window
+        decimal_places: Number of decimal places stored, the window is cut there
+
+    Returns:
+        The decimal digits
+    """
+    digits = bytes(packed).hex()
+    if start is None:
+        if decimal_places % 2:
+            digits = digits[:-1]  # padding of the last byte
+        return digits[-length:]
+    # a window starting on an even decimal place begins in the low nibble
+    return digits[(start - 1) % 2:][:max(0, min(length, decimal_places - start + 1))]
@@ -0,0 +1,107 @@
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from app.libs.decimal_converter import DecimalConverter
+from app.libs.pi_calculator import CONVERTER_FACTOR, DIGIT_BYTES, GUARD_DIGITS, TERMS_GROWTH_DIVISOR
+
+# Base for the algorithms that have no state to extend and compute pi from scratch at a given precision
+# The result is computed with headroom and kept, so a run of increasing precisions only recomputes it
+# when it has grown by 1/TERMS_GROWTH_DIVISOR, like the incremental Chudnovsky terms.
+
+# full precision numbers alive at once in the algorithms, for the memory estimate
+WORKING_NUMBERS = 16
+
+
+class FromScratchPiCalculator(ABC):
+    """ Pi calculator recomputing pi for each new precision, the algorithm is left to subclasses """
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Initialize FromScratchPiCalculator.
+
+        Args:
+            workers: Unused, these algorithms run in the calling thread
+        """
+        self._pi = None
+        self._pi_decimal_places = -1
+        self._converter = DecimalConverter()
+        self._stats: Dict[str, float] = {}  # seconds per phase since the last pop_stats()
+
+    def calculate_pi(self, decimal_places: int) -> str:
+        self._prepare(decimal_places)
+        return self._pi[:decimal_places + 2]
+
+    def calculate_pi_digits(self, decimal_places: int, start: int) -> str:
+        """
+        Calculate Pi to `decimal_places` but only return the decimal places from `start` on.
+
+        Args:
+            decimal_places: Number of decimal places to calculate
+            start: First decimal place to return (1-based)
+
+        Returns:
+            Same as calculate_pi(decimal_places)[start + 1:]
+        """
+        self._prepare(decimal_places)
+        return self._pi[start + 1:decimal_places + 2]
+
+    def _prepare(self, decimal_places: int):
+        """Make sure the cached result covers `decimal_places`."""
+        if decimal_places <= self._pi_decimal_places:
+            return
+
+        target = max(decimal_places, self._pi_decimal_places + self._pi_decimal_places // TERMS_GROWTH_DIVISOR)
+        digits = target + GUARD_DIGITS
+        started = time.perf_counter()
+        pi = self._fixed_point_pi(digits)
+        divided = time.perf_counter()
+        pi_str = self._converter.digit_range(pi, digits + 1, 0, target + 1)
+        self._pi = pi_str[:1] + "." + pi_str[1:]
+        self._pi_decimal_places = target
+
+        # the whole algorithm counts as the "division" phase of the series calculators
+        self._stats["division"] = self._stats.get("division", 0.0) + divided - started
+        self._stats["stringify"] = self._stats.get("stringify", 0.0) + time.perf_counter() - divided
+
+    @abstractmethod
+    def _fixed_point_pi(self, digits: int) -> int:
+        """Compute pi as an integer scaled by 10^digits, correct up to a few units in the last place."""
+
+    def series_state(self) -> Tuple[int, None, None, None]:
+        """No binary split state to verify."""
+        return 0, None, None, None
+
+    def pop_stats(self) -> Dict[str, float]:
+        """Seconds spent per phase since the last call, "division" and "stringify", see PiCalculator.pop_stats."""
+        stats, self._stats = self._stats, {}
+        return stats
+
+    @property
+    def workers(self) -> int:
+        """No process pool, the calculation runs in the calling thread."""
+        return 1
+
+    def set_parallelism(self, workers: Optional[int] = None, pooled_merge: bool = True):
+        """Nothing to limit."""
+
+    def estimate_peak_bytes(self, decimal_places: int, workers: Optional[int] = None,
+                            pooled_merge: Optional[bool] = None) -> int:
+        """Estimate the memory calculating to `decimal_places` adds at its peak, see PiCalculator.estimate_peak_bytes."""
+        if decimal_places <= self._pi_decimal_places:
+            return 0
+        target = max(decimal_places, self._pi_decimal_places + self._pi_decimal_places // TERMS_GROWTH_DIVISOR)
+        digit_bytes = int(target * DIGIT_BYTES)
+        # the new string and the conversion's powers of ten, plus the algorithm's numbers or the string's copy
+        kept = target + CONVERTER_FACTOR * digit_bytes
+        return kept + max(WORKING_NUMBERS * digit_bytes, max(self._pi_decimal_places, 0))
+
+    def worker_pids(self) -> List[int]:
+        """No pool workers."""
+        return []
+
+    def terminate_workers(self):
+        """No pool workers."""
+
+    def shutdown(self):
+        """Nothing to shut down."""
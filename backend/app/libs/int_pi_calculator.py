@@ -0,0 +1,30 @@
+from mpmath.libmp import MPZ, isqrt
+
+from app.libs.bigint import divide
+from app.libs.pi_calculator import PiCalculator
+
+# Chudnovsky + binary split with exact integers + CPU Parallelization
+# Same incremental product tree as PiCalculator, but the final division is done in fixed-point
+# integer arithmetic instead of mpmath floats
+
+
+class IntPiCalculator(PiCalculator):
+    """ Pi calculator using the Chudnovsky algorithm with exact integer arithmetic """
+
+    def _fixed_point_pi(self, digits: int) -> int:
+        """
+        Compute pi = 426880 * sqrt(10005) * Q / T as a fixed-point integer.
+
+        Args:
+            digits: Number of digits after the decimal point
+
+        Returns:
+            Pi scaled by 10^digits and truncated
+        """
+        one = MPZ(10) ** digits
+
+        sqrt_c = isqrt(10005 * one * one)  # sqrt(10005) scaled by 10^digits
+
+        # Q and T carry more bits than the quotient needs, only their leading bits matter
+        shift = max(0, self._T.bit_length() - one.bit_length() - 64)
+        return divide(426880 * sqrt_c * (self._Q >> shift), self._T >> shift)
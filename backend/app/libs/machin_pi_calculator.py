@@ -0,0 +1,32 @@
+from mpmath.libmp import MPZ
+
+from app.libs.from_scratch_pi_calculator import FromScratchPiCalculator
+
+# Machin's formula with exact integers: pi = 16 * arctan(1/5) - 4 * arctan(1/239)
+# Quadratic in the number of digits, but with tiny constants, so it only pays off at low precision.
+
+# extra digits carried by the fixed-point series, covers the truncation of every term
+_GUARD_DIGITS = 10
+
+
+class MachinPiCalculator(FromScratchPiCalculator):
+    """ Pi calculator using Machin's arctangent formula """
+
+    def _fixed_point_pi(self, digits: int) -> int:
+        one = MPZ(10) ** (digits + _GUARD_DIGITS)
+        pi = 16 * self._arccot(5, one) - 4 * self._arccot(239, one)
+        return pi // MPZ(10) ** _GUARD_DIGITS
+
+    @staticmethod
+    def _arccot(x: int, one: int) -> int:
+        """arctan(1/x) scaled by `one`, from its Taylor series."""
+        power = one // x  # one / x^(2k+1)
+        total = power
+        x_squared = x * x
+        k = 1
+        while power:
+            power //= x_squared
+            term = power // (2 * k + 1)
+            total += -term if k % 2 else term
+            k += 1
+        return total
@@ -1,22 +1,242 @@
-import mpmath 
+import logging
+import math
+import os
+import signal
+import time
+import mpmath
 import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+from mpmath.libmp import MPZ
+
+from app.libs.decimal_converter import DecimalConverter
+from app.libs.split_checkpoint import SplitCheckpoint
+
+logger = logging.getLogger(__name__)
 
 # Chudnovsky + binary split with mpmath + CPU Parallelization
+# Incremental: the (P, Q, T) product tree for terms [0, n) is kept between calls and only extended
+
+DIGITS_PER_TERM = 14.1816474627254776555
+
+# digits kept beyond the requested precision, so the published digits never change once a later step adds terms
+GUARD_DIGITS = 10
+
+# when more terms are needed, add at least 1/TERMS_GROWTH_DIVISOR of the accumulated terms
+TERMS_GROWTH_DIVISOR = 8
+
+# Memory model of a step, see estimate_peak_bytes. The (P, Q, T) state of n terms takes about
+# n * (9 * log2(n) + 100) bits, the division and conversion work on numbers of the result's size
+DIGIT_BYTES = math.log2(10) / 8  # per decimal digit of a binary integer
+DIVISION_FACTOR = 10  # numbers of the result's size alive during the final division
+CONVERTER_FACTOR = 4  # powers of ten and their reciprocals cached by the decimal conversion
+WORKER_PROCESS_BYTES = 20 * 2**20  # a pool worker before it gets any job
+
+
+def state_bytes(terms: int) -> int:
+    """Approximate size of the (P, Q, T) binary split state of `terms` terms."""
+    return int(terms * (9 * math.log2(max(terms, 2)) + 100) / 8)
+
+
+def _timed(function, *args):
+    """Run a pool job and return its result with the seconds the worker spent on it."""
+    started = time.perf_counter()
+    return function(*args), time.perf_counter() - started
+
 
-class PiCalculator: 
+class PiCalculator:
     """ Pi calculator using the Chudnovsky algorithm """
-    
+
+    def __init__(self, workers: Optional[int] = None, split: Optional[Callable[[int, int], Optional[Tuple]]] = None,
+                 checkpoint: Optional[SplitCheckpoint] = None):
+        """
+        Initialize PiCalculator.
+
+        Args:
+            workers: Size of the process pool used for binary splitting, defaults to the CPU count
+            split: Computes the (P, Q, T) of the terms [a, b) elsewhere, e.g. spread over several nodes,
+                or returns None to leave the range to the local pool
+            checkpoint: Saves the accumulated state to disk and resumes from it, and runs the largest merges
+                out-of-core
+        """
+        self._pool_size = workers or os.cpu_count() or 1
+        self._workers = self._pool_size  # lowered by set_parallelism to save memory
+        self._pooled_merge = True
+        self._split = split
+        self._checkpoint = checkpoint
+        self._executor = None  # created on first use and reused for every precision step
+
+        # accumulated binary split state for terms [0, self._terms), kept as exact integers
+        # so it stays valid when the precision goes up
+        self._terms = 0
+        self._P = self._Q = self._T = None
+
+        # last result, computed for the max decimal places the current terms support
+        self._pi = None
+        self._pi_decimal_places = -1
+        self._converter = DecimalConverter()
+
+        # seconds per phase since the last pop_stats(), and the pool utilization of the last pooled split
+        self._stats: Dict[str, float] = {}
+
     def calculate_pi(self, decimal_places: int) -> str:
+        self._prepare(decimal_places)
+        return self._pi[:self.dps + 2]  # slice to desired length
+
+    def calculate_pi_digits(self, decimal_places: int, start: int) -> str:
+        """
+        Calculate Pi to `decimal_places` but only return the decimal places from `start` on.
+
+        Args:
+            decimal_places: Number of decimal places to calculate
+            start: First decimal place to return (1-based)
+
+        Returns:
+            Same as calculate_pi(decimal_places)[start + 1:], without copying the digits before `start`
+        """
+        self._prepare(decimal_places)
+        return self._pi[start + 1:self.dps + 2]
+
+    def series_state(self) -> Tuple[int, Optional[int], Optional[int], Optional[int]]:
+        """The accumulated binary split state (terms, P, Q, T) covering terms [0, terms), for verification."""
+        return self._terms, self._P, self._Q, self._T
+
+    def pop_stats(self) -> Dict[str, float]:
+        """
+        Statistics of the calculations since the last call, for metrics.
+
+        Returns:
+            Seconds spent per phase: "split" (binary split of the new terms), "merge" (into the accumulated
+            state), "division", "stringify" and "checkpoint" (disk reads and writes), plus the busy fraction of the pool during the last pooled
+            split as "pool_utilization". Phases that didn't run are missing.
+        """
+        stats, self._stats = self._stats, {}
+        return stats
+
+    @property
+    def workers(self) -> int:
+        """Configured size of the process pool."""
+        return self._pool_size
+
+    def set_parallelism(self, workers: Optional[int] = None, pooled_merge: bool = True):
+        """
+        Limit the process pool of the next splits, to lower their memory peak.
+
+        Args:
+            workers: Pool workers to use, at most the configured size (None = all of them)
+            pooled_merge: Spread the products of the top merge over the pool, which copies its operands
+                to the workers, rather than merging in this process
+        """
+        workers = min(self._pool_size, workers or self._pool_size)
+        if workers != self._workers:
+            self.shutdown()  # started again with the new size on the next split
+            self._workers = workers
+        self._pooled_merge = pooled_merge
+
+    def estimate_peak_bytes(self, decimal_places: int, workers: Optional[int] = None,
+                            pooled_merge: Optional[bool] = None) -> int:
+        """
+        Estimate how much memory calculating to `decimal_places` adds at its peak, in this process and the pool
+        workers, on top of what the calculator already holds.
+
+        Args:
+            decimal_places: Decimal places of the calculation
+            workers: Pool workers it would use (None = the current setting)
+            pooled_merge: Whether the top merge would run in the pool (None = the current setting)
+
+        Returns:
+            Bytes, 0 if the cached result already covers the decimal places
+        """
+        workers = min(self._pool_size, workers or self._workers)
+        pooled_merge = self._pooled_merge if pooled_merge is None else pooled_merge
+
+        n = self._terms_needed(decimal_places + GUARD_DIGITS)
+        if n > self._terms:
+            n = max(n, self._terms + self._terms // TERMS_GROWTH_DIVISOR)
+        elif self._pi is not None and decimal_places <= self._pi_decimal_places:
+            return 0
+        n = max(n, self._terms)
+
+        total = state_bytes(n)
+        new = total - state_bytes(self._terms)
+        digits = self._max_decimal_places(n)
+        new_digits = digits - max(self._pi_decimal_places, 0)
+        digit_bytes = int(digits * DIGIT_BYTES)
+
+        # kept after the step: the state of the new terms, the new digits and the conversion's powers of ten
+        kept = new + new_digits + int(CONVERTER_FACTOR * new_digits * DIGIT_BYTES)
+
+        if workers == 1 or n - self._terms <= 32:
+            split = new  # the two halves of the top of the recursion
+        else:
+            # the results of the workers, their pickled copies in this process and the trees in the workers
+            split = 2 * new
+            if pooled_merge:
+                split += new  # the operands of the top merge copied to the workers
+            if self._executor is None:
+                split += workers * WORKER_PROCESS_BYTES
+        merge = total + total // 2  # the result, while the operands are alive, and a partial product
+        division = DIVISION_FACTOR * digit_bytes
+        stringify = digit_bytes + digits  # the fixed-point result and the copy of the string it's appended to
+        return kept + max(split, merge, division, stringify)
+
+    def worker_pids(self) -> List[int]:
+        """Process ids of the running pool workers, to track their memory."""
+        if self._executor is None:
+            return []
+        # the executor doesn't expose its processes, they are only needed to measure and stop them
+        return list(self._executor._processes or {})
+
+    def terminate_workers(self):
+        """Kill the pool workers, a split in progress raises BrokenProcessPool and the next one starts a new pool."""
+        for pid in self.worker_pids():
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def _add_time(self, phase: str, started: float):
+        self._stats[phase] = self._stats.get(phase, 0.0) + time.perf_counter() - started
+
+    def _prepare(self, decimal_places: int):
+        """Make sure the cached result covers `decimal_places`."""
         self.dps = decimal_places
-        mpmath.mp.dps = self.dps + 10  # extra digits for accuracy
-        n = self._terms_needed(self.dps)
+        n = self._terms_needed(self.dps + GUARD_DIGITS)
+
+        if n > self._terms:
+            # grow geometrically so a run of increasing precisions only recomputes the final division a few times
+            self._extend_terms(max(n, self._terms + self._terms // TERMS_GROWTH_DIVISOR))
+
+        # same term count as before, just re-round the existing result
+        if self._pi is None or self.dps > self._pi_decimal_places:
+            self._update_pi(self._max_decimal_places(self._terms) - GUARD_DIGITS)
+
+    def _update_pi(self, decimal_places: int):
+        """Recompute pi from the accumulated terms and extend the cached string with only the new digits."""
+        digits = decimal_places + GUARD_DIGITS
+        started = time.perf_counter()
+        pi = self._fixed_point_pi(digits)  # "3" followed by `digits` digits, the guard digits are never formatted
+        self._add_time("division", started)
 
-        P, Q, T = self._parallel_binary_split(0, n)
+        started = time.perf_counter()
+        if self._pi is None:
+            pi_str = self._converter.digit_range(pi, digits + 1, 0, decimal_places + 1)
+            self._pi = pi_str[:1] + "." + pi_str[1:]
+        else:
+            # digits up to the previous precision don't change, only convert the new ones
+            self._pi += self._converter.digit_range(pi, digits + 1, self._pi_decimal_places + 1, decimal_places + 1)
+        self._add_time("stringify", started)
+
+        self._pi_decimal_places = decimal_places
+
+    def _fixed_point_pi(self, digits: int) -> int:
+        """Compute pi = C * Q / T from the accumulated terms as an integer scaled by 10^digits."""
+        mpmath.mp.dps = digits + 10  # extra digits for accuracy
 
         C = 426880 * mpmath.sqrt(10005)
-        pi = C * Q / T
+        pi = C * mpmath.mpf(self._Q) / mpmath.mpf(self._T)
 
-        return str(+pi)[:self.dps + 2]  # round and slice to desired length
+        return int(pi * mpmath.mpf(10) ** digits)
 
     def _terms_needed(self, decimal_places: int) -> int:
         """
@@ -25,63 +245,183 @@ class PiCalculator:
         By calculating only the necessary number of terms, the function prevents wasting computational resources on excessive calculations.
         The +1 is added to ensure that the number of terms is sufficient to achieve the desired precision.
         """
-        return int(decimal_places / 14.1816474627254776555) + 1
+        return int(decimal_places / DIGITS_PER_TERM) + 1
+
+    def _max_decimal_places(self, terms: int) -> int:
+        """Largest number of decimal places for which `_terms_needed` is still `terms`."""
+        return math.ceil(terms * DIGITS_PER_TERM) - 1
+
+    def _extend_terms(self, n: int):
+        """Grow the accumulated state from [0, self._terms) to [0, n) by merging only the new range."""
+        if self._terms == 0 and self._checkpoint is not None:
+            self._resume()
+            if self._terms >= n:
+                return
 
-    def _split_task(self, a, b):
-        mpmath.mp.dps = self.dps + 10  # reset in subprocess
-        return self._binary_split(a, b)
+        started = time.perf_counter()
+        P2, Q2, T2 = self._parallel_binary_split(self._terms, n)
+        self._add_time("split", started)
+
+        if self._terms == 0:
+            self._P, self._Q, self._T = P2, Q2, T2
+        elif self._checkpoint is not None and self._checkpoint.out_of_core(self._T):
+            started = time.perf_counter()
+            operands = [self._P, self._Q, self._T, P2, Q2, T2]
+            # drop every other reference so the operands only live on disk during the merge
+            self._P = self._Q = self._T = P2 = Q2 = T2 = None
+            try:
+                self._P, self._Q, self._T = self._checkpoint.merge(operands)
+            except BaseException:
+                # the state is gone, start over (from the last checkpoint) next time
+                self._terms, self._pi, self._pi_decimal_places = 0, None, -1
+                raise
+            self._add_time("merge", started)
+        else:
+            started = time.perf_counter()
+            self._P, self._Q, self._T = self._merge((self._P, self._Q, self._T), (P2, Q2, T2))
+            self._add_time("merge", started)
+
+        self._terms = n
+
+        if self._checkpoint is not None:
+            started = time.perf_counter()
+            try:
+                if self._checkpoint.save(n, self._P, self._Q, self._T):
+                    self._add_time("checkpoint", started)
+            except OSError as e:
+                # e.g. a full disk, the calculation goes on without the checkpoint
+                logger.warning(f"Could not checkpoint the binary split of {n} terms: {str(e)}")
+
+    def _resume(self):
+        """Start from the largest checkpointed state, if there is one, even past the terms asked for."""
+        started = time.perf_counter()
+        saved = self._checkpoint.load()
+        if saved is not None:
+            self._terms, self._P, self._Q, self._T = saved
+            self._add_time("checkpoint", started)
+            logger.info(f"Resumed the binary split from the checkpoint of {self._terms} terms")
+
+    def _get_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self._workers)
+        return self._executor
+
+    def shutdown(self):
+        """Shut down the worker pool, a new one is created if the calculator is used again."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
 
     def _parallel_binary_split(self, a: int, b: int):
         threshold = 32  # don't parallelize small ranges
 
-        if b - a <= threshold:
+        if self._split is not None:
+            split = self._split(a, b)
+            if split is not None:
+                return split
+        if b - a <= threshold or self._workers == 1:
             return self._binary_split(a, b)
 
-        mid = (a + b) // 2
+        try:
+            return self._pooled_binary_split(a, b, threshold)
+        except BrokenProcessPool:
+            # a worker died (e.g. OOM killed), start with a fresh pool next time
+            self._executor = None
+            raise
+
+    def _pooled_binary_split(self, a: int, b: int, threshold: int):
+        executor = self._get_executor()
+        started = time.perf_counter()
+        busy = 0.0  # seconds the workers spent on jobs
+
+        def submit(function, *args):
+            return executor.submit(_timed, function, *args)
 
-        with concurrent.futures.ProcessPoolExecutor() as executor:
-            left = executor.submit(self._split_task, a, mid)
-            right = executor.submit(self._split_task, mid, b)
+        def result(future):
+            nonlocal busy
+            value, seconds = future.result()
+            busy += seconds
+            return value
 
-            P1, Q1, T1 = left.result()
-            P2, Q2, T2 = right.result()
+        # one leaf range per worker, then merge the results pairwise, level by level, in the pool as well.
+        # only the static methods are submitted so the accumulated state isn't pickled to the workers
+        chunks = min(self._workers, (b - a) // threshold)
+        bounds = [a + (b - a) * i // chunks for i in range(chunks + 1)]
+        level = [submit(PiCalculator._binary_split, lo, hi) for lo, hi in zip(bounds, bounds[1:])]
+
+        if not self._pooled_merge:
+            # merge in this process as the results come in, no operand is copied back to the workers
+            split = result(level[0])
+            for future in level[1:]:
+                split = self._merge(split, result(future))
+        else:
+            while len(level) > 2:
+                next_level = []
+                for i in range(0, len(level) - 1, 2):
+                    next_level.append(submit(PiCalculator._merge, result(level[i]), result(level[i + 1])))
+                if len(level) % 2:
+                    next_level.append(level[-1])
+                level = next_level
+
+            if len(level) == 1:
+                split = result(level[0])
+            else:
+                # the top merge has the largest operands, spread its products across the workers
+                (P1, Q1, T1), (P2, Q2, T2) = result(level[0]), result(level[1])
+                P = submit(PiCalculator._multiply, P1, P2)
+                Q = submit(PiCalculator._multiply, Q1, Q2)
+                T1Q2 = submit(PiCalculator._multiply, T1, Q2)
+                P1T2 = submit(PiCalculator._multiply, P1, T2)
+                split = (result(P), result(Q), result(T1Q2) + result(P1T2))
+
+        self._stats["pool_utilization"] = busy / ((time.perf_counter() - started) * self._workers)
+        return split
+
+    @staticmethod
+    def _multiply(x, y):
+        return x * y
+
+    @staticmethod
+    def _merge(left, right):
+        P1, Q1, T1 = left
+        P2, Q2, T2 = right
 
         P = P1 * P2
         Q = Q1 * Q2
         T = T1 * Q2 + P1 * T2
-
         return (P, Q, T)
 
-    def _binary_split(self, a: int, b: int):
+    @staticmethod
+    def _binary_split(a: int, b: int):
         if b - a == 1:
             k = a
             if k == 0:
-                P = Q = mpmath.mpf(1)
+                P = Q = MPZ(1)
             else:
-                P = mpmath.mpf((6*k - 5) * (2*k - 1) * (6*k - 1))
-                Q = mpmath.mpf(k**3 * 640320**3 // 24)
+                P = MPZ((6*k - 5) * (2*k - 1) * (6*k - 1))
+                Q = MPZ(k**3 * 640320**3 // 24)
             T = P * (13591409 + 545140134 * k)
             if k % 2:
                 T = -T
             return (P, Q, T)
         else:
             m = (a + b) // 2
-            P1, Q1, T1 = self._binary_split(a, m)
-            P2, Q2, T2 = self._binary_split(m, b)
+            P1, Q1, T1 = PiCalculator._binary_split(a, m)
+            P2, Q2, T2 = PiCalculator._binary_split(m, b)
 
             P = P1 * P2
             Q = Q1 * Q2
             T = T1 * Q2 + P1 * T2
             return (P, Q, T)
-    
+
     def verify_accuracy(self, calculated_pi: str, decimal_places: int) -> bool:
         """
         Verify the accuracy of the calculated pi value by comparing with mpmath's pi.
-        
+
         Args:
             calculated_pi: The calculated value of pi
             decimal_places: Number of decimal places to verify
-            
+
         Returns:
             True if the calculated value matches mpmath's pi to the specified decimal places
         """
@@ -99,9 +439,9 @@ class PiCalculator:
                     match_length += 1
                 else:
                     break
-                
+
             # Subtract 2 to account for "3." at the beginning
             matching_decimals = match_length - 2 if match_length >= 2 else 0
             print(f"Matching decimal places: {matching_decimals} of {decimal_places} requested")
 
-        return calculated_pi == reference_pi
\ No newline at end of file
+        return calculated_pi == reference_pi
@@ -0,0 +1,211 @@
+import io
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+from mpmath.libmp import MPZ
+
+logger = logging.getLogger(__name__)
+
+# (P, Q, T) binary split states are stored as three little-endian lengths followed by the signed
+# big-endian integers, the same on disk and in the distributed split jobs
+RESULT_HEADER = struct.Struct("<QQQ")
+
+# checkpoint files start with a magic, the number of terms [0, terms) and the CRC-32 of the rest
+CHECKPOINT_MAGIC = b"PQT1"
+CHECKPOINT_HEADER = struct.Struct("<4sQI")
+
+
+def _lengths(P: int, Q: int, T: int) -> Tuple[int, int, int]:
+    return tuple(int(x).bit_length() // 8 + 1 for x in (P, Q, T))
+
+
+def write_split(file: BinaryIO, P: int, Q: int, T: int) -> int:
+    """
+    Write a (P, Q, T) binary split state, one integer at a time.
+
+    Returns:
+        CRC-32 of the bytes written
+    """
+    lengths = _lengths(P, Q, T)
+    header = RESULT_HEADER.pack(*lengths)
+    file.write(header)
+    crc = zlib.crc32(header)
+    for x, length in zip((P, Q, T), lengths):
+        part = int(x).to_bytes(length, "big", signed=True)
+        file.write(part)
+        crc = zlib.crc32(part, crc)
+    return crc
+
+
+def encode_split(P: int, Q: int, T: int) -> bytes:
+    """Serialize a (P, Q, T) binary split state."""
+    buffer = io.BytesIO()
+    write_split(buffer, P, Q, T)
+    return buffer.getvalue()
+
+
+def decode_split(data: Union[bytes, memoryview, mmap.mmap], offset: int = 0) -> Tuple[int, int, int]:
+    """
+    Deserialize a (P, Q, T) binary split state from encode_split, without copying the bytes.
+
+    Args:
+        data: The encoded state, e.g. a memory-mapped file
+        offset: Where it starts in `data`
+    """
+    lengths = RESULT_HEADER.unpack_from(data, offset)
+    values = []
+    offset += RESULT_HEADER.size
+    with memoryview(data) as view:
+        for length in lengths:
+            values.append(MPZ(int.from_bytes(view[offset:offset + length], "big", signed=True)))
+            offset += length
+    return values[0], values[1], values[2]
+
+
+def out_of_core_merge(operands: List[int], directory: str) -> Tuple[int, int, int]:
+    """
+    Merge (P1, Q1, T1) and (P2, Q2, T2) like PiCalculator._merge, with the operands memory-mapped from disk.
+
+    The six operands are spilled to a temporary file and only the two of each product are loaded, so the peak
+    memory is about the result plus two operands instead of all of them plus the result.
+
+    Args:
+        operands: [P1, Q1, T1, P2, Q2, T2], emptied once they are on disk: the caller must not keep references
+        directory: Where the temporary file is created
+
+    Returns:
+        The merged (P, Q, T)
+    """
+    with tempfile.TemporaryFile(dir=directory, prefix="pqt_merge_") as spill:
+        offsets = []
+        for x in operands:
+            offsets.append(spill.tell())
+            write_split(spill, x, 0, 0)
+        operands.clear()
+        spill.flush()
+
+        with mmap.mmap(spill.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            def load(index: int) -> int:
+                return decode_split(mapped, offsets[index])[0]
+
+            T = load(2) * load(4)
+            T += load(0) * load(5)
+            P = load(0) * load(3)
+            Q = load(1) * load(4)
+    return P, Q, T
+
+
+class SplitCheckpoint:
+    """
+    Keeps the accumulated binary split state of a calculator on disk.
+
+    The state of the terms [0, n) is written to `pqt_<n>.bin` at most every `interval` seconds, replacing the
+    previous one, and a restarted calculator resumes from it instead of splitting the terms again. Merges of
+    states larger than `out_of_core_bytes` run with memory-mapped operands in the same directory.
+    """
+
+    def __init__(self, directory: str, interval: float = 60.0, out_of_core_bytes: int = 0):
+        """
+        Initialize SplitCheckpoint.
+
+        Args:
+            directory: Where the checkpoints are kept, created if missing
+            interval: Least seconds between two checkpoints (0 = after every step)
+            out_of_core_bytes: Size of the largest operand from which merges run out-of-core (0 = never)
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._interval = interval
+        self._out_of_core_bytes = out_of_core_bytes
+        self._saved_at: Optional[float] = None
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    def _path(self, terms: int) -> str:
+        return os.path.join(self._directory, f"pqt_{terms}.bin")
+
+    def _saved_terms(self) -> List[int]:
+        """Term counts of the checkpoints in the directory, largest first."""
+        terms = []
+        for name in os.listdir(self._directory):
+            if name.startswith("pqt_") and name.endswith(".bin") and name[4:-4].isdigit():
+                terms.append(int(name[4:-4]))
+        return sorted(terms, reverse=True)
+
+    def save(self, terms: int, P: int, Q: int, T: int, force: bool = False) -> bool:
+        """
+        Write the state of the terms [0, terms) unless the last checkpoint is more recent than the interval.
+
+        Smaller checkpoints are replaced, larger ones are kept for the next resume.
+
+        Args:
+            terms: Number of terms of the state
+            P, Q, T: The state
+            force: Write it whatever the interval
+
+        Returns:
+            Whether it was written
+        """
+        now = time.monotonic()
+        if not force and self._saved_at is not None and now - self._saved_at < self._interval:
+            return False
+
+        path = self._path(terms)
+        with tempfile.NamedTemporaryFile(dir=self._directory, prefix="pqt_", suffix=".tmp", delete=False) as file:
+            try:
+                file.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, terms, 0))
+                crc = write_split(file, P, Q, T)
+                file.seek(0)
+                file.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, terms, crc))
+                file.flush()
+                os.fsync(file.fileno())
+            except BaseException:
+                os.unlink(file.name)
+                raise
+        os.replace(file.name, path)  # a crash while writing leaves the previous checkpoint intact
+
+        for previous in self._saved_terms():
+            if previous < terms:
+                os.unlink(self._path(previous))
+        self._saved_at = now
+        return True
+
+    def load(self) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Read the largest valid checkpoint, extra terms are as good a state as the ones asked for.
+
+        Returns:
+            (terms, P, Q, T) or None if there is no valid one
+        """
+        for terms in self._saved_terms():
+            try:
+                with open(self._path(terms), "rb") as file, \
+                        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    magic, saved_terms, crc = CHECKPOINT_HEADER.unpack_from(mapped)
+                    if magic != CHECKPOINT_MAGIC or saved_terms != terms:
+                        raise ValueError("not a checkpoint of this state")
+                    with memoryview(mapped) as view:
+                        if zlib.crc32(view[CHECKPOINT_HEADER.size:]) != crc:
+                            raise ValueError("checksum mismatch")
+                    P, Q, T = decode_split(mapped, CHECKPOINT_HEADER.size)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"Skipping the binary split checkpoint of {terms} terms: {str(e)}")
+                continue
+            return terms, P, Q, T
+        return None
+
+    def out_of_core(self, operand: int) -> bool:
+        """Whether merging operands the size of `operand` should run out-of-core."""
+        return 0 < self._out_of_core_bytes <= int(operand).bit_length() // 8
+
+    def merge(self, operands: List[int]) -> Tuple[int, int, int]:
+        """Out-of-core merge of [P1, Q1, T1, P2, Q2, T2] in the checkpoint directory, see out_of_core_merge."""
+        return out_of_core_merge(operands, self._directory)
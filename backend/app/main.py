@@ -1,13 +1,15 @@
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 import uvicorn
 
+from app.api.instrumentation import RequestMetricsMiddleware
 from app.api.routes import router
-from app.api.dependencies import limiter, pi_service
+from app.api.dependencies import hex_digit_service, leader_election, limiter, pi_service
 from app.config import settings
 
 # Configure logging
@@ -26,7 +28,14 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     logger.info("Starting Pi calculation service...")
-    pi_service.start_calculation()
+    if settings.PI_CALCULATION_MODE == "worker":
+        logger.info("Pi is calculated by the worker process, serving only")
+    elif settings.LEADER_ELECTION_ENABLED:
+        # calculates only once this process holds the lease
+        leader_election.start()
+    else:
+        pi_service.start_calculation()
+    pi_service.start_update_listener()
     logger.info(f"Maximum decimal places: {settings.MAX_DECIMAL_POINTS}")
     logger.info("Application startup complete")
     
@@ -34,7 +43,11 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Stopping Pi calculation service...")
+    if settings.PI_CALCULATION_MODE == "thread" and settings.LEADER_ELECTION_ENABLED:
+        leader_election.stop()
     pi_service.stop_calculation()
+    await pi_service.close()
+    hex_digit_service.shutdown()
     logger.info("Application shutdown complete")
 
 # Create FastAPI app
@@ -55,6 +68,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Record request metrics, outermost so the compression and the rate limiter are included
+if settings.METRICS_ENABLED:
+    app.add_middleware(RequestMetricsMiddleware)
+
 # Add rate limiter
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -67,5 +84,11 @@ async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus metrics of this process."""
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -0,0 +1,109 @@
+import asyncio
+import functools
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Prometheus metrics, served at /metrics. Each process (API worker or calculation worker) keeps its own,
+# so scrape every one of them. Labels are resolved once where possible, an observation is then a
+# lock and an add, cheap enough for every step, Redis call and request.
+
+# seconds, from a sub-millisecond step at low precision up to minutes for the largest ones
+STEP_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+# seconds, Redis round trips and request handling
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# bytes, the Pi payload grows from a few bytes to the whole precision
+SIZE_BUCKETS = tuple(10.0 ** exponent for exponent in range(2, 10))
+
+CALCULATION_PHASE_SECONDS = Histogram(
+    "pi_calculation_phase_seconds",
+    "Time spent per phase of the Pi calculation: split, merge, division, stringify and checkpoint",
+    ["phase"],
+    buckets=STEP_BUCKETS,
+)
+CALCULATION_STEP_SECONDS = Histogram(
+    "pi_calculation_step_seconds",
+    "Time per precision step, including caching and verification",
+    buckets=STEP_BUCKETS,
+)
+DECIMAL_PLACES = Gauge("pi_decimal_places", "Decimal places calculated by this process")
+DECIMAL_PLACES_GROWTH_RATE = Gauge(
+    "pi_decimal_places_growth_rate",
+    "Decimal places added per second, averaged over the steps of the last GROWTH_RATE_WINDOW (5) seconds",
+)
+POOL_UTILIZATION = Gauge(
+    "pi_worker_pool_utilization",
+    "Busy fraction of the binary split process pool during the last pooled split",
+)
+VERIFICATION_CHECKS = Counter("pi_verification_checks_total", "Checks of the calculated Pi", ["check", "result"])
+DISTRIBUTED_SPLIT_JOBS = Gauge("pi_distributed_split_jobs", "Leaf jobs of the running distributed split", ["state"])
+DISTRIBUTED_SPLIT_RETRIES = Counter(
+    "pi_distributed_split_retries_total",
+    "Distributed split jobs requeued after their worker stopped renewing the lease",
+)
+MEMORY_BUDGET_BYTES = Gauge("pi_memory_budget_bytes", "Memory budget of the calculation, 0 without one")
+MEMORY_ESTIMATED_PEAK_BYTES = Gauge(
+    "pi_memory_estimated_peak_bytes",
+    "Estimated peak RSS of the calculating process and its pool workers during the next step",
+)
+MEMORY_PEAK_RSS_BYTES = Gauge(
+    "pi_memory_peak_rss_bytes",
+    "Measured peak RSS of the calculating process and its pool workers during the last step",
+)
+MEMORY_ADAPTATIONS = Counter(
+    "pi_memory_adaptations_total",
+    "Steps adapted to the memory budget: fewer_workers, serial_merge, pause or abort",
+    ["action"],
+)
+
+REDIS_OPERATION_SECONDS = Histogram(
+    "pi_redis_operation_seconds",
+    "Latency of the Redis repository calls",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+REQUEST_SECONDS = Histogram(
+    "pi_http_request_duration_seconds",
+    "Time to handle an API request, until the last body byte is sent",
+    ["route", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE_BYTES = Histogram(
+    "pi_http_response_size_bytes",
+    "Size of the API response bodies, after compression",
+    ["route", "encoding"],
+    buckets=SIZE_BUCKETS,
+)
+
+
+def time_redis(operation: str):
+    """
+    Decorator observing the duration of a repository method in REDIS_OPERATION_SECONDS.
+
+    Args:
+        operation: Label of the method, the sync and async repositories share them
+    """
+    histogram = REDIS_OPERATION_SECONDS.labels(operation)
+
+    def decorator(function):
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+
+    return decorator
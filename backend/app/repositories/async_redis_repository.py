@@ -0,0 +1,185 @@
+import redis.asyncio as aioredis
+from typing import AsyncIterator, Literal, Optional, Tuple
+import logging
+
+from app.libs.digit_codec import packed_byte_range, unpack_digits, unpack_window
+from app.metrics import time_redis
+
+logger = logging.getLogger(__name__)
+
+# Raises the decimal places requested on demand, never lowers them.
+# KEYS: request key; ARGV: decimal places
+REQUEST_DECIMAL_PLACES_SCRIPT = """
+local requested = tonumber(redis.call('GET', KEYS[1]) or '-1')
+if tonumber(ARGV[1]) > requested then
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+class AsyncRedisRepository:
+    """Non-blocking repository for retrieving Pi values from Redis on the request path."""
+
+    def __init__(self, redis_url: str, max_connections: int = 50, pool_timeout: float = 5.0,
+                 encoding: Literal["ascii", "packed"] = "ascii"):
+        """
+        Initialize async Redis repository.
+
+        Args:
+            redis_url: Redis connection URL
+            max_connections: Max number of connections in the pool
+            pool_timeout: Seconds a request waits for a free connection before failing
+            encoding: How the digits are stored, must match the RedisRepository writing them
+        """
+        self._pool = aioredis.BlockingConnectionPool.from_url(
+            redis_url,
+            max_connections=max_connections,
+            timeout=pool_timeout,
+        )
+        self._redis = aioredis.Redis(connection_pool=self._pool)
+        self._encoding = encoding
+        self._pi_key = "pi_value" if encoding == "ascii" else "pi_value_packed"
+        self._dp_key = "pi_decimal_places"
+        self._updates_channel = "pi_updates"
+        self._request_key = "pi_on_demand_request"
+        self._request_script = self._redis.register_script(REQUEST_DECIMAL_PLACES_SCRIPT)
+
+    async def is_connected(self) -> bool:
+        """Check if Redis connection is established."""
+        try:
+            return await self._redis.ping()
+        except:
+            return False
+
+    @time_redis("get_cached_pi")
+    async def get_cached_pi(self) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Get the cached Pi value and decimal places.
+
+        Returns:
+            Tuple of (pi_value, decimal_places) or (None, None) if not found
+        """
+        try:
+            # Create a pipeline to ensure atomic operation
+            async with self._redis.pipeline() as pipe:
+                pipe.get(self._pi_key)
+                pipe.get(self._dp_key)
+                pi_value, decimal_places_str = await pipe.execute()
+
+            if pi_value is None or decimal_places_str is None:
+                return None, None
+
+            # Convert bytes to string if necessary
+            if isinstance(decimal_places_str, bytes):
+                decimal_places_str = decimal_places_str.decode('utf-8')
+            decimal_places = int(decimal_places_str)
+            if self._encoding == "packed":
+                pi_value = "3." + unpack_digits(pi_value, decimal_places)
+            elif isinstance(pi_value, bytes):
+                pi_value = pi_value.decode('utf-8')
+
+            return pi_value, decimal_places
+        except Exception as e:
+            logger.error(f"Error retrieving cached Pi: {str(e)}")
+            return None, None
+
+    @time_redis("get_pi_digits")
+    async def get_pi_digits(self, start: Optional[int], length: int) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Get a window of the cached Pi digits without reading the whole value.
+
+        Args:
+            start: First decimal place to return (1-based), or None for the last `length` digits
+            length: Number of digits to return
+
+        Returns:
+            Tuple of (digits, decimal_places) or (None, None) if not found.
+            The digits may be shorter than `length` when the window goes past the cached decimal places.
+        """
+        try:
+            if self._encoding == "packed":
+                first, last = (-(length // 2 + 1), -1) if start is None else packed_byte_range(start, length)
+            elif start is None:
+                first, last = -length, -1
+            else:
+                # "3." comes before the first decimal place
+                first, last = start + 1, start + length
+
+            # Create a pipeline to ensure atomic operation
+            async with self._redis.pipeline() as pipe:
+                pipe.getrange(self._pi_key, first, last)
+                pipe.get(self._dp_key)
+                digits, decimal_places_str = await pipe.execute()
+
+            if decimal_places_str is None:
+                return None, None
+
+            if isinstance(decimal_places_str, bytes):
+                decimal_places_str = decimal_places_str.decode('utf-8')
+            decimal_places = int(decimal_places_str)
+            if self._encoding == "packed":
+                return unpack_window(digits, start, length, decimal_places), decimal_places
+
+            if isinstance(digits, bytes):
+                digits = digits.decode('utf-8')
+            # a tail window longer than the value also covers "3."
+            if start is None:
+                digits = digits.rpartition(".")[2]
+
+            return digits, decimal_places
+        except Exception as e:
+            logger.error(f"Error retrieving Pi digits: {str(e)}")
+            return None, None
+
+    @time_redis("get_decimal_places")
+    async def get_decimal_places(self) -> Optional[int]:
+        """
+        Get the current cached decimal places.
+
+        Returns:
+            Number of decimal places or None if not found
+        """
+        try:
+            dp_str = await self._redis.get(self._dp_key)
+            if dp_str is None:
+                return None
+
+            if isinstance(dp_str, bytes):
+                dp_str = dp_str.decode('utf-8')
+
+            return int(dp_str)
+        except Exception as e:
+            logger.error(f"Error retrieving decimal places: {str(e)}")
+            return None
+
+    @time_redis("request_decimal_places")
+    async def request_decimal_places(self, decimal_places: int):
+        """
+        Ask the calculating worker process to calculate `decimal_places` with its next step, if it isn't past them.
+
+        Args:
+            decimal_places: Number of decimal places requested on demand
+
+        Raises:
+            redis.RedisError: If the request can't be written
+        """
+        await self._request_script(keys=[self._request_key], args=[decimal_places])
+
+    async def listen_for_updates(self) -> AsyncIterator[int]:
+        """
+        Subscribe to the decimal places published after every write.
+
+        Yields:
+            The new number of decimal places, until the subscription fails
+        """
+        async with self._redis.pubsub() as pubsub:
+            await pubsub.subscribe(self._updates_channel)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                yield int(message["data"])
+
+    async def close(self):
+        """Close the connections in the pool."""
+        await self._redis.close()
+        await self._pool.disconnect()
@@ -1,22 +1,98 @@
 import redis
-from typing import Optional, Tuple
+from typing import Literal, Optional, Tuple
 import logging
 
+from app.libs.digit_codec import pack_digits, packed_byte_range, packed_size, unpack_digits, unpack_window
+from app.metrics import time_redis
+
 logger = logging.getLogger(__name__)
 
+# Writes are fenced by the calculation lease: with a lease token set, a process that lost the lease
+# (e.g. after a long pause) can no longer overwrite what the new leader wrote.
+# An empty token means leader election is disabled and every write goes through.
+
+# Replaces the cached value and decimal places, and announces the new decimal places.
+# KEYS: pi key, decimal places key, lease key; ARGV: pi value, decimal places, updates channel, lease token
+CACHE_PI_SCRIPT = """
+if ARGV[4] ~= '' and redis.call('GET', KEYS[3]) ~= ARGV[4] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1])
+redis.call('SET', KEYS[2], ARGV[2])
+redis.call('PUBLISH', ARGV[3], ARGV[2])
+return 1
+"""
+
+# Appends new digits only if the cached value still ends at the expected decimal places,
+# moves the decimal places counter and announces it in the same atomic step.
+# With packed digits after an odd number of decimal places, the last stored byte holds the last digit and
+# a padding nibble: the first new byte carries the next digit in its low nibble and replaces it.
+# KEYS: pi key, decimal places key, lease key
+# ARGV: expected decimal places, new digits, new decimal places, updates channel, lease token,
+#       expected length of the stored value, "1" to fill in the padding nibble
+APPEND_PI_SCRIPT = """
+if ARGV[5] ~= '' and redis.call('GET', KEYS[3]) ~= ARGV[5] then
+    return 0
+end
+local cached_dp = redis.call('GET', KEYS[2])
+local length = tonumber(ARGV[6])
+if cached_dp ~= ARGV[1] or redis.call('STRLEN', KEYS[1]) ~= length then
+    return 0
+end
+if ARGV[7] == '1' then
+    local last = string.byte(redis.call('GETRANGE', KEYS[1], -1, -1))
+    local first = string.byte(ARGV[2], 1)
+    redis.call('SETRANGE', KEYS[1], length - 1, string.char(last - last % 16 + first % 16) .. string.sub(ARGV[2], 2))
+else
+    redis.call('APPEND', KEYS[1], ARGV[2])
+end
+redis.call('SET', KEYS[2], ARGV[3])
+redis.call('PUBLISH', ARGV[4], ARGV[3])
+return 1
+"""
+
+# Extends the lease only if it is still held by the given token.
+# KEYS: lease key; ARGV: lease token, ttl in milliseconds
+RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+"""
+
+# Deletes the lease only if it is still held by the given token.
+# KEYS: lease key; ARGV: lease token
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+return redis.call('DEL', KEYS[1])
+"""
+
 class RedisRepository:
     """Repository for caching and retrieving Pi values using Redis."""
     
-    def __init__(self, redis_url: str):
+    def __init__(self, redis_url: str, encoding: Literal["ascii", "packed"] = "ascii"):
         """
         Initialize Redis repository.
         
         Args:
             redis_url: Redis connection URL
+            encoding: How the digits are stored, "ascii" ("3.14159...") or "packed" (the decimal places as
+                4-bit BCD, see app.libs.digit_codec), each under its own key
         """
         self._redis = redis.from_url(redis_url)
-        self._pi_key = "pi_value"
+        self._encoding = encoding
+        self._pi_key = "pi_value" if encoding == "ascii" else "pi_value_packed"
         self._dp_key = "pi_decimal_places"
+        self._updates_channel = "pi_updates"  # new decimal places are published here after every write
+        self._lease_key = "pi_calculation_lease"
+        self._request_key = "pi_on_demand_request"  # highest decimal places requested on demand from the worker
+        self._lease_token = ""  # fences the writes once this process takes part in leader election
+        self._cache_script = self._redis.register_script(CACHE_PI_SCRIPT)
+        self._append_script = self._redis.register_script(APPEND_PI_SCRIPT)
+        self._renew_lease_script = self._redis.register_script(RENEW_LEASE_SCRIPT)
+        self._release_lease_script = self._redis.register_script(RELEASE_LEASE_SCRIPT)
     
     def is_connected(self) -> bool:
         """Check if Redis connection is established."""
@@ -25,6 +101,7 @@ class RedisRepository:
         except:
             return False
     
+    @time_redis("cache_pi")
     def cache_pi(self, pi_value: str, decimal_places: int) -> bool:
         """
         Cache Pi value and decimal places in Redis.
@@ -34,20 +111,60 @@ class RedisRepository:
             decimal_places: Number of decimal places
         
         Returns:
-            True if successful, False otherwise
+            True if successful, False if this process doesn't hold the calculation lease or on error
         """
         try:
-            # Create a pipeline to ensure atomic operation
-            pipe = self._redis.pipeline()
-            pipe.set(self._pi_key, pi_value)
-            pipe.set(self._dp_key, str(decimal_places))
-            pipe.execute()
+            stored = pi_value if self._encoding == "ascii" else pack_digits(pi_value[2:])
+            written = self._cache_script(
+                keys=[self._pi_key, self._dp_key, self._lease_key],
+                args=[stored, str(decimal_places), self._updates_channel, self._lease_token],
+            )
+            if not written:
+                logger.warning("Not caching Pi, the calculation lease is held by another process")
+                return False
             logger.info(f"Cached Pi with {decimal_places} decimal places")
             return True
         except Exception as e:
             logger.error(f"Error caching Pi: {str(e)}")
             return False
     
+    @time_redis("append_pi")
+    def append_pi(self, digits: str, previous_decimal_places: int, decimal_places: int) -> bool:
+        """
+        Append the newly calculated digits to the cached Pi value instead of rewriting it.
+        
+        Args:
+            digits: The decimal places after `previous_decimal_places`
+            previous_decimal_places: Number of decimal places the cached value is expected to have
+            decimal_places: Number of decimal places after appending
+        
+        Returns:
+            True if successful, False if the cached value doesn't end at `previous_decimal_places`,
+            this process doesn't hold the calculation lease or on error
+        """
+        try:
+            fill_padding = False
+            if self._encoding == "ascii":
+                stored, length = digits, previous_decimal_places + 2
+            else:
+                fill_padding = previous_decimal_places % 2 == 1
+                # "0" lines the digits up so the first one lands in the low nibble of the padded byte
+                stored = pack_digits("0" + digits if fill_padding else digits)
+                length = packed_size(previous_decimal_places)
+            appended = self._append_script(
+                keys=[self._pi_key, self._dp_key, self._lease_key],
+                args=[str(previous_decimal_places), stored, str(decimal_places), self._updates_channel,
+                      self._lease_token, length, "1" if fill_padding else "0"],
+            )
+            if not appended:
+                return False
+            logger.info(f"Cached Pi with {decimal_places} decimal places")
+            return True
+        except Exception as e:
+            logger.error(f"Error appending Pi: {str(e)}")
+            return False
+    
+    @time_redis("get_cached_pi")
     def get_cached_pi(self) -> Tuple[Optional[str], Optional[int]]:
         """
         Get the cached Pi value and decimal places.
@@ -69,16 +186,68 @@ class RedisRepository:
                 return None, None
             
             # Convert bytes to string if necessary
-            if isinstance(pi_value, bytes):
-                pi_value = pi_value.decode('utf-8')
             if isinstance(decimal_places_str, bytes):
                 decimal_places_str = decimal_places_str.decode('utf-8')
+            decimal_places = int(decimal_places_str)
+            if self._encoding == "packed":
+                pi_value = "3." + unpack_digits(pi_value, decimal_places)
+            elif isinstance(pi_value, bytes):
+                pi_value = pi_value.decode('utf-8')
                 
-            return pi_value, int(decimal_places_str)
+            return pi_value, decimal_places
         except Exception as e:
             logger.error(f"Error retrieving cached Pi: {str(e)}")
             return None, None
     
+    @time_redis("get_pi_digits")
+    def get_pi_digits(self, start: Optional[int], length: int) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Get a window of the cached Pi digits without reading the whole value.
+        
+        Args:
+            start: First decimal place to return (1-based), or None for the last `length` digits
+            length: Number of digits to return
+        
+        Returns:
+            Tuple of (digits, decimal_places) or (None, None) if not found.
+            The digits may be shorter than `length` when the window goes past the cached decimal places.
+        """
+        try:
+            if self._encoding == "packed":
+                first, last = (-(length // 2 + 1), -1) if start is None else packed_byte_range(start, length)
+            elif start is None:
+                first, last = -length, -1
+            else:
+                # "3." comes before the first decimal place
+                first, last = start + 1, start + length
+
+            # Create a pipeline to ensure atomic operation
+            pipe = self._redis.pipeline()
+            pipe.getrange(self._pi_key, first, last)
+            pipe.get(self._dp_key)
+            digits, decimal_places_str = pipe.execute()
+            
+            if decimal_places_str is None:
+                return None, None
+            
+            if isinstance(decimal_places_str, bytes):
+                decimal_places_str = decimal_places_str.decode('utf-8')
+            decimal_places = int(decimal_places_str)
+            if self._encoding == "packed":
+                return unpack_window(digits, start, length, decimal_places), decimal_places
+            
+            if isinstance(digits, bytes):
+                digits = digits.decode('utf-8')
+            # a tail window longer than the value also covers "3."
+            if start is None:
+                digits = digits.rpartition(".")[2]
+                
+            return digits, decimal_places
+        except Exception as e:
+            logger.error(f"Error retrieving Pi digits: {str(e)}")
+            return None, None
+    
+    @time_redis("get_decimal_places")
     def get_decimal_places(self) -> Optional[int]:
         """
         Get the current cached decimal places.
@@ -97,4 +266,77 @@ class RedisRepository:
             return int(dp_str)
         except Exception as e:
             logger.error(f"Error retrieving decimal places: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+    
+    @time_redis("get_requested_decimal_places")
+    def get_requested_decimal_places(self) -> Optional[int]:
+        """
+        Get the highest decimal places the API processes requested on demand, see
+        AsyncRedisRepository.request_decimal_places.
+        
+        Returns:
+            Number of decimal places or None if none was requested
+        """
+        try:
+            dp_str = self._redis.get(self._request_key)
+            if dp_str is None:
+                return None
+            
+            if isinstance(dp_str, bytes):
+                dp_str = dp_str.decode('utf-8')
+                
+            return int(dp_str)
+        except Exception as e:
+            logger.error(f"Error retrieving requested decimal places: {str(e)}")
+            return None
+    
+    def use_lease(self, token: str):
+        """
+        Fence the writes with a calculation lease token, so they only go through while it holds the lease.
+        
+        Args:
+            token: Token this process acquires the lease with
+        """
+        self._lease_token = token
+    
+    @time_redis("acquire_lease")
+    def acquire_lease(self, ttl_ms: int) -> bool:
+        """
+        Take the calculation lease if nobody holds it.
+        
+        Args:
+            ttl_ms: Milliseconds until the lease expires unless renewed
+        
+        Returns:
+            True if this process now holds the lease, False otherwise
+        """
+        try:
+            return bool(self._redis.set(self._lease_key, self._lease_token, nx=True, px=ttl_ms))
+        except Exception as e:
+            logger.error(f"Error acquiring the calculation lease: {str(e)}")
+            return False
+    
+    @time_redis("renew_lease")
+    def renew_lease(self, ttl_ms: int) -> bool:
+        """
+        Extend the calculation lease held by this process.
+        
+        Args:
+            ttl_ms: Milliseconds until the lease expires unless renewed again
+        
+        Returns:
+            True if the lease was extended, False if it was lost or on error
+        """
+        try:
+            return bool(self._renew_lease_script(keys=[self._lease_key], args=[self._lease_token, ttl_ms]))
+        except Exception as e:
+            logger.error(f"Error renewing the calculation lease: {str(e)}")
+            return False
+    
+    @time_redis("release_lease")
+    def release_lease(self):
+        """Give up the calculation lease so another process can take over right away."""
+        try:
+            self._release_lease_script(keys=[self._lease_key], args=[self._lease_token])
+        except Exception as e:
+            logger.error(f"Error releasing the calculation lease: {str(e)}")
@@ -0,0 +1,96 @@
+import logging
+import mmap
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# bytes checked per step when validating the file, so validation doesn't load it whole
+VALIDATION_CHUNK_SIZE = 1 << 20
+
+
+class ReferenceRepository:
+    """Repository for reading Pi from a trusted reference file ("3.14159..."), memory-mapped instead of loaded."""
+
+    def __init__(self, path: str):
+        """
+        Initialize reference repository.
+
+        Args:
+            path: Path of the reference file, opened on first use
+        """
+        self._path = path
+        self._map: Optional[mmap.mmap] = None
+        self._decimal_places: Optional[int] = None
+        self._opened = False
+
+    @property
+    def path(self) -> str:
+        """Path of the reference file."""
+        return self._path
+
+    def get_decimal_places(self) -> Optional[int]:
+        """
+        Get the number of decimal places in the reference file.
+
+        Returns:
+            Number of decimal places or None if the file is missing or invalid
+        """
+        if not self._opened:
+            self._open()
+        return self._decimal_places
+
+    def get_pi(self, decimal_places: int) -> Optional[str]:
+        """
+        Get Pi up to the given decimal places from the reference file.
+
+        Args:
+            decimal_places: Number of decimal places, at most get_decimal_places()
+
+        Returns:
+            The Pi value ("3.14159...") or None if the file doesn't have that many decimal places
+        """
+        available = self.get_decimal_places()
+        if available is None or decimal_places > available:
+            return None
+        return str(self._map[:decimal_places + 2], "ascii")
+
+    def get_pi_digits(self, start: int, length: int) -> Optional[str]:
+        """
+        Get a window of decimal places from the reference file.
+
+        Args:
+            start: First decimal place to return (1-based)
+            length: Number of digits to return
+
+        Returns:
+            The digits, shorter than `length` past the end of the file, or None if the file is missing or invalid
+        """
+        available = self.get_decimal_places()
+        if available is None:
+            return None
+        # "3." comes before the first decimal place
+        return str(self._map[start + 1:min(start + 1 + length, available + 2)], "ascii")
+
+    def _open(self):
+        self._opened = True
+        try:
+            with open(self._path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error opening Pi reference file {self._path}: {str(e)}")
+            return
+
+        end = len(self._map)
+        while end > 0 and self._map[end - 1:end].isspace():
+            end -= 1
+
+        if self._map[:2] != b"3." or end < 3:
+            logger.error(f"Pi reference file {self._path} doesn't start with \"3.\" and a decimal place")
+            return
+        for offset in range(2, end, VALIDATION_CHUNK_SIZE):
+            if not self._map[offset:min(offset + VALIDATION_CHUNK_SIZE, end)].isdigit():
+                logger.error(f"Pi reference file {self._path} has characters other than digits")
+                return
+
+        self._decimal_places = end - 2
+        logger.info(f"Mapped Pi reference file {self._path} with {self._decimal_places} decimal places")
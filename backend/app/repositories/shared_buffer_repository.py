@@ -0,0 +1,143 @@
+import logging
+import mmap
+import os
+import struct
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Memory-mapped file shared by the calculating process and the API processes on the same host
+# (put it on a tmpfs such as /dev/shm to keep it in memory).
+#
+# Layout: a header of HEADER_SIZE bytes followed by the Pi value as ASCII ("3.14159...").
+# Every version is a prefix of the next one, so the digits are only ever appended and a byte that
+# was published never changes. Only the published length needs to be read consistently, which is
+# done with a sequence counter: the writer makes it odd while updating the length, readers retry
+# when it is odd or moved while they read.
+MAGIC = b"PIQ1"
+HEADER = struct.Struct("<4s4xQQ")  # magic, sequence, published length
+HEADER_SIZE = 64
+
+
+class SharedBufferRepository:
+    """Hands the latest Pi value over to the processes on this host through a memory-mapped file."""
+
+    def __init__(self, path: str, max_decimal_places: int):
+        """
+        Initialize shared buffer repository.
+
+        Args:
+            path: Path of the memory-mapped file, created by the first write
+            max_decimal_places: Max decimal places the file has to hold
+        """
+        self._path = path
+        self._capacity = max_decimal_places + 2
+        self._write_map: Optional[mmap.mmap] = None
+        self._read_map: Optional[mmap.mmap] = None
+
+    def publish(self, pi_value: str, decimal_places: int) -> bool:
+        """
+        Make a Pi value visible to the readers, unless a longer one already is.
+
+        Args:
+            pi_value: The calculated Pi value
+            decimal_places: Number of decimal places
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            if self._write_map is None:
+                self._open_for_write()
+
+            _, sequence, length = HEADER.unpack_from(self._write_map)
+            new_length = decimal_places + 2
+            if new_length <= length:
+                return True
+
+            # the digits go in before the length that makes them visible
+            self._write_map[HEADER_SIZE + length:HEADER_SIZE + new_length] = pi_value[length:new_length].encode("ascii")
+            HEADER.pack_into(self._write_map, 0, MAGIC, sequence + 1, length)
+            HEADER.pack_into(self._write_map, 0, MAGIC, sequence + 2, new_length)
+            return True
+        except Exception as e:
+            logger.error(f"Error publishing Pi to the shared buffer: {str(e)}")
+            return False
+
+    def _open_for_write(self):
+        size = HEADER_SIZE + self._capacity
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # never shrink it, readers may have mapped the whole file
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._write_map = mmap.mmap(fd, 0, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+
+        magic, _, length = HEADER.unpack_from(self._write_map)
+        if magic != MAGIC or length > len(self._write_map) - HEADER_SIZE:
+            HEADER.pack_into(self._write_map, 0, MAGIC, 0, 0)
+        logger.info(f"Publishing Pi to the shared buffer at {self._path}")
+
+    def get_pi_view(self) -> Tuple[Optional[memoryview], Optional[int]]:
+        """
+        Get the latest published Pi value without copying it.
+
+        Returns:
+            Tuple of (read-only view of the ASCII value, decimal_places) or (None, None) if nothing was published
+        """
+        try:
+            if self._read_map is None and not self._open_for_read():
+                return None, None
+
+            length = self._read_length()
+            if length < 3:
+                return None, None
+            if HEADER_SIZE + length > len(self._read_map):
+                # the file was grown for a higher max decimal places since we mapped it
+                if not self._open_for_read():
+                    return None, None
+
+            return memoryview(self._read_map)[HEADER_SIZE:HEADER_SIZE + length], length - 2
+        except Exception as e:
+            logger.error(f"Error reading Pi from the shared buffer: {str(e)}")
+            return None, None
+
+    def get_decimal_places(self) -> Optional[int]:
+        """
+        Get the latest published decimal places, without touching the digits.
+
+        Returns:
+            Number of decimal places or None if nothing was published
+        """
+        try:
+            if self._read_map is None and not self._open_for_read():
+                return None
+            length = self._read_length()
+            return length - 2 if length >= 3 else None
+        except Exception as e:
+            logger.error(f"Error reading the shared buffer: {str(e)}")
+            return None
+
+    def _open_for_read(self) -> bool:
+        try:
+            fd = os.open(self._path, os.O_RDONLY)
+        except FileNotFoundError:
+            return False  # nothing calculated on this host yet
+        try:
+            if os.fstat(fd).st_size < HEADER_SIZE:
+                return False
+            # views handed out earlier keep the previous map alive until they are released
+            self._read_map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            return True
+        finally:
+            os.close(fd)
+
+    def _read_length(self) -> int:
+        while True:
+            magic, before, length = HEADER.unpack_from(self._read_map)
+            if magic != MAGIC:
+                return 0
+            if before % 2 == 0 and HEADER.unpack_from(self._read_map)[1] == before:
+                return length
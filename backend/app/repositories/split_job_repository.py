@@ -0,0 +1,198 @@
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import redis
+
+from app.libs.split_checkpoint import decode_split
+from app.metrics import time_redis
+
+logger = logging.getLogger(__name__)
+
+# A job is the string "run:index:a:b", the terms [a, b) of leaf `index` of a distributed split.
+# Workers move it from the queue to the processing list and hold a lease on it while they compute,
+# the coordinator puts jobs whose lease expired (dead or stuck worker) back on the queue.
+
+# Takes the oldest job and leases it to the caller in one step.
+# KEYS: queue, processing list; ARGV: lease key prefix, worker id, lease ms
+CLAIM_JOB_SCRIPT = """
+local job = redis.call('RPOPLPUSH', KEYS[1], KEYS[2])
+if not job then
+    return false
+end
+redis.call('SET', ARGV[1] .. job, ARGV[2], 'PX', ARGV[3])
+return job
+"""
+
+# Puts a job back on the queue if it is still being processed and its lease expired.
+# KEYS: queue, processing list, lease key; ARGV: job
+REQUEUE_JOB_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    return 0
+end
+if redis.call('LREM', KEYS[2], 1, ARGV[1]) == 0 then
+    return 0
+end
+redis.call('RPUSH', KEYS[1], ARGV[1])  -- next to be claimed, the merge is waiting for it
+return 1
+"""
+
+
+@dataclass(frozen=True)
+class SplitJob:
+    """A leaf of a distributed split."""
+    run: str
+    index: int
+    a: int  # first term
+    b: int  # end of the terms, exclusive
+
+    @property
+    def key(self) -> str:
+        return f"{self.run}:{self.index}:{self.a}:{self.b}"
+
+    @classmethod
+    def parse(cls, key: str) -> "SplitJob":
+        run, index, a, b = key.split(":")
+        return cls(run, int(index), int(a), int(b))
+
+
+class SplitJobRepository:
+    """Repository for the Redis-backed queue of distributed binary split jobs."""
+
+    def __init__(self, redis_url: str, job_timeout: float = 30.0):
+        """
+        Initialize split job repository.
+
+        Args:
+            redis_url: Redis connection URL
+            job_timeout: Seconds a worker's lease on a job lasts without being renewed
+        """
+        self._redis = redis.from_url(redis_url)
+        self._job_timeout_ms = int(job_timeout * 1000)
+        self._queue_key = "pi_split_jobs"
+        self._processing_key = "pi_split_processing"
+        self._lease_prefix = "pi_split_lease:"
+        self._claim_script = self._redis.register_script(CLAIM_JOB_SCRIPT)
+        self._requeue_script = self._redis.register_script(REQUEUE_JOB_SCRIPT)
+
+    @property
+    def job_timeout(self) -> float:
+        """Seconds a lease on a job lasts without being renewed."""
+        return self._job_timeout_ms / 1000
+
+    def _run_key(self, run: str) -> str:
+        return f"pi_split_run:{run}"
+
+    def _results_key(self, run: str) -> str:
+        return f"pi_split_results:{run}"
+
+    @time_redis("start_split_run")
+    def start_run(self, ranges: List[Tuple[int, int]]) -> str:
+        """
+        Queue the leaves of a split.
+
+        Args:
+            ranges: Terms [a, b) of each leaf, in order
+
+        Returns:
+            Id of the run, to collect its results
+        """
+        run = uuid.uuid4().hex
+        pipe = self._redis.pipeline()
+        pipe.set(self._run_key(run), len(ranges))
+        pipe.lpush(self._queue_key, *(SplitJob(run, i, a, b).key for i, (a, b) in enumerate(ranges)))
+        pipe.execute()
+        return run
+
+    @time_redis("claim_split_job")
+    def claim_job(self, worker: str) -> Optional[SplitJob]:
+        """
+        Take the oldest queued job, leased to `worker` for the job timeout.
+
+        Returns:
+            The job or None if the queue is empty
+        """
+        key = self._claim_script(
+            keys=[self._queue_key, self._processing_key],
+            args=[self._lease_prefix, worker, self._job_timeout_ms],
+        )
+        return SplitJob.parse(key.decode()) if key else None
+
+    def renew_job(self, job: SplitJob, worker: str) -> bool:
+        """Extend the lease of a job being computed, False if it was lost."""
+        return bool(self._redis.set(self._lease_prefix + job.key, worker, xx=True, px=self._job_timeout_ms))
+
+    def is_run_active(self, run: str) -> bool:
+        """Whether the coordinator of a run still waits for its results."""
+        return bool(self._redis.exists(self._run_key(run)))
+
+    @time_redis("complete_split_job")
+    def complete_job(self, job: SplitJob, result: Optional[bytes]):
+        """
+        Store the result of a job and take it off the processing list.
+
+        Args:
+            job: The job
+            result: The (P, Q, T) from encode_split, or None to drop a job whose run has finished
+        """
+        pipe = self._redis.pipeline()
+        if result is not None:
+            pipe.hset(self._results_key(job.run), str(job.index), result)
+        pipe.lrem(self._processing_key, 1, job.key)
+        pipe.delete(self._lease_prefix + job.key)
+        pipe.execute()
+
+    @time_redis("read_split_results")
+    def read_results(self, run: str, skip: Set[int]) -> Dict[int, Tuple[int, int, int]]:
+        """
+        Read the results stored for a run, they stay stored until delete_results so none is lost to a failed read.
+
+        Args:
+            run: The run
+            skip: Leaf indexes already read
+
+        Returns:
+            Leaf index -> (P, Q, T)
+        """
+        indexes = [index for index in self._redis.hkeys(self._results_key(run)) if int(index) not in skip]
+        if not indexes:
+            return {}
+        values = self._redis.hmget(self._results_key(run), indexes)
+        return {int(index): decode_split(value) for index, value in zip(indexes, values) if value is not None}
+
+    def delete_results(self, run: str, indexes: Iterable[int]):
+        """Free the results of a run that were read."""
+        indexes = [str(index) for index in indexes]
+        if indexes:
+            self._redis.hdel(self._results_key(run), *indexes)
+
+    @time_redis("requeue_split_jobs")
+    def requeue_expired(self, run: str) -> int:
+        """
+        Put the jobs of a run whose worker stopped renewing the lease back on the queue.
+
+        Returns:
+            Number of jobs requeued
+        """
+        prefix = f"{run}:"
+        requeued = 0
+        for key in self._redis.lrange(self._processing_key, 0, -1):
+            key = key.decode()
+            if key.startswith(prefix):
+                requeued += self._requeue_script(
+                    keys=[self._queue_key, self._processing_key, self._lease_prefix + key],
+                    args=[key],
+                )
+        return requeued
+
+    @time_redis("finish_split_run")
+    def finish_run(self, run: str):
+        """Drop what is left of a run: its marker, results and the retried copies of its jobs still queued."""
+        prefix = f"{run}:".encode()
+        pipe = self._redis.pipeline()
+        for key in self._redis.lrange(self._queue_key, 0, -1):
+            if key.startswith(prefix):
+                pipe.lrem(self._queue_key, 0, key)
+        pipe.delete(self._run_key(run), self._results_key(run))
+        pipe.execute()
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+from typing import NamedTuple, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class DigitsEvent(NamedTuple):
+    """Newly published digits: decimal places `start` to `dp`."""
+    start: int
+    digits: str
+    dp: int
+
+
+class DigitBroadcaster:
+    """Fans out newly published digits to the streaming connections of this process."""
+
+    def __init__(self, max_queue_size: int = 100):
+        """
+        Initialize DigitBroadcaster.
+
+        Args:
+            max_queue_size: Events a subscriber can fall behind before it is disconnected
+        """
+        self._max_queue_size = max_queue_size
+        self._subscribers: Set["asyncio.Queue[Optional[DigitsEvent]]"] = set()
+
+    def subscribe(self) -> "asyncio.Queue[Optional[DigitsEvent]]":
+        """
+        Register a new subscriber.
+
+        Returns:
+            Queue receiving the events, None means the subscriber fell behind and should resume
+            from its last event id
+        """
+        queue: "asyncio.Queue[Optional[DigitsEvent]]" = asyncio.Queue(maxsize=self._max_queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: "asyncio.Queue[Optional[DigitsEvent]]"):
+        """Remove a subscriber."""
+        self._subscribers.discard(queue)
+
+    def has_subscribers(self) -> bool:
+        """Whether anyone is listening, so new digits only get fetched when needed."""
+        return bool(self._subscribers)
+
+    def publish(self, event: DigitsEvent):
+        """Send an event to every subscriber, disconnecting the ones that can't keep up."""
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # the events are deltas, so a subscriber that missed some must resume instead
+                logger.warning("Disconnecting a slow Pi digits subscriber")
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
@@ -0,0 +1,124 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from app.libs import bbp
+
+logger = logging.getLogger(__name__)
+
+# digits are computed and cached in aligned blocks, so requests for nearby positions share a computation
+BLOCK_DIGITS = 64
+
+# don't split a series into pool jobs of fewer terms than this
+MIN_CHUNK_TERMS = 5000
+
+
+class HexDigitServiceBusy(Exception):
+    """Raised when a request needs new blocks while the most blocks are already being computed."""
+
+
+class HexDigitService:
+    """Service for hexadecimal digits of Pi at any position, extracted with BBP over a process pool."""
+
+    def __init__(self, workers: Optional[int] = None, cache_size: int = 1024, max_pending_blocks: int = 8):
+        """
+        Initialize HexDigitService.
+
+        Args:
+            workers: Size of the process pool the series are split over, defaults to the CPU count
+            cache_size: Number of blocks of BLOCK_DIGITS digits kept in the LRU cache
+            max_pending_blocks: Most blocks computed at the same time, so a few requests far out can't queue up
+                minutes of pool work (0 = no limit)
+        """
+        self._workers = workers or os.cpu_count() or 1
+        self._max_pending_blocks = max_pending_blocks
+        self._executor = None  # created on first use
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[int, str]" = OrderedDict()  # block -> digits, least recently used first
+        self._pending: Dict[int, asyncio.Future] = {}  # blocks being computed, awaited by every request for them
+
+    async def get_hex_digits(self, position: int, count: int) -> str:
+        """
+        Get hexadecimal digits of Pi after the point.
+
+        Args:
+            position: Hexadecimal place of the first digit (1-based)
+            count: Number of digits to return
+
+        Returns:
+            `count` lowercase hexadecimal digits
+
+        Raises:
+            HexDigitServiceBusy: If its blocks would go beyond the most computed at the same time
+        """
+        first_block = (position - 1) // BLOCK_DIGITS
+        last_block = (position + count - 2) // BLOCK_DIGITS
+        new_blocks = sum(
+            1 for block in range(first_block, last_block + 1) if block not in self._cache and block not in self._pending
+        )
+        # checked before starting any of them, a request with more blocks than the limit only runs alone
+        if new_blocks and self._max_pending_blocks and self._pending \
+                and len(self._pending) + new_blocks > self._max_pending_blocks:
+            raise HexDigitServiceBusy(f"{len(self._pending)} blocks of hexadecimal digits are being computed")
+        blocks = await asyncio.gather(*(self._get_block(block) for block in range(first_block, last_block + 1)))
+
+        offset = position - 1 - first_block * BLOCK_DIGITS
+        return "".join(blocks)[offset:offset + count]
+
+    async def _get_block(self, block: int) -> str:
+        digits = self._cache.get(block)
+        if digits is not None:
+            self._cache.move_to_end(block)
+            return digits
+
+        pending = self._pending.get(block)
+        if pending is None:
+            pending = self._pending[block] = asyncio.ensure_future(self._compute_block(block))
+            pending.add_done_callback(lambda _: self._pending.pop(block, None))
+        # a cancelled request must not cancel the computation the others are waiting for
+        digits = await asyncio.shield(pending)
+
+        self._cache[block] = digits
+        self._cache.move_to_end(block)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return digits
+
+    async def _compute_block(self, block: int) -> str:
+        """Digits of a block, each series split into ranges of terms computed in parallel."""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+
+        n = block * BLOCK_DIGITS
+        bits = bbp.window_bits(n, BLOCK_DIGITS)
+        chunks = max(1, min(self._workers, (n + 1) // MIN_CHUNK_TERMS))
+        bounds = [(n + 1) * i // chunks for i in range(chunks + 1)]
+
+        try:
+            parts = {
+                j: [loop.run_in_executor(executor, bbp.series_terms, j, n, lo, hi, bits) for lo, hi in zip(bounds, bounds[1:])]
+                   + [loop.run_in_executor(executor, bbp.series_tail, j, n, bits)]
+                for j in bbp.SERIES
+            }
+            series = {j: sum(await asyncio.gather(*futures)) for j, futures in parts.items()}
+        except BrokenProcessPool:
+            # a worker died (e.g. OOM killed), start with a fresh pool next time
+            self._executor = None
+            raise
+
+        return bbp.hex_digits(series, bits, BLOCK_DIGITS)
+
+    def _get_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self._workers)
+        return self._executor
+
+    def shutdown(self):
+        """Shut down the worker pool, a new one is created if the service is used again."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,91 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from typing import Optional
+
+from app.repositories.redis_repository import RedisRepository
+from app.services.pi_service import PiService
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """
+    Elects the single process of the cluster that calculates Pi, using a lease in Redis.
+
+    The leader renews the lease every third of its TTL. When the leader dies or stops renewing it,
+    the lease expires and the next process to try takes over, resuming from the cached decimal places.
+    Every other process only serves requests.
+    """
+
+    def __init__(self, pi_service: PiService, repository: RedisRepository, lease_ttl: float = 10.0):
+        """
+        Initialize LeaderElection.
+
+        Args:
+            pi_service: The service whose calculation runs only while this process is the leader
+            repository: The repository holding the lease, its writes get fenced by the lease once started
+            lease_ttl: Seconds until the lease expires unless renewed
+        """
+        self._pi_service = pi_service
+        self._repository = repository
+        self._lease_ttl_ms = int(lease_ttl * 1000)
+        self._renew_interval = lease_ttl / 3
+        self._token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self._is_leader = False
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this process currently holds the lease."""
+        return self._is_leader
+
+    def start(self):
+        """Start competing for the lease in a background thread."""
+        if self._thread is not None:
+            return
+
+        # only fenced from here: with the election disabled nobody takes the lease and every write must go through
+        self._repository.use_lease(self._token)
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logger.info("Started leader election background thread")
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._elect()
+            except Exception as e:
+                logger.error(f"Error in leader election thread: {str(e)}")
+            self._stopped.wait(self._renew_interval)
+
+    def _elect(self):
+        """Renew the lease if we hold it, otherwise try to take it, and start or stop the calculation to match."""
+        if self._is_leader:
+            if self._repository.renew_lease(self._lease_ttl_ms):
+                return
+            # can't tell whether the lease is still ours, another process may take over once it expires
+            logger.warning("Lost the Pi calculation lease, stopping calculation")
+            self._is_leader = False
+            self._pi_service.stop_calculation()
+        elif self._repository.acquire_lease(self._lease_ttl_ms):
+            logger.info("Acquired the Pi calculation lease, starting calculation")
+            self._is_leader = True
+            self._pi_service.start_calculation()
+
+    def stop(self):
+        """Stop competing for the lease, stop the calculation and hand the lease over."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            logger.info("Stopped leader election background thread")
+
+        if self._is_leader:
+            self._is_leader = False
+            self._pi_service.stop_calculation()
+            self._repository.release_lease()
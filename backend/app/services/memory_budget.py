@@ -0,0 +1,210 @@
+import contextlib
+import logging
+import os
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from app.libs.calculator_registry import Calculator
+from app.metrics import MEMORY_ADAPTATIONS, MEMORY_BUDGET_BYTES, MEMORY_ESTIMATED_PEAK_BYTES, MEMORY_PEAK_RSS_BYTES
+
+logger = logging.getLogger(__name__)
+
+# seconds between the checks of a paused calculation, whether its next step fits the budget by now
+PAUSE_RECHECK_INTERVAL = 5.0
+
+# steps estimated below this many bytes are too small to correct the estimates with
+CALIBRATION_MIN_BYTES = 32 * 2**20
+# the estimates are scaled up by at most this factor after a step went above its estimate
+MAX_CALIBRATION = 4.0
+
+try:
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+
+def process_rss(pid: int) -> Optional[int]:
+    """
+    Resident set size of a process, from /proc.
+
+    Returns:
+        Bytes, None where /proc isn't available or the process is gone
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def total_rss(pids: Iterable[int]) -> int:
+    """RSS summed over processes. Pages the pool workers share with their parent are counted twice, to be safe."""
+    return sum(process_rss(pid) or 0 for pid in pids)
+
+
+class RssTracker:
+    """Samples the RSS of a set of processes in a thread and keeps the peak."""
+
+    def __init__(self, pids: Callable[[], List[int]], interval: float = 0.2, limit: int = 0,
+                 on_exceeded: Optional[Callable[[], None]] = None):
+        """
+        Initialize RssTracker.
+
+        Args:
+            pids: The processes to sample, called for every sample as the pool workers come and go
+            interval: Seconds between two samples
+            limit: Total RSS above which `on_exceeded` is called, once (0 = no limit)
+            on_exceeded: Called from the sampling thread
+        """
+        self._pids = pids
+        self._interval = interval
+        self._limit = limit
+        self._on_exceeded = on_exceeded
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.start_rss = 0
+        self.peak_rss = 0
+        self.exceeded = False
+
+    def _sample(self):
+        rss = total_rss(self._pids())
+        self.peak_rss = max(self.peak_rss, rss)
+        if self._limit and rss > self._limit and not self.exceeded:
+            self.exceeded = True
+            if self._on_exceeded is not None:
+                self._on_exceeded()
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            self._sample()
+
+    def __enter__(self) -> "RssTracker":
+        self.start_rss = self.peak_rss = total_rss(self._pids())
+        self._thread = threading.Thread(target=self._run, name="rss-tracker", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+        self._sample()
+
+
+class MemoryBudget:
+    """
+    Keeps the calculation within a memory budget.
+
+    Before a step the calculator estimates its peak for each setting, from the most parallel to the most frugal:
+    all the pool workers, then merging in the calculating process instead of copying the operands to the
+    pool, then half the workers and so on down to a serial calculation. The first one whose estimate fits next to
+    the current RSS is used, and the calculation pauses while none does. During the step the RSS of the process and
+    its pool workers is sampled; if it goes above the budget anyway, the workers are killed and the step is retried
+    with the next setting. The estimates are corrected by the peaks measured, and both are exposed as metrics.
+    """
+
+    def __init__(self, budget_bytes: int = 0, sample_interval: float = 0.2):
+        """
+        Initialize MemoryBudget.
+
+        Args:
+            budget_bytes: Most RSS the calculating process and its pool workers may use together
+                (0 = no budget, the estimates and peaks are still measured)
+            sample_interval: Seconds between two RSS samples during a step
+        """
+        self._budget = budget_bytes
+        self._sample_interval = sample_interval
+        self._calibration = 1.0  # factor of the estimates, from the measured peaks
+        MEMORY_BUDGET_BYTES.set(budget_bytes)
+
+    @property
+    def budget_bytes(self) -> int:
+        return self._budget
+
+    @staticmethod
+    def _settings(calculator: Calculator) -> List[Tuple[int, bool]]:
+        """(workers, pooled merge) settings from the most parallel to the least memory."""
+        workers = calculator.workers
+        settings = [(workers, True), (workers, False)]
+        while workers > 1:
+            workers //= 2
+            settings.append((workers, False))
+        return settings
+
+    def _pids(self, calculator: Calculator) -> List[int]:
+        return [os.getpid(), *calculator.worker_pids()]
+
+    def estimate(self, calculator: Calculator, decimal_places: int, workers: Optional[int] = None,
+                 pooled_merge: Optional[bool] = None) -> int:
+        """Calibrated estimate of the bytes a calculation adds at its peak, see Calculator.estimate_peak_bytes."""
+        return int(calculator.estimate_peak_bytes(decimal_places, workers, pooled_merge) * self._calibration)
+
+    def plan(self, calculator: Calculator, decimal_places: int, min_setting: int = 0,
+             is_running: Optional[Callable[[], bool]] = None) -> Optional[int]:
+        """
+        Set the calculator to the most parallel setting whose estimated peak fits the budget.
+
+        Args:
+            calculator: The calculator, its parallelism is set
+            decimal_places: Decimal places of the coming calculation
+            min_setting: Index of the most parallel setting allowed, after a step went over the budget with it
+            is_running: Pause while no setting fits and this is true, None to go ahead with the least memory
+
+        Returns:
+            Index of the setting used, None if `is_running` turned false while paused
+        """
+        settings = self._settings(calculator)
+        min_setting = min(min_setting, len(settings) - 1)
+        paused = False
+        while True:
+            current = total_rss(self._pids(calculator))
+            for index in range(min_setting, len(settings)):
+                estimate = self.estimate(calculator, decimal_places, *settings[index])
+                if not self._budget or current + estimate <= self._budget:
+                    break
+            MEMORY_ESTIMATED_PEAK_BYTES.set(current + estimate)
+            fits = not self._budget or current + estimate <= self._budget
+
+            if fits or is_running is None:
+                if paused:
+                    logger.info(f"Resuming the calculation to {decimal_places} decimal places within the memory budget")
+                if index > 0:
+                    MEMORY_ADAPTATIONS.labels("serial_merge" if index == 1 else "fewer_workers").inc()
+                calculator.set_parallelism(*settings[index])
+                return index
+
+            if not paused:
+                logger.warning(
+                    f"Pausing the calculation: {decimal_places} decimal places need about "
+                    f"{(current + estimate) / 2**20:.0f} MiB, above the budget of {self._budget / 2**20:.0f} MiB"
+                )
+                MEMORY_ADAPTATIONS.labels("pause").inc()
+                paused = True
+            time.sleep(PAUSE_RECHECK_INTERVAL)
+            if not is_running():
+                return None
+
+    @contextlib.contextmanager
+    def track(self, calculator: Calculator, estimate: int) -> Iterator[RssTracker]:
+        """
+        Sample the RSS during a calculation and kill the pool workers if it goes above the budget.
+
+        Args:
+            calculator: The calculator
+            estimate: Bytes the calculation was estimated to add, to correct the next estimates
+        """
+        def exceeded():
+            if calculator.worker_pids():
+                logger.warning("The calculation went above the memory budget, stopping its pool workers")
+                MEMORY_ADAPTATIONS.labels("abort").inc()
+                calculator.terminate_workers()
+
+        with RssTracker(lambda: self._pids(calculator), self._sample_interval, self._budget, exceeded) as tracker:
+            yield tracker
+
+        MEMORY_PEAK_RSS_BYTES.set(tracker.peak_rss)
+        uncalibrated = estimate / self._calibration
+        if uncalibrated >= CALIBRATION_MIN_BYTES and not tracker.exceeded:
+            # freed memory isn't always given back to the system, so only ever correct upwards
+            ratio = (tracker.peak_rss - tracker.start_rss) / uncalibrated
+            self._calibration = min(MAX_CALIBRATION, max(self._calibration, ratio))
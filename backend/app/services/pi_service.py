@@ -1,31 +1,106 @@
+import asyncio
+import concurrent.futures
 import threading
 import time
 import logging
-from typing import Tuple, Optional
+from dataclasses import dataclass
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Literal, Tuple, Optional, Union
 
 
-from app.libs.pi_calculator import PiCalculator
+from app.libs.calculator_registry import Calculator
+from app.metrics import (
+    CALCULATION_PHASE_SECONDS, CALCULATION_STEP_SECONDS, DECIMAL_PLACES, DECIMAL_PLACES_GROWTH_RATE, POOL_UTILIZATION,
+    VERIFICATION_CHECKS,
+)
+from app.services.digit_broadcaster import DigitBroadcaster, DigitsEvent
+from app.services.memory_budget import MemoryBudget
+from app.services.pi_verifier import PiVerifier, VerificationResult
+from app.services.precision_scheduler import PrecisionScheduler
+from app.repositories.async_redis_repository import AsyncRedisRepository
 from app.repositories.redis_repository import RedisRepository
+from app.repositories.reference_repository import ReferenceRepository
+from app.repositories.shared_buffer_repository import SharedBufferRepository
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# decimal places of the reference file compared with the calculator before seeding from it
+REFERENCE_CHECK_DECIMAL_PLACES = 1000
+
+# seconds the decimal places growth rate is averaged over, single steps are mostly served from the headroom
+GROWTH_RATE_WINDOW = 5.0
+
+# seconds between the checks of an API process waiting for the worker to publish decimal places requested on demand
+ON_DEMAND_POLL_INTERVAL = 0.1
+
+
+@dataclass(frozen=True)
+class OnDemandProgress:
+    """Where an on-demand calculation stands, for a request that stopped waiting for it."""
+    status: Literal["calculating", "queued"]  # queued behind a calculation to fewer decimal places
+    available_dp: int  # most decimal places this process can serve right now
+    elapsed: float  # seconds the running calculation has taken so far
+
+
 class PiService:
     """Service for managing Pi calculations and retrieval."""
     
-    def __init__(self, pi_calculator: PiCalculator, repository: RedisRepository):
+    def __init__(self, pi_calculator: Calculator, repository: RedisRepository, async_repository: AsyncRedisRepository,
+                 shared_buffer: Optional[SharedBufferRepository] = None, reference: Optional[ReferenceRepository] = None,
+                 verifier: Optional[PiVerifier] = None, scheduler: Optional[PrecisionScheduler] = None,
+                 memory_budget: Optional[MemoryBudget] = None):
         """
         Initialize PiService.
         
         Args:
             pi_calculator: The Pi calculator instance
-            repository: The repository for caching Pi values
+            repository: The repository for caching Pi values, used by the background calculation
+            async_repository: The non-blocking repository used to serve requests
+            shared_buffer: Optional memory-mapped hand-off to the processes on this host, written by the
+                calculating process and read before Redis by the others
+            scheduler: Chooses the decimal places of each step, one at a time by default
+            memory_budget: Adapts the calculations to a memory budget, by default only measures them
         """
         self._pi_calculator = pi_calculator
         self._repository = repository
-        self._is_calculating = False
+        self._async_repository = async_repository
+        self._shared_buffer = shared_buffer
+        self._reference = reference
+        self._verifier = verifier
         self._max_decimal_places = settings.MAX_DECIMAL_POINTS
+        self._scheduler = scheduler or PrecisionScheduler("linear", self._max_decimal_places)
+        self._memory_budget = memory_budget or MemoryBudget()
+        self._verification_results: Dict[str, VerificationResult] = {}  # latest result of each check
+        self._last_spot_check = 0.0
+        self._growth_window: Optional[Tuple[float, int]] = None  # (start time, decimal places then)
+        self._is_calculating = False
         self._calculation_thread = None
+        # the calculator is shared by the background steps and the on-demand calculations
+        self._calculator_lock = threading.Lock()
+        
+        # on-demand calculations run one at a time, each request waits on the one covering its decimal places.
+        # a request above the running one raises the target of the next, so there are at most two
+        self._on_demand_running: Optional[Tuple[int, asyncio.Future, float]] = None  # (target, future, start time)
+        self._on_demand_next: Optional[Tuple[int, asyncio.Future]] = None
+        self._on_demand_value: Optional[str] = None  # longest value calculated on demand
+        self._on_demand_waiters = 0
+        self._on_demand_task: Optional[asyncio.Task] = None
+        
+        # latest (pi_value, decimal_places) kept in memory, replaced only by a newer version
+        self._current: Tuple[Optional[str], Optional[int]] = (None, None)
+        self._current_bytes: Tuple[Optional[bytes], Optional[int]] = (None, None)  # ASCII copy for raw responses
+        # newest decimal places known to be published, from this process or the updates channel
+        self._latest_dp = -1
+        self._last_version_check = 0.0
+        self._refresh_lock: Optional[asyncio.Lock] = None  # created on the serving event loop
+        self._listener_task: Optional[asyncio.Task] = None
+        
+        # streaming subscribers get the digits added by each version, fetched once per process
+        self._broadcaster = DigitBroadcaster()
+        self._broadcast_dp: Optional[int] = None  # last decimal place sent to the subscribers
+        self._version_changed: Optional[asyncio.Event] = None
+        self._broadcast_task: Optional[asyncio.Task] = None
     
     def start_calculation(self):
         """Start background calculation of Pi with increasing precision."""
@@ -33,8 +108,16 @@ class PiService:
             return
         
         self._is_calculating = True
+        # after a stop the previous thread may still be finishing its step, it shares the calculator state
+        previous_thread = self._calculation_thread
+        
+        def calculate():
+            if previous_thread is not None:
+                previous_thread.join()
+            self._calculate_with_increasing_precision()
+        
         self._calculation_thread = threading.Thread(
-            target=self._calculate_with_increasing_precision,
+            target=calculate,
             daemon=True
         )
         self._calculation_thread.start()
@@ -45,6 +128,9 @@ class PiService:
         try:
             # Start with a minimal precision if nothing is cached
             cached_dp = self._repository.get_decimal_places()
+            seeded_dp = self._seed_from_reference(cached_dp)
+            if seeded_dp is not None:
+                cached_dp = seeded_dp
             # Handle None value properly to avoid comparison error
             if cached_dp is None:
                 current_dp = max(settings.START_DECIMAL_POINTS, 1)
@@ -53,50 +139,553 @@ class PiService:
             
             # Cache initial value if not already cached
             if current_dp == 1:
-                pi_value = self._pi_calculator.calculate_pi(current_dp)
-                self._repository.cache_pi(pi_value, current_dp)
+                with self._calculator_lock:
+                    pi_value = self._pi_calculator.calculate_pi(current_dp)
+                self._cache(pi_value, current_dp, None)
             
-            while current_dp < self._max_decimal_places and self._is_calculating:
-                
-                next_dp = current_dp + 1
-
-                logger.info(f"Calculating Pi to {next_dp} decimal places...")
-                start_time = time.time()
-                
-                # Calculate and cache the new value
-                pi_value = self._pi_calculator.calculate_pi(next_dp)
-                self._repository.cache_pi(pi_value, next_dp)
-
-                # FOR DEBUGGING, validate accuracy
-                # is_accurate = self._pi_calculator.verify_accuracy(pi_value, next_dp)
-                # if not is_accurate:
-                #     logger.error(f"Not Match")
-                # else:
-                #     logger.info(f"Match!!!!")
-                
-                duration = time.time() - start_time
-                logger.info(f"Calculated Pi to {next_dp} decimal places in {duration:.2f} seconds")
-                
-                current_dp = next_dp
-                
-                # Slow down calculations to avoid Redis overload
-                # time.sleep(0.1)
+            # each step is calculated in the step thread while this one reveals the previous step to the readers,
+            # so the calculator is only ever used by one thread at a time
+            published_dp = computed_dp = current_dp
+            ready: Optional[str] = None  # calculated to computed_dp, revealed up to published_dp
+            with concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="pi-step") as executor:
+                while self._is_calculating:
+                    # decimal places the API processes asked for on demand (PI_CALCULATION_MODE=worker)
+                    requested_dp = self._repository.get_requested_decimal_places() or 0
+                    step = None
+                    if computed_dp < self._max_decimal_places:
+                        next_dp = self._scheduler.next_decimal_places(computed_dp)
+                        if requested_dp > next_dp:
+                            next_dp = min(requested_dp, self._max_decimal_places)
+                            logger.info(f"Calculating the {next_dp} decimal places requested on demand next")
+                        step = executor.submit(self._calculate_step, next_dp, computed_dp)
+                    
+                    if ready is not None:
+                        # a requesting process is waiting for the whole step, don't spread it out
+                        at_once = published_dp < requested_dp <= computed_dp
+                        published_dp = self._reveal(ready, published_dp, computed_dp, step, at_once)
+                    if step is None:
+                        break
+                    
+                    ready = step.result()
+                    if ready is None:
+                        break  # stopped while waiting for memory
+                    computed_dp = next_dp
         except Exception as e:
             logger.error(f"Error in Pi calculation thread: {str(e)}")
             self._is_calculating = False
     
-    def get_current_pi(self) -> Tuple[Optional[str], Optional[int]]:
+    def _calculate_step(self, decimal_places: int, previous_decimal_places: int) -> Optional[str]:
+        """
+        Calculate and verify the decimal places of a step, run in the step thread.
+        
+        Returns:
+            Pi to `decimal_places`, None if the calculation was stopped while the step waited for memory
+        """
+        logger.info(f"Calculating Pi to {decimal_places} decimal places...")
+        start_time = time.time()
+        
+        with self._calculator_lock:
+            pi_value = self._calculate_within_budget(decimal_places, lambda: self._is_calculating)
+            if pi_value is None:
+                return None
+            
+            duration = time.time() - start_time
+            logger.info(f"Calculated Pi to {decimal_places} decimal places in {duration:.2f} seconds")
+            self._scheduler.record(decimal_places - previous_decimal_places, duration)
+            self._observe_step(decimal_places, duration)
+            
+            self._verify(decimal_places, previous_decimal_places)
+        return pi_value
+    
+    def _calculate_within_budget(self, decimal_places: int, is_running: Optional[Callable[[], bool]]) -> Optional[str]:
         """
-        Get the current cached Pi value.
+        Calculate Pi with the parallelism the memory budget allows, the calculator lock must be held.
+        
+        A step whose pool workers were stopped for going above the budget is retried with less parallelism.
+        
+        Args:
+            decimal_places: Number of decimal places to calculate
+            is_running: Wait for memory while this is true, None to go ahead with the least memory right away
+        
+        Returns:
+            Pi to `decimal_places`, None if `is_running` turned false while waiting for memory
+        """
+        if self._memory_budget.estimate(self._pi_calculator, decimal_places) == 0:
+            # already calculated, the calculator only slices its cached value
+            return self._pi_calculator.calculate_pi(decimal_places)
+        
+        min_setting = 0
+        while True:
+            setting = self._memory_budget.plan(self._pi_calculator, decimal_places, min_setting, is_running)
+            if setting is None:
+                return None
+            estimate = self._memory_budget.estimate(self._pi_calculator, decimal_places)
+            try:
+                with self._memory_budget.track(self._pi_calculator, estimate) as tracker:
+                    return self._pi_calculator.calculate_pi(decimal_places)
+            except BrokenProcessPool:
+                if not tracker.exceeded:
+                    raise
+                logger.warning(f"Retrying Pi to {decimal_places} decimal places with less parallelism")
+                min_setting = setting + 1
+    
+    def _reveal(self, pi_value: str, published_dp: int, decimal_places: int,
+                step: Optional[concurrent.futures.Future], at_once: bool = False) -> int:
+        """
+        Publish longer and longer prefixes of a calculated value, one per publish interval, spread over the
+        expected duration of the next step. Whatever is left is published at once when that step is done early.
+        
+        Args:
+            pi_value: Pi calculated to `decimal_places`
+            published_dp: Decimal places the readers already have
+            decimal_places: Decimal places to reveal up to
+            step: The next step being calculated meanwhile, None for the last one
+            at_once: Publish all of it right away
+        
+        Returns:
+            Decimal places published, less than `decimal_places` only if the calculation was stopped
+        """
+        interval = settings.PI_PUBLISH_INTERVAL
+        reveals = 1
+        if interval > 0 and not at_once:
+            reveals = max(1, min(decimal_places - published_dp, int(self._scheduler.expected_duration / interval)))
+        
+        start_dp = published_dp
+        revealed = 0
+        while revealed < reveals and self._is_calculating:
+            # once the next step is done the readers don't need to wait for it any longer
+            revealed = reveals if step is not None and step.done() else revealed + 1
+            target_dp = start_dp + (decimal_places - start_dp) * revealed // reveals
+            self._cache(pi_value, target_dp, published_dp)
+            published_dp = target_dp
+            
+            if revealed < reveals:
+                if step is None:
+                    time.sleep(interval)
+                else:
+                    concurrent.futures.wait([step], timeout=interval)
+        return published_dp
+    
+    def _seed_from_reference(self, cached_dp: Optional[int]) -> Optional[int]:
+        """
+        Write Pi from the reference file to the repository, if it goes further than the cached value.
+        
+        The file is only trusted after its first decimal places match the calculator's.
+        
+        Returns:
+            Decimal places written or None if the reference wasn't used
+        """
+        if self._reference is None:
+            return None
+        
+        available = self._reference.get_decimal_places()
+        if available is None:
+            return None
+        decimal_places = min(available, self._max_decimal_places)
+        if cached_dp is not None and cached_dp >= decimal_places:
+            return None
+        
+        check_dp = min(decimal_places, REFERENCE_CHECK_DECIMAL_PLACES)
+        with self._calculator_lock:
+            calculated = self._pi_calculator.calculate_pi(check_dp)
+        if self._reference.get_pi(check_dp) != calculated:
+            logger.error(f"Pi reference file {self._reference.path} doesn't match the calculation, not using it")
+            return None
+        
+        pi_value = self._reference.get_pi(decimal_places)
+        if self._shared_buffer is not None:
+            self._shared_buffer.publish(pi_value, decimal_places)
+        if not self._repository.cache_pi(pi_value, decimal_places):
+            return None
+        self._set_current(pi_value, decimal_places)
+        
+        logger.info(f"Seeded Pi with {decimal_places} decimal places from {self._reference.path}")
+        return decimal_places
+    
+    def _cache(self, pi_value: str, decimal_places: int, previous_decimal_places: Optional[int]):
+        """
+        Write the prefix of a calculated Pi value up to `decimal_places` to the repository.
+        
+        In append mode only the digits after `previous_decimal_places` are sent, falling back to
+        rewriting the full prefix if the cached one doesn't end there.
+        """
+        if self._shared_buffer is not None:
+            # before Redis, so the processes on this host already have it when the update is announced
+            self._shared_buffer.publish(pi_value, decimal_places)
+        
+        prefix = pi_value[:decimal_places + 2]
+        if settings.PI_STORAGE_MODE == "append" and previous_decimal_places is not None:
+            digits = pi_value[previous_decimal_places + 2:decimal_places + 2]
+            if self._repository.append_pi(digits, previous_decimal_places, decimal_places):
+                self._set_current(prefix, decimal_places)
+                return
+            logger.warning(f"Cached Pi doesn't end at {previous_decimal_places} decimal places, rewriting it")
+        
+        self._repository.cache_pi(prefix, decimal_places)
+        self._set_current(prefix, decimal_places)
+    
+    def _observe_step(self, decimal_places: int, duration: float):
+        """Record the metrics of a calculated step."""
+        CALCULATION_STEP_SECONDS.observe(duration)
+        for phase, value in self._pi_calculator.pop_stats().items():
+            if phase == "pool_utilization":
+                POOL_UTILIZATION.set(value)
+            else:
+                CALCULATION_PHASE_SECONDS.labels(phase).observe(value)
+        
+        now = time.monotonic()
+        if self._growth_window is None:
+            self._growth_window = (now, decimal_places)
+        elif now - self._growth_window[0] >= GROWTH_RATE_WINDOW:
+            started, start_dp = self._growth_window
+            DECIMAL_PLACES_GROWTH_RATE.set((decimal_places - start_dp) / (now - started))
+            self._growth_window = (now, decimal_places)
+    
+    def _verify(self, decimal_places: int, previous_decimal_places: int):
+        """
+        Check a calculated step: its new digits against the reference file and, once per verification
+        interval, all of them with a BBP spot check and the binary split state with a checksum.
+        """
+        if self._verifier is None:
+            return
+        
+        try:
+            pi_value = self._pi_calculator.calculate_pi(decimal_places)
+            results = [self._verifier.check_reference(pi_value, previous_decimal_places + 1)]
+            
+            if time.monotonic() - self._last_spot_check >= settings.PI_VERIFICATION_INTERVAL:
+                results.append(self._verifier.check_bbp(pi_value))
+                terms, P, Q, T = self._pi_calculator.series_state()
+                if P is not None:  # only the series calculators have a state to check
+                    results.append(self._verifier.check_checksum(decimal_places, terms, P, Q, T))
+                self._last_spot_check = time.monotonic()
+            
+            for result in results:
+                if result is None:
+                    continue
+                self._verification_results[result.check] = result
+                VERIFICATION_CHECKS.labels(result.check, "passed" if result.passed else "failed").inc()
+                if result.passed:
+                    logger.debug(f"Pi verification passed: {result}")
+                else:
+                    logger.error(f"Pi verification failed: {result}")
+        except Exception as e:
+            logger.error(f"Error verifying Pi: {str(e)}")
+    
+    def get_verification_results(self) -> List[VerificationResult]:
+        """Latest result of each verification check run in this process."""
+        return list(self._verification_results.values())
+    
+    def _set_current(self, pi_value: Optional[str], decimal_places: Optional[int]):
+        """Replace the in-memory value, unless it would go back to an older version."""
+        if decimal_places is None:
+            return
+        if decimal_places >= self._current_dp():
+            self._current = (pi_value, decimal_places)
+            DECIMAL_PLACES.set(decimal_places)
+        self._latest_dp = max(self._latest_dp, decimal_places)
+    
+    def _current_dp(self) -> int:
+        """Decimal places of the in-memory value, -1 if there is none yet."""
+        decimal_places = self._current[1]
+        return -1 if decimal_places is None else decimal_places
+    
+    def _is_stale(self) -> bool:
+        """Whether a newer version is known or the periodic version check is due."""
+        if self._current_dp() < self._latest_dp:
+            return True
+        return time.monotonic() - self._last_version_check >= settings.PI_CACHE_VERSION_CHECK_INTERVAL
+    
+    def _read_shared_buffer(self):
+        """Take a newer version from the shared buffer, it is checked on every read since it costs no I/O."""
+        if self._shared_buffer is None:
+            return
+        
+        decimal_places = self._shared_buffer.get_decimal_places()
+        if decimal_places is None:
+            return  # nothing calculated on this host, Redis stays the source
+        if decimal_places > self._current_dp():
+            view, decimal_places = self._shared_buffer.get_pi_view()
+            if view is not None:
+                self._set_current(str(view, "ascii"), decimal_places)
+        self._last_version_check = time.monotonic()
+    
+    async def _refresh(self):
+        """Fetch the newest version once, however many requests are waiting for it."""
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        
+        async with self._refresh_lock:
+            # another request may have refreshed while we waited
+            if not self._is_stale():
+                return
+            
+            current_dp = self._current_dp()
+            if current_dp < 0 or current_dp < self._latest_dp:
+                self._set_current(*await self._async_repository.get_cached_pi())
+            else:
+                # periodic check, only fetch the value if the version moved
+                cached_dp = await self._async_repository.get_decimal_places()
+                if cached_dp is not None and cached_dp > current_dp:
+                    self._set_current(*await self._async_repository.get_cached_pi())
+            
+            self._last_version_check = time.monotonic()
+    
+    async def get_current_pi(self) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Get the current Pi value, served from memory and refreshed when a newer version is published.
         
         Returns:
             Tuple of (pi_value, decimal_places) or (None, None) if not found
         """
-        return self._repository.get_cached_pi()
+        self._read_shared_buffer()
+        if self._is_stale():
+            await self._refresh()
+        return self._current
+    
+    async def get_current_pi_bytes(self) -> Tuple[Optional[Union[bytes, memoryview]], Optional[int]]:
+        """
+        Get the current Pi value as ASCII bytes, for responses that send it as is.
+        
+        Returns:
+            Tuple of (pi_value, decimal_places) or (None, None) if not found. The value is a view into
+            the shared buffer when it holds the current version, otherwise bytes encoded once per version.
+        """
+        pi_value, decimal_places = await self.get_current_pi()
+        if pi_value is None or decimal_places is None:
+            return None, None
+        
+        if self._shared_buffer is not None:
+            view, shared_dp = self._shared_buffer.get_pi_view()
+            if view is not None and shared_dp >= decimal_places:
+                return view[:decimal_places + 2], decimal_places
+        
+        if self._current_bytes[1] != decimal_places:
+            self._current_bytes = (pi_value.encode("ascii"), decimal_places)
+        return self._current_bytes
+    
+    async def get_pi_digits(self, start: Optional[int], length: int) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Get a window of the current cached Pi digits.
+        
+        The window is sliced from memory when the in-memory value is up to date, otherwise only the
+        window is read from Redis.
+        
+        Args:
+            start: First decimal place to return (1-based), or None for the last `length` digits
+            length: Number of digits to return
+        
+        Returns:
+            Tuple of (digits, decimal_places) or (None, None) if not found
+        """
+        self._read_shared_buffer()
+        pi_value, decimal_places = self._current
+        if pi_value is None or self._is_stale():
+            return await self._async_repository.get_pi_digits(start, length)
+        
+        # "3." comes before the first decimal place
+        if start is None:
+            return pi_value[max(2, len(pi_value) - length):], decimal_places
+        return pi_value[start + 1:start + 1 + length], decimal_places
+    
+    async def get_pi_on_demand(self, decimal_places: int, timeout: float) -> Optional[str]:
+        """
+        Get Pi to exactly `decimal_places`, calculating it if the published value doesn't go that far.
+        
+        Concurrent requests share the calculations: a request waits on the running one if it covers its
+        decimal places, otherwise on the next one, whose target is the highest requested meanwhile.
+        At most PI_ON_DEMAND_QUEUE_SIZE requests wait, the others only make sure it is calculated.
+        
+        Args:
+            decimal_places: Number of decimal places
+            timeout: Seconds to wait for the calculation
+        
+        Returns:
+            The Pi value, or None if it isn't calculated within the timeout, see get_on_demand_progress
+        """
+        pi_value, current_dp = await self.get_current_pi()
+        if pi_value is not None and current_dp >= decimal_places:
+            return pi_value[:decimal_places + 2]
+        if self._on_demand_value is not None and len(self._on_demand_value) >= decimal_places + 2:
+            return self._on_demand_value[:decimal_places + 2]
+        
+        future = self._schedule_on_demand(decimal_places)
+        if self._on_demand_waiters >= settings.PI_ON_DEMAND_QUEUE_SIZE:
+            return None
+        
+        self._on_demand_waiters += 1
+        try:
+            # a request that gives up must not cancel the calculation the others are waiting for
+            pi_value = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._on_demand_waiters -= 1
+        return pi_value[:decimal_places + 2]
+    
+    def get_on_demand_progress(self, decimal_places: int) -> OnDemandProgress:
+        """
+        Describe the on-demand calculation a request for `decimal_places` is waiting for.
+        
+        Args:
+            decimal_places: Number of decimal places requested
+        
+        Returns:
+            Its status, the decimal places available meanwhile and how long the running calculation has taken
+        """
+        available_dp = max(self._current_dp(), len(self._on_demand_value or "3.") - 2)
+        running = self._on_demand_running
+        if running is None:
+            return OnDemandProgress(status="queued", available_dp=available_dp, elapsed=0.0)
+        target, _, started = running
+        return OnDemandProgress(
+            status="calculating" if target >= decimal_places else "queued",
+            available_dp=available_dp,
+            elapsed=time.monotonic() - started,
+        )
+    
+    def _schedule_on_demand(self, decimal_places: int) -> asyncio.Future:
+        """The future of the calculation that will cover `decimal_places`, scheduling one if needed."""
+        if self._on_demand_running is not None and self._on_demand_running[0] >= decimal_places:
+            return self._on_demand_running[1]
+        
+        if self._on_demand_next is None:
+            future = asyncio.get_running_loop().create_future()
+            # no waiter may be left to retrieve a failure, don't log it as never retrieved
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._on_demand_next = (decimal_places, future)
+        elif self._on_demand_next[0] < decimal_places:
+            self._on_demand_next = (decimal_places, self._on_demand_next[1])
+        
+        if self._on_demand_task is None:
+            self._on_demand_task = asyncio.create_task(self._run_on_demand())
+        return self._on_demand_next[1]
+    
+    async def _run_on_demand(self):
+        """Run the scheduled on-demand calculations one after the other, in a worker thread."""
+        loop = asyncio.get_running_loop()
+        try:
+            while self._on_demand_next is not None:
+                target, future = self._on_demand_next
+                self._on_demand_next = None
+                self._on_demand_running = (target, future, time.monotonic())
+                
+                try:
+                    if settings.PI_CALCULATION_MODE == "worker":
+                        pi_value = await self._request_from_worker(target)
+                    else:
+                        pi_value = await loop.run_in_executor(None, self._calculate_on_demand, target)
+                except Exception as e:
+                    logger.error(f"Error calculating Pi to {target} decimal places on demand: {str(e)}")
+                    future.set_exception(e)
+                    continue
+                
+                if self._on_demand_value is None or len(pi_value) > len(self._on_demand_value):
+                    self._on_demand_value = pi_value
+                future.set_result(pi_value)
+        finally:
+            self._on_demand_running = None
+            self._on_demand_task = None
+    
+    async def _request_from_worker(self, decimal_places: int) -> str:
+        """Have the worker process calculate `decimal_places` with its next step and wait until it publishes them."""
+        logger.info(f"Requesting Pi to {decimal_places} decimal places from the worker on demand...")
+        await self._async_repository.request_decimal_places(decimal_places)
+        while True:
+            pi_value, current_dp = await self.get_current_pi()
+            if pi_value is not None and current_dp >= decimal_places:
+                return pi_value[:decimal_places + 2]
+            await asyncio.sleep(ON_DEMAND_POLL_INTERVAL)
+    
+    def _calculate_on_demand(self, decimal_places: int) -> str:
+        logger.info(f"Calculating Pi to {decimal_places} decimal places on demand...")
+        start_time = time.time()
+        with self._calculator_lock:
+            pi_value = self._calculate_within_budget(decimal_places, None)
+        logger.info(f"Calculated Pi to {decimal_places} decimal places on demand in {time.time() - start_time:.2f} seconds")
+        return pi_value
+    
+    def start_update_listener(self):
+        """Start listening for versions published by other processes. Must be called on the serving event loop."""
+        if self._listener_task is None:
+            self._version_changed = asyncio.Event()
+            self._listener_task = asyncio.create_task(self._listen_for_updates())
+            self._broadcast_task = asyncio.create_task(self._broadcast_new_digits())
+    
+    async def _listen_for_updates(self):
+        """Mark the in-memory value stale as soon as a newer version is published."""
+        while True:
+            try:
+                async for decimal_places in self._async_repository.listen_for_updates():
+                    if decimal_places > self._latest_dp:
+                        self._latest_dp = decimal_places
+                        self._version_changed.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error listening for Pi updates: {str(e)}")
+            
+            # the periodic version check covers the gap until we are subscribed again
+            await asyncio.sleep(settings.PI_CACHE_VERSION_CHECK_INTERVAL)
+    
+    def subscribe_digits(self) -> "asyncio.Queue[Optional[DigitsEvent]]":
+        """
+        Subscribe to the digits added by each new version.
+        
+        Returns:
+            Queue receiving a DigitsEvent per version, None when the subscriber fell behind
+        """
+        if self._broadcast_dp is None:
+            self._broadcast_dp = self._current_dp()
+        return self._broadcaster.subscribe()
+    
+    def unsubscribe_digits(self, queue: "asyncio.Queue[Optional[DigitsEvent]]"):
+        """Stop receiving new digits."""
+        self._broadcaster.unsubscribe(queue)
+    
+    async def _broadcast_new_digits(self):
+        """Send the digits added by every new version to the streaming subscribers."""
+        while True:
+            try:
+                # the timeout doubles as the periodic version check when no notification arrives
+                await asyncio.wait_for(self._version_changed.wait(), timeout=settings.PI_CACHE_VERSION_CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._version_changed.clear()
+            
+            if not self._broadcaster.has_subscribers():
+                self._broadcast_dp = None
+                continue
+            
+            try:
+                pi_value, decimal_places = await self.get_current_pi()
+                if decimal_places is None or decimal_places <= self._broadcast_dp:
+                    continue
+                
+                start = max(self._broadcast_dp + 1, 1)
+                # "3." comes before the first decimal place
+                self._broadcaster.publish(DigitsEvent(start, pi_value[start + 1:], decimal_places))
+                self._broadcast_dp = decimal_places
+            except Exception as e:
+                logger.error(f"Error broadcasting Pi digits: {str(e)}")
     
     def stop_calculation(self):
         """Stop the background calculation thread gracefully."""
         self._is_calculating = False
         if self._calculation_thread and self._calculation_thread.is_alive():
             self._calculation_thread.join(timeout=2.0)
-            logger.info("Stopped Pi calculation background thread") 
\ No newline at end of file
+            logger.info("Stopped Pi calculation background thread")
+        self._pi_calculator.shutdown()
+    
+    async def close(self):
+        """Stop the update tasks and release the connections used to serve requests."""
+        for task in (self._listener_task, self._broadcast_task, self._on_demand_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._listener_task = self._broadcast_task = self._on_demand_task = None
+        await self._async_repository.close() 
\ No newline at end of file
@@ -0,0 +1,181 @@
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from mpmath.libmp import MPZ
+
+from app.libs.bbp import pi_hex_digits
+from app.libs.bigint import divide
+from app.libs.decimal_converter import DecimalConverter
+from app.repositories.reference_repository import ReferenceRepository
+
+# at most this many differing positions are reported per check
+MAX_REPORTED_MISMATCHES = 10
+
+# hexadecimal digits compared by a BBP spot check, a wrong decimal prefix goes unnoticed with probability 16^-8
+BBP_WINDOW = 8
+# the spot check position is drawn up to this hexadecimal place, BBP extraction is linear in the position
+BBP_MAX_POSITION = 100000
+# decimal places used beyond those the hexadecimal window depends on
+BBP_GUARD_DIGITS = 10
+
+# primes the binary split state is checked modulo
+CHECKSUM_MODULI = ((1 << 61) - 1, (1 << 89) - 1)
+
+LOG10_16 = math.log10(16)
+
+
+@dataclass(frozen=True)
+class VerificationResult:
+    """Outcome of one check of the calculated Pi."""
+    check: str  # "reference", "bbp" or "checksum"
+    passed: bool
+    decimal_places: int  # decimal places of the checked value
+    first: int  # first position covered: decimal place, hexadecimal place for "bbp", term for "checksum"
+    last: int  # last position covered, same unit as first
+    mismatches: Tuple[int, ...] = ()  # differing positions, same unit as first, at most MAX_REPORTED_MISMATCHES
+    duration: float = 0.0  # seconds spent on the check
+
+
+class PiVerifier:
+    """
+    Checks calculated Pi without recomputing it.
+
+    - reference: compares decimal places with a trusted reference file, where it covers them
+    - bbp: compares a window of hexadecimal digits, extracted with the BBP formula, with the same window
+      derived from the decimal places. A wrong digit anywhere before the window changes it.
+    - checksum: recomputes the binary split state modulo small primes, term by term
+    """
+
+    def __init__(self, reference: Optional[ReferenceRepository] = None, rng: Optional[random.Random] = None):
+        """
+        Initialize PiVerifier.
+
+        Args:
+            reference: Optional trusted reference file
+            rng: Random source for the spot check positions
+        """
+        self._reference = reference
+        self._rng = rng or random.Random()
+        self._converter = DecimalConverter()
+
+    def check_reference(self, pi_value: str, start: int = 1) -> Optional[VerificationResult]:
+        """
+        Compare decimal places from `start` on with the reference file.
+
+        Args:
+            pi_value: The calculated Pi value
+            start: First decimal place to compare (1-based)
+
+        Returns:
+            The result, or None if the reference file doesn't cover any of them
+        """
+        if self._reference is None:
+            return None
+        started = time.perf_counter()
+
+        decimal_places = len(pi_value) - 2
+        length = decimal_places - start + 1
+        expected = self._reference.get_pi_digits(start, length) if length > 0 else None
+        if not expected:
+            return None
+
+        # "3." comes before the first decimal place
+        actual = pi_value[start + 1:start + 1 + len(expected)]
+        mismatches = []
+        if actual != expected:
+            for offset, (a, e) in enumerate(zip(actual, expected)):
+                if a != e:
+                    mismatches.append(start + offset)
+                    if len(mismatches) == MAX_REPORTED_MISMATCHES:
+                        break
+
+        return VerificationResult(
+            check="reference",
+            passed=not mismatches,
+            decimal_places=decimal_places,
+            first=start,
+            last=start + len(expected) - 1,
+            mismatches=tuple(mismatches),
+            duration=time.perf_counter() - started,
+        )
+
+    def check_bbp(self, pi_value: str, position: Optional[int] = None) -> Optional[VerificationResult]:
+        """
+        Spot check the decimal places with a window of hexadecimal digits extracted by BBP.
+
+        Args:
+            pi_value: The calculated Pi value
+            position: Hexadecimal place of the window, drawn at random (up to BBP_MAX_POSITION) if not given
+
+        Returns:
+            The result, or None if there are too few decimal places to determine a window
+        """
+        decimal_places = len(pi_value) - 2
+        max_position = int((decimal_places - BBP_GUARD_DIGITS) / LOG10_16) - BBP_WINDOW + 1
+        if max_position < 1:
+            return None
+        if position is None:
+            position = self._rng.randint(1, min(max_position, BBP_MAX_POSITION))
+        position = min(position, max_position)
+        started = time.perf_counter()
+
+        expected = pi_hex_digits(position, BBP_WINDOW)
+
+        # floor(fraction * 16^last) mod 16^window, from just the decimal places the window depends on
+        last = position + BBP_WINDOW - 1
+        digits = min(decimal_places, math.ceil(last * LOG10_16) + BBP_GUARD_DIGITS)
+        fraction = self._converter.from_digits(pi_value[2:2 + digits])
+        window = divide(fraction << (4 * last), MPZ(10) ** digits) % (MPZ(1) << (4 * BBP_WINDOW))
+        actual = format(int(window), f"0{BBP_WINDOW}x")
+
+        mismatches = tuple(position + i for i, (a, e) in enumerate(zip(actual, expected)) if a != e)
+        return VerificationResult(
+            check="bbp",
+            passed=not mismatches,
+            decimal_places=decimal_places,
+            first=position,
+            last=last,
+            mismatches=mismatches,
+            duration=time.perf_counter() - started,
+        )
+
+    def check_checksum(self, decimal_places: int, terms: int, P: int, Q: int, T: int) -> VerificationResult:
+        """
+        Check the binary split state against a term by term recomputation modulo small primes.
+
+        Args:
+            decimal_places: Decimal places calculated from the state
+            terms: Number of terms in the state
+            P, Q, T: The binary split state for terms [0, terms)
+
+        Returns:
+            The result, a mismatch can't be located to a term so none are reported
+        """
+        started = time.perf_counter()
+        passed = all(self._series_modulo(terms, modulus) == (P % modulus, Q % modulus, T % modulus)
+                     for modulus in CHECKSUM_MODULI)
+        return VerificationResult(
+            check="checksum",
+            passed=passed,
+            decimal_places=decimal_places,
+            first=0,
+            last=terms - 1,
+            duration=time.perf_counter() - started,
+        )
+
+    @staticmethod
+    def _series_modulo(terms: int, modulus: int) -> Tuple[int, int, int]:
+        """(P, Q, T) for terms [0, terms) modulo `modulus`, merging one term at a time like PiCalculator._binary_split."""
+        q_factor = 640320**3 // 24 % modulus
+        P, Q, T = 1, 1, 13591409 % modulus
+        for k in range(1, terms):
+            p = (6*k - 5) * (2*k - 1) * (6*k - 1) % modulus
+            q = k**3 % modulus * q_factor % modulus
+            t = p * (13591409 + 545140134 * k) % modulus
+            if k % 2:
+                t = -t
+            P, Q, T = P * p % modulus, Q * q % modulus, (T * q + P * t) % modulus
+        return P, Q, T
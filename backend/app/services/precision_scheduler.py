@@ -0,0 +1,72 @@
+from typing import Literal, Optional, Tuple
+
+# a time-budget step grows or shrinks by at most this factor from one step to the next
+MAX_BUDGET_SCALE = 4.0
+
+
+class PrecisionScheduler:
+    """
+    Chooses the decimal places each calculation step goes to.
+
+    - linear: `step` decimal places at a time
+    - geometric: multiply the decimal places by `growth`
+    - time-budget: scale the decimal places added by the last step so the next one takes about
+      `time_budget` seconds, whatever the calculator and the hardware
+    """
+
+    def __init__(self, policy: Literal["linear", "geometric", "time-budget"], max_decimal_places: int,
+                 step: int = 1, growth: float = 1.25, time_budget: float = 1.0):
+        """
+        Initialize PrecisionScheduler.
+
+        Args:
+            policy: "linear", "geometric" or "time-budget"
+            max_decimal_places: The steps stop here
+            step: Decimal places added per linear step, and the least any step adds
+            growth: Factor of the geometric steps
+            time_budget: Seconds a time-budget step should take
+        """
+        self._policy = policy
+        self._max_decimal_places = max_decimal_places
+        self._step = max(1, step)
+        self._growth = growth
+        self._time_budget = time_budget
+        self._last: Optional[Tuple[int, float]] = None  # (decimal places added, seconds) of the last step
+
+    @property
+    def expected_duration(self) -> float:
+        """Seconds the next step is expected to take, 0 before the first one."""
+        if self._policy == "time-budget":
+            return self._time_budget
+        return self._last[1] if self._last else 0.0
+
+    def next_decimal_places(self, current: int) -> int:
+        """
+        Decimal places of the step after `current`.
+
+        Args:
+            current: Decimal places calculated so far
+
+        Returns:
+            More than `current`, at most the max decimal places
+        """
+        if self._policy == "geometric":
+            target = max(current + self._step, int(current * self._growth))
+        elif self._policy == "time-budget" and self._last is not None:
+            added, duration = self._last
+            scale = self._time_budget / duration if duration > 0 else MAX_BUDGET_SCALE
+            scale = min(MAX_BUDGET_SCALE, max(1 / MAX_BUDGET_SCALE, scale))
+            target = current + max(self._step, int(added * scale))
+        else:
+            target = current + self._step
+        return min(target, self._max_decimal_places)
+
+    def record(self, added: int, duration: float):
+        """
+        Report how long a step took.
+
+        Args:
+            added: Decimal places the step added
+            duration: Seconds it took
+        """
+        self._last = (added, duration)
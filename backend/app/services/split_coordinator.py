@@ -0,0 +1,221 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Set, Tuple
+
+import redis
+
+from app.libs.pi_calculator import PiCalculator
+from app.libs.split_checkpoint import encode_split
+from app.metrics import DISTRIBUTED_SPLIT_JOBS, DISTRIBUTED_SPLIT_RETRIES
+from app.repositories.split_job_repository import SplitJob, SplitJobRepository
+
+logger = logging.getLogger(__name__)
+
+# seconds between the polls of an idle worker or a coordinator waiting for results
+POLL_INTERVAL = 0.05
+
+# seconds between progress log lines of a split
+PROGRESS_LOG_INTERVAL = 5.0
+
+
+def worker_id() -> str:
+    """Identifies a worker process in the job leases, for debugging."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def run_job(repository: SplitJobRepository, job: SplitJob, worker: str):
+    """
+    Compute a leaf job and store its result, renewing the lease meanwhile.
+
+    Args:
+        repository: The job queue
+        job: A job claimed by `worker`
+        worker: Holder of the lease
+    """
+    if not repository.is_run_active(job.run):
+        repository.complete_job(job, None)  # a retried copy of a job whose split already finished
+        return
+
+    done = threading.Event()
+
+    def renew():
+        while not done.wait(repository.job_timeout / 3):
+            if not repository.renew_job(job, worker):
+                logger.warning(f"Lost the lease on split job {job.key}, another worker may compute it as well")
+                return
+
+    renewer = threading.Thread(target=renew, daemon=True)
+    renewer.start()
+    try:
+        result = encode_split(*PiCalculator._binary_split(job.a, job.b))
+    finally:
+        done.set()
+        renewer.join()
+    repository.complete_job(job, result)
+
+
+def work(repository: SplitJobRepository, stopped: threading.Event):
+    """
+    Compute queued jobs until `stopped` is set, the loop of python -m app.split_worker.
+
+    Args:
+        repository: The job queue
+        stopped: Set to stop after the current job
+    """
+    worker = worker_id()
+    logger.info(f"Split worker {worker} waiting for jobs")
+    while not stopped.is_set():
+        try:
+            job = repository.claim_job(worker)
+            if job is None:
+                stopped.wait(POLL_INTERVAL)
+                continue
+            run_job(repository, job, worker)
+        except Exception as e:
+            # e.g. Redis unavailable, the lease of a claimed job expires and the coordinator retries it
+            logger.error(f"Error in split worker {worker}: {str(e)}")
+            stopped.wait(1.0)
+
+
+class SplitCoordinator:
+    """
+    Spreads a binary split over the worker processes of any number of nodes.
+
+    The terms are split into leaf jobs queued in Redis, the coordinator merges their results up a balanced
+    tree as they arrive and requeues the jobs of workers that stopped renewing their lease. While it has
+    nothing to merge it computes queued jobs as well, so a split also finishes without any worker.
+    """
+
+    def __init__(self, repository: SplitJobRepository, leaf_terms: int = 5000, min_terms: int = 10000):
+        """
+        Initialize SplitCoordinator.
+
+        Args:
+            repository: The job queue
+            leaf_terms: Terms per leaf job
+            min_terms: Fewest terms worth distributing, smaller splits are left to the local pool
+        """
+        self._repository = repository
+        self._leaf_terms = max(1, leaf_terms)
+        self._min_terms = min_terms
+        self._worker = worker_id()
+
+    def binary_split(self, a: int, b: int) -> Optional[Tuple[int, int, int]]:
+        """
+        Compute (P, Q, T) for the terms [a, b), the same as PiCalculator._binary_split(a, b).
+
+        Args:
+            a: First term
+            b: End of the terms, exclusive
+
+        Returns:
+            The binary split state of the terms, None if there are fewer than the min terms
+        """
+        if b - a < self._min_terms:
+            return None
+
+        leaves = max(1, -(-(b - a) // self._leaf_terms))
+        bounds = [a + (b - a) * i // leaves for i in range(leaves + 1)]
+        ranges = list(zip(bounds, bounds[1:]))
+        parents = self._tree(0, leaves)
+
+        run = self._repository.start_run(ranges)
+        logger.info(f"Distributed split of terms [{a}, {b}) in {leaves} jobs, run {run}")
+        DISTRIBUTED_SPLIT_JOBS.labels("total").set(leaves)
+        DISTRIBUTED_SPLIT_JOBS.labels("done").set(0)
+
+        done: Dict[Tuple[int, int], Tuple[int, int, int]] = {}  # completed subtrees, by leaf index range
+        finished = set()
+        last_log = time.monotonic()
+        failing_since: Optional[float] = None
+        try:
+            while (0, leaves) not in done:
+                try:
+                    results = self._poll(run, finished)
+                    failing_since = None
+                except redis.RedisError as e:
+                    # the jobs and results are kept in Redis, carry on once it is reachable again
+                    failing_since = failing_since or time.monotonic()
+                    if time.monotonic() - failing_since > self._repository.job_timeout:
+                        raise
+                    logger.warning(f"Error in distributed split run {run}, retrying: {str(e)}")
+                    time.sleep(POLL_INTERVAL)
+                    continue
+
+                for index, result in results.items():
+                    finished.add(index)
+                    self._add(done, parents, (index, index + 1), result)
+                DISTRIBUTED_SPLIT_JOBS.labels("done").set(len(finished))
+                if results:
+                    try:
+                        # only once merged: a result lost between reading and merging would never come again
+                        self._repository.delete_results(run, results)
+                    except redis.RedisError as e:
+                        # they aren't read again, and finish_run drops them with the rest of the run
+                        logger.warning(f"Could not free the merged results of distributed split run {run}: {str(e)}")
+
+                if time.monotonic() - last_log >= PROGRESS_LOG_INTERVAL:
+                    logger.info(f"Distributed split run {run}: {len(finished)} of {leaves} jobs done")
+                    last_log = time.monotonic()
+        finally:
+            self._repository.finish_run(run)
+
+        logger.info(f"Distributed split run {run} done")
+        return done[(0, leaves)]
+
+    def _poll(self, run: str, finished: Set[int]) -> Dict[int, Tuple[int, int, int]]:
+        """
+        Collect the new results of a run, requeue its expired jobs and compute a queued job when there is nothing
+        to merge.
+
+        Returns:
+            The new results, by leaf index, still stored until the caller has merged them
+        """
+        results = self._repository.read_results(run, finished)
+        if results:
+            return results
+
+        requeued = self._repository.requeue_expired(run)
+        if requeued:
+            logger.warning(f"Requeued {requeued} split jobs of run {run} after their worker stopped")
+            DISTRIBUTED_SPLIT_RETRIES.inc(requeued)
+
+        job = self._repository.claim_job(self._worker)
+        if job is not None:
+            run_job(self._repository, job, self._worker)
+        else:
+            time.sleep(POLL_INTERVAL)
+        return {}
+
+    @staticmethod
+    def _tree(lo: int, hi: int) -> Dict[Tuple[int, int], Tuple[int, int]]:
+        """Parent of every node of the balanced tree over the leaves [lo, hi), split like _binary_split."""
+        parents = {}
+        stack = [(lo, hi)]
+        while stack:
+            node_lo, node_hi = stack.pop()
+            if node_hi - node_lo > 1:
+                mid = (node_lo + node_hi) // 2
+                for child in ((node_lo, mid), (mid, node_hi)):
+                    parents[child] = (node_lo, node_hi)
+                    stack.append(child)
+        return parents
+
+    @staticmethod
+    def _add(done: Dict[Tuple[int, int], Tuple[int, int, int]], parents: Dict[Tuple[int, int], Tuple[int, int]],
+             node: Tuple[int, int], result: Tuple[int, int, int]):
+        """Add a completed subtree and merge it up while its sibling is complete as well."""
+        done[node] = result
+        while node in parents:
+            parent = parents[node]
+            mid = (parent[0] + parent[1]) // 2
+            left, right = (parent[0], mid), (mid, parent[1])
+            if left not in done or right not in done:
+                return
+            done[parent] = PiCalculator._merge(done.pop(left), done.pop(right))
+            node = parent
+
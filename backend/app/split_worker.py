@@ -0,0 +1,57 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+
+from app.config import settings
+from app.repositories.split_job_repository import SplitJobRepository
+from app.services.split_coordinator import work
+
+# Computes the binary split jobs of a distributed calculation (PI_SPLIT_MODE=distributed), on any node
+# that reaches the Redis of REDIS_URL:
+#   python -m app.split_worker --processes 8
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def _run(stopped):
+    # the parent handles the signals and sets `stopped`, a job in progress is finished first
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    work(SplitJobRepository(settings.REDIS_URL, job_timeout=settings.PI_SPLIT_JOB_TIMEOUT), stopped)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute distributed binary split jobs of the Pi calculation.")
+    parser.add_argument("--processes", type=int, default=0, help="worker processes (default: number of CPUs)")
+    args = parser.parse_args()
+
+    # spawned, each builds its own Redis connection
+    context = multiprocessing.get_context("spawn")
+    stopped = context.Event()
+    signalled = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: signalled.set())
+
+    processes = args.processes or os.cpu_count() or 1
+    logger.info(f"Starting {processes} split worker processes...")
+    workers = [context.Process(target=_run, args=(stopped,)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+
+    signalled.wait()
+
+    logger.info("Stopping split workers...")
+    stopped.set()
+    for worker in workers:
+        worker.join()
+    logger.info("Split worker shutdown complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import logging
+import signal
+import threading
+
+from prometheus_client import start_http_server
+
+from app.api.dependencies import leader_election, pi_service
+from app.config import settings
+
+# Runs the Pi calculation outside of the API processes (PI_CALCULATION_MODE=worker):
+#   python -m app.worker
+# The API processes then only serve, from the shared buffer (PI_SHARED_BUFFER_PATH) or Redis.
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    stopped = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopped.set())
+
+    logger.info("Starting Pi calculation worker...")
+    if settings.METRICS_ENABLED and settings.WORKER_METRICS_PORT:
+        start_http_server(settings.WORKER_METRICS_PORT)
+        logger.info(f"Serving metrics on port {settings.WORKER_METRICS_PORT}")
+    if settings.LEADER_ELECTION_ENABLED:
+        # several workers can run for failover, only the lease holder calculates
+        leader_election.start()
+    else:
+        pi_service.start_calculation()
+    logger.info(f"Maximum decimal places: {settings.MAX_DECIMAL_POINTS}")
+
+    stopped.wait()
+
+    logger.info("Stopping Pi calculation worker...")
+    if settings.LEADER_ELECTION_ENABLED:
+        leader_election.stop()
+    pi_service.stop_calculation()
+    logger.info("Worker shutdown complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Python package file 
\ No newline at end of file
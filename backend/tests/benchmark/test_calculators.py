@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.libs.calculator_registry import CALCULATORS, create_calculator  # noqa: E402
+
+# pytest-benchmark counterpart of python -m app.benchmark, small enough to run on every change:
+#   pytest tests/benchmark --benchmark-autosave
+#   pytest tests/benchmark --benchmark-compare --benchmark-compare-fail=mean:20%
+
+
+@pytest.mark.parametrize("decimal_places", [1000, 10000])
+@pytest.mark.parametrize("name", sorted(CALCULATORS))
+def test_calculate_pi(benchmark, name, decimal_places):
+    """Cold calculation, each round on a fresh calculator."""
+    calculators = []
+
+    def setup():
+        calculators.append(create_calculator(name, workers=1))
+        return (calculators[-1], decimal_places), {}
+
+    try:
+        pi_value = benchmark.pedantic(lambda calculator, precision: calculator.calculate_pi(precision),
+                                      setup=setup, rounds=5)
+    finally:
+        for calculator in calculators:
+            calculator.shutdown()
+
+    assert len(pi_value) == decimal_places + 2
+
+
+@pytest.mark.parametrize("name", sorted(CALCULATORS))
+def test_increasing_precision(benchmark, name):
+    """Steps the way PiService grows the precision, on one calculator."""
+    calculator = create_calculator(name, workers=1)
+    try:
+        benchmark.pedantic(lambda: [calculator.calculate_pi(precision) for precision in range(1000, 3000, 100)],
+                           rounds=1, iterations=1)
+    finally:
+        calculator.shutdown()
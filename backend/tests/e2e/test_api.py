@@ -1,9 +1,14 @@
+import asyncio
+import json
 import pytest
 import os
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
+from app.libs.digit_codec import unpack_digits
 from app.main import app
+from app.services.digit_broadcaster import DigitsEvent
+from app.services.hex_digit_service import HexDigitServiceBusy
 
 # Create test client
 client = TestClient(app)
@@ -24,7 +29,9 @@ def mock_env_variables():
 @pytest.fixture
 def mock_pi_service():
     mock_instance = MagicMock()
-    mock_instance.get_current_pi.return_value = (mockedPiValue, len(mockedPiValue) - 2)
+    mock_instance.get_current_pi = AsyncMock(return_value=(mockedPiValue, len(mockedPiValue) - 2))
+    mock_instance.get_pi_digits = AsyncMock()
+    mock_instance.get_current_pi_bytes = AsyncMock(return_value=(mockedPiValue.encode(), len(mockedPiValue) - 2))
     
     with patch("app.api.dependencies.pi_service", mock_instance), \
          patch("app.api.dependencies.get_pi_service", return_value=mock_instance):
@@ -45,6 +52,97 @@ def test_get_pi_with_valid_api_key(mock_pi_service):
     # Check the first 10 digits of the response values
     assert data["pi"].startswith(mockedPiValue[:10])
 
+def test_get_pi_not_modified(mock_pi_service):
+    """Test that polling with the current ETag returns 304 without a body."""
+    response = client.get("/api/pi", headers={"x-api-key": TEST_API_KEY})
+    etag = response.headers["etag"]
+    
+    response = client.get("/api/pi", headers={"x-api-key": TEST_API_KEY, "if-none-match": etag})
+    
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+def test_get_pi_modified_after_new_version(mock_pi_service):
+    """Test that an ETag from an older version gets the full response."""
+    response = client.get("/api/pi", headers={"x-api-key": TEST_API_KEY, "if-none-match": '"1"'})
+    
+    assert response.status_code == 200
+    assert response.json()["pi"] == mockedPiValue
+
+def test_get_pi_modified_for_other_representation(mock_pi_service):
+    """Test that an ETag of another format or content coding gets the full response, a list with this one doesn't."""
+    response = client.get("/api/pi", headers={"x-api-key": TEST_API_KEY, "accept-encoding": "gzip"})
+    gzip_etag = response.headers["etag"]
+    
+    headers = {"x-api-key": TEST_API_KEY, "accept-encoding": "identity", "if-none-match": gzip_etag}
+    response = client.get("/api/pi?format=text", headers=headers)
+    assert response.status_code == 200
+    assert response.text == mockedPiValue
+    
+    text_etag = response.headers["etag"]
+    headers["if-none-match"] = f"{gzip_etag}, W/{text_etag}"
+    response = client.get("/api/pi?format=text", headers=headers)
+    assert response.status_code == 304
+
+def test_get_pi_text(mock_pi_service):
+    """Test that format=text returns the value as stored."""
+    response = client.get("/api/pi?format=text", headers={"x-api-key": TEST_API_KEY, "accept-encoding": "identity"})
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.headers["x-pi-decimal-places"] == str(len(mockedPiValue) - 2)
+    assert response.text == mockedPiValue
+
+def test_get_pi_packed(mock_pi_service):
+    """Test that format=packed returns the decimal places as BCD."""
+    response = client.get("/api/pi?format=packed", headers={"x-api-key": TEST_API_KEY, "accept-encoding": "gzip"})
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["etag"] == f'"{len(mockedPiValue) - 2}-packed-gzip"'
+    assert unpack_digits(response.content) == mockedPiValue[2:]
+
+def test_get_pi_compressed(mock_pi_service):
+    """Test that the body is compressed according to Accept-Encoding."""
+    response = client.get("/api/pi", headers={"x-api-key": TEST_API_KEY, "accept-encoding": "gzip"})
+    
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json()["pi"] == mockedPiValue
+    
+    response = client.get("/api/pi", headers={"x-api-key": TEST_API_KEY, "accept-encoding": "identity"})
+    
+    assert "content-encoding" not in response.headers
+    assert response.json()["pi"] == mockedPiValue
+
+def test_stream_pi_digits(mock_pi_service):
+    """Test that the stream first sends the missed digits, then only the new ones."""
+    queue = asyncio.Queue()
+    queue.put_nowait(DigitsEvent(19, "4626", 22))  # overlaps what was already sent
+    queue.put_nowait(None)
+    mock_pi_service.subscribe_digits.return_value = queue
+    mock_pi_service.get_pi_digits.side_effect = lambda start, length: (
+        mockedPiValue[start + 1:start + 1 + length], len(mockedPiValue) - 2
+    )
+    
+    response = client.get("/api/pi/stream", headers={"x-api-key": TEST_API_KEY, "last-event-id": "15"})
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    
+    events = [
+        json.loads(line[len("data: "):])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert events == [
+        {"start": 16, "digits": mockedPiValue[17:], "dp": "20"},
+        {"start": 21, "digits": "26", "dp": "22"},
+    ]
+    mock_pi_service.unsubscribe_digits.assert_called_once_with(queue)
+
 def test_get_pi_with_invalid_api_key():
     """Test retrieving Pi with an invalid API key."""
     response = client.get("/api/pi", headers={"x-api-key": "invalid_key"})
@@ -67,4 +165,120 @@ def test_get_pi_service_unavailable(mock_pi_service):
     assert response.status_code == 503
     data = response.json()
     assert "detail" in data
-    assert "not available" in data["detail"] 
\ No newline at end of file
+    assert "not available" in data["detail"] 
+
+def test_get_pi_digits_window(mock_pi_service):
+    """Test retrieving a window of Pi digits."""
+    mock_pi_service.get_pi_digits.return_value = (mockedPiValue[6:11], len(mockedPiValue) - 2)
+    
+    response = client.get("/api/pi/digits?start=5&length=5", headers={"x-api-key": TEST_API_KEY})
+    
+    assert response.status_code == 200
+    mock_pi_service.get_pi_digits.assert_called_once_with(5, 5)
+    
+    data = response.json()
+    assert data["digits"] == "92653"
+    assert data["start"] == 5
+    assert data["dp"] == str(len(mockedPiValue) - 2)
+
+def test_get_pi_digits_tail(mock_pi_service):
+    """Test retrieving the last digits of Pi when no start is given."""
+    mock_pi_service.get_pi_digits.return_value = (mockedPiValue[-4:], len(mockedPiValue) - 2)
+    
+    response = client.get("/api/pi/digits?length=4", headers={"x-api-key": TEST_API_KEY})
+    
+    assert response.status_code == 200
+    mock_pi_service.get_pi_digits.assert_called_once_with(None, 4)
+    
+    data = response.json()
+    assert data["digits"] == "3846"
+    assert data["start"] == len(mockedPiValue) - 2 - 3
+
+def test_get_pi_digits_packed(mock_pi_service):
+    """Test retrieving a window of Pi digits as BCD."""
+    mock_pi_service.get_pi_digits.return_value = (mockedPiValue[6:11], len(mockedPiValue) - 2)
+    
+    response = client.get("/api/pi/digits?start=5&length=5&format=packed", headers={"x-api-key": TEST_API_KEY})
+    
+    assert response.status_code == 200
+    assert response.headers["x-pi-start"] == "5"
+    assert response.headers["x-pi-decimal-places"] == str(len(mockedPiValue) - 2)
+    assert unpack_digits(response.content) == "92653"
+
+def test_get_pi_hex_digits():
+    """Test retrieving hexadecimal digits of Pi from a position."""
+    mock_instance = MagicMock()
+    mock_instance.get_hex_digits = AsyncMock(return_value="85a308d3")
+    
+    with patch("app.api.dependencies.hex_digit_service", mock_instance):
+        response = client.get("/api/pi/hex/9", headers={"x-api-key": TEST_API_KEY})
+    
+    assert response.status_code == 200
+    mock_instance.get_hex_digits.assert_awaited_once_with(9, 8)
+    assert response.json() == {"digits": "85a308d3", "start": 9}
+
+def test_get_pi_hex_digits_busy():
+    """Test that requests beyond the hexadecimal digits extracted at the same time get 503."""
+    mock_instance = MagicMock()
+    mock_instance.get_hex_digits = AsyncMock(side_effect=HexDigitServiceBusy("busy"))
+    
+    with patch("app.api.dependencies.hex_digit_service", mock_instance):
+        response = client.get("/api/pi/hex/9", headers={"x-api-key": TEST_API_KEY})
+    
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+def test_get_pi_hex_digits_invalid_position():
+    """Test that hexadecimal places start at 1."""
+    response = client.get("/api/pi/hex/0", headers={"x-api-key": TEST_API_KEY})
+    
+    assert response.status_code == 422
+
+def test_get_pi_digits_invalid_range(mock_pi_service):
+    """Test that an invalid window is rejected."""
+    response = client.get("/api/pi/digits?start=0&length=5", headers={"x-api-key": TEST_API_KEY})
+    
+    assert response.status_code == 422
+
+def test_metrics(mock_pi_service):
+    """Test that API requests show up in the Prometheus metrics, served without the API key."""
+    client.get("/api/pi", headers={"x-api-key": TEST_API_KEY, "accept-encoding": "identity"})
+    
+    response = client.get("/metrics")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'pi_http_request_duration_seconds_count{method="GET",route="/api/pi",status="200"}' in response.text
+    assert 'pi_http_response_size_bytes_count{encoding="identity",route="/api/pi"}' in response.text
+
+def test_get_pi_on_demand(mock_pi_service):
+    """Test retrieving Pi to a requested number of decimal places."""
+    mock_pi_service.get_pi_on_demand = AsyncMock(return_value=mockedPiValue[:12])
+    
+    response = client.get("/api/pi?dp=10", headers={"x-api-key": TEST_API_KEY})
+    
+    assert response.status_code == 200
+    assert response.json() == {"pi": mockedPiValue[:12], "dp": "10"}
+    assert "immutable" in response.headers["cache-control"]
+    
+    response = client.get("/api/pi?dp=10&format=text", headers={"x-api-key": TEST_API_KEY})
+    assert response.content == mockedPiValue[:12].encode()
+    assert response.headers["x-pi-decimal-places"] == "10"
+
+def test_get_pi_on_demand_pending(mock_pi_service):
+    """Test that a precision still being calculated returns 202 with the progress."""
+    mock_pi_service.get_pi_on_demand = AsyncMock(return_value=None)
+    mock_pi_service.get_on_demand_progress = MagicMock(
+        return_value=MagicMock(status="calculating", available_dp=20, elapsed=1.5)
+    )
+    
+    response = client.get("/api/pi?dp=5000", headers={"x-api-key": TEST_API_KEY})
+    
+    assert response.status_code == 202
+    assert response.json() == {"dp": "5000", "status": "calculating", "available_dp": "20", "elapsed": 1.5}
+    assert "retry-after" in response.headers
+
+def test_get_pi_on_demand_limit(mock_pi_service):
+    """Test that precisions beyond the on-demand limit are rejected."""
+    response = client.get("/api/pi?dp=1000000000", headers={"x-api-key": TEST_API_KEY})
+    assert response.status_code == 422
@@ -0,0 +1,66 @@
+import json
+from dataclasses import asdict
+
+from app.benchmark import BenchmarkResult, check_digits, compare, load_results, run_case, run_grid, suggest_crossovers
+from app.libs.pi_calculator import PiCalculator
+
+
+def result(calculator, decimal_places, wall_time, status="ok", workers=1):
+    return BenchmarkResult(calculator, decimal_places, workers, status, wall_time=wall_time)
+
+
+class TestBenchmark:
+    """Test cases for the benchmark harness."""
+
+    def test_run_case(self):
+        """Test that a case is measured in a fresh process."""
+        measured = run_case("chudnovsky-serial", 1000, 1)
+        assert measured.status == "ok"
+        assert measured.wall_time > 0
+        assert measured.peak_rss > 0
+        assert measured.digits_per_second > 0
+
+    def test_check_digits(self):
+        """Test that a wrong digit fails the check, within the reference file and beyond it."""
+        pi_value = PiCalculator(workers=1).calculate_pi(3000)
+
+        def wrong_at(decimal_place):
+            digit = str((int(pi_value[decimal_place + 1]) + 1) % 10)
+            return pi_value[:decimal_place + 1] + digit + pi_value[decimal_place + 2:]
+
+        assert check_digits(pi_value[:1002], 1000)
+        assert check_digits(pi_value, 3000)
+        assert not check_digits(pi_value[:1001], 1000)
+        assert not check_digits(wrong_at(500)[:1002], 1000)
+        assert not check_digits(wrong_at(2000), 3000)
+
+    def test_timeout_skips_larger_precisions(self):
+        """Test that a calculator that times out isn't run at the larger precisions."""
+        results = run_grid(["machin"], [10**7, 10**8], [1], timeout=0.5)
+        assert [r.status for r in results] == ["timeout", "skipped"]
+
+    def test_compare(self):
+        """Test that only slowdowns beyond the threshold and cases that no longer finish are regressions."""
+        baseline = [result("machin", 1000, 1.0), result("machin", 10000, 1.0), result("machin", 100000, 1.0)]
+        results = [result("machin", 1000, 1.1), result("machin", 10000, 1.3), result("machin", 100000, 0, "timeout"),
+                   result("gauss-legendre", 1000, 5.0)]
+        regressions = compare(results, baseline, threshold=0.2)
+        assert [(r.decimal_places, r.status) for r, _ in regressions] == [(10000, "ok"), (100000, "timeout")]
+
+    def test_suggest_crossovers(self):
+        """Test that the fastest calculator of each precision is suggested from 0 on."""
+        results = [
+            result("chudnovsky-serial", 1000, 0.1), result("chudnovsky-integer", 1000, 0.2),
+            result("chudnovsky-serial", 10000, 0.5), result("chudnovsky-integer", 10000, 0.4),
+            result("chudnovsky-serial", 100000, 5.0), result("chudnovsky-integer", 100000, 4.0),
+            result("machin", 100000, 0, "timeout"),
+        ]
+        assert suggest_crossovers(results) == "chudnovsky-serial:0,chudnovsky-integer:10000"
+        assert suggest_crossovers([result("machin", 1000, 0, "timeout")]) is None
+
+    def test_load_results(self, tmp_path):
+        """Test that the JSON output can be read back as a baseline."""
+        results = [result("machin", 1000, 0.5)]
+        path = tmp_path / "benchmark.json"
+        path.write_text(json.dumps({"machine": {}, "results": [asdict(r) for r in results]}))
+        assert load_results(str(path)) == results
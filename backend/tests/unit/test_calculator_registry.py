@@ -0,0 +1,60 @@
+import mpmath
+import pytest
+
+from app.libs.calculator_registry import CALCULATORS, AutoPiCalculator, create_calculator, parse_crossovers
+from app.libs.from_scratch_pi_calculator import FromScratchPiCalculator
+
+
+def reference_pi(decimal_places):
+    """Pi truncated to the given decimal places."""
+    with mpmath.workdps(decimal_places + 20):
+        return mpmath.nstr(+mpmath.pi, decimal_places + 10, strip_zeros=False)[:decimal_places + 2]
+
+
+class TestCalculatorRegistry:
+    """Test cases for the Pi calculator registry."""
+
+    @pytest.mark.parametrize("name", sorted(CALCULATORS))
+    def test_calculators_match_reference(self, name):
+        """Test that every registered calculator gives the same digits, also when the precision grows."""
+        calculator = create_calculator(name, workers=1)
+        try:
+            for decimal_places in (1, 37, 500, 503):
+                assert calculator.calculate_pi(decimal_places) == reference_pi(decimal_places)
+            assert calculator.calculate_pi_digits(500, 491) == reference_pi(500)[-10:]
+        finally:
+            calculator.shutdown()
+
+    def test_unknown_calculator(self):
+        """Test that an unknown name is rejected."""
+        with pytest.raises(ValueError):
+            create_calculator("bellard")
+
+    def test_parse_crossovers(self):
+        """Test parsing the ranges of the auto policy."""
+        assert parse_crossovers("machin:1000, chudnovsky-serial:0") == [(0, "chudnovsky-serial"), (1000, "machin")]
+        with pytest.raises(ValueError):
+            parse_crossovers("chudnovsky-serial:0,bellard:1000")
+        with pytest.raises(ValueError):
+            parse_crossovers("chudnovsky-serial:100")
+
+    def test_from_scratch_algorithm_required(self):
+        """Test that a from-scratch calculator without an algorithm can't be created."""
+        class Incomplete(FromScratchPiCalculator):
+            pass
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    def test_auto_switches_at_crossover(self):
+        """Test that the auto policy hands each precision to the calculator of its range."""
+        calculator = AutoPiCalculator(parse_crossovers("chudnovsky-serial:0,gauss-legendre:200"), workers=1)
+        try:
+            assert calculator.calculate_pi(199) == reference_pi(199)
+            assert calculator.series_state()[1] is not None
+            assert calculator.calculate_pi(250) == reference_pi(250)
+            assert calculator.series_state()[1] is None
+            assert calculator.calculate_pi(100) == reference_pi(100)
+            assert calculator.series_state()[1] is None  # lower precisions don't switch back
+        finally:
+            calculator.shutdown()
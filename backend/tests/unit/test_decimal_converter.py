@@ -0,0 +1,34 @@
+import random
+
+from app.libs.decimal_converter import DecimalConverter
+
+
+class TestDecimalConverter:
+    """Test cases for the divide-and-conquer decimal converter."""
+
+    def setup_method(self):
+        """Setup method run before each test."""
+        self.converter = DecimalConverter(leaf_digits=64)
+        self.rng = random.Random(7)
+
+    def test_to_digits(self):
+        """Test converting integers to a fixed number of zero padded digits."""
+        for width in (1, 63, 64, 65, 129, 1000, 3000):
+            n = self.rng.randrange(10 ** width)
+            assert self.converter.to_digits(n, width) == str(n).zfill(width)
+        assert self.converter.to_digits(0, 200) == "0" * 200
+
+    def test_digit_range(self):
+        """Test emitting only a range of digits."""
+        width = 3000
+        n = self.rng.randrange(10 ** width)
+        digits = str(n).zfill(width)
+        for start, stop in ((0, 10), (1490, 1510), (2990, 3000), (0, 3000), (100, 100), (2500, 5000)):
+            assert self.converter.digit_range(n, width, start, stop) == digits[start:stop]
+
+    def test_from_digits(self):
+        """Test converting digit strings back to integers."""
+        for width in (1, 64, 65, 1000, 3000):
+            n = self.rng.randrange(10 ** width)
+            assert self.converter.from_digits(str(n).zfill(width)) == n
+        assert self.converter.from_digits("") == 0
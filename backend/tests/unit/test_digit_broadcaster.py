@@ -0,0 +1,40 @@
+from app.services.digit_broadcaster import DigitBroadcaster, DigitsEvent
+
+
+class TestDigitBroadcaster:
+    """Test cases for fanning out new digits to subscribers."""
+
+    def setup_method(self):
+        """Setup method run before each test."""
+        self.broadcaster = DigitBroadcaster(max_queue_size=2)
+
+    def test_publish_to_all_subscribers(self):
+        """Test that every subscriber receives the published events."""
+        first, second = self.broadcaster.subscribe(), self.broadcaster.subscribe()
+        event = DigitsEvent(1, "14", 2)
+
+        self.broadcaster.publish(event)
+
+        assert first.get_nowait() == event
+        assert second.get_nowait() == event
+
+    def test_unsubscribe(self):
+        """Test that an unsubscribed queue no longer receives events."""
+        queue = self.broadcaster.subscribe()
+        self.broadcaster.unsubscribe(queue)
+
+        self.broadcaster.publish(DigitsEvent(1, "1", 1))
+
+        assert queue.empty()
+        assert not self.broadcaster.has_subscribers()
+
+    def test_slow_subscriber_is_disconnected(self):
+        """Test that a subscriber that falls behind gets None instead of a partial stream."""
+        queue = self.broadcaster.subscribe()
+
+        for dp in range(1, 4):
+            self.broadcaster.publish(DigitsEvent(dp, "1", dp))
+
+        assert queue.get_nowait() is None
+        assert queue.empty()
+        assert not self.broadcaster.has_subscribers()
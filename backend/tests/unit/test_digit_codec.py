@@ -0,0 +1,41 @@
+import pytest
+
+from app.libs.digit_codec import pack_digits, packed_byte_range, packed_size, unpack_digits, unpack_window
+
+
+class TestDigitCodec:
+    """Test cases for the packed BCD digit encoding."""
+
+    def test_round_trip(self):
+        """Test that packing and unpacking gives back the digits, for even and odd counts."""
+        for digits in ["", "1", "14", "14159", "1415926535"]:
+            packed = pack_digits(digits)
+            assert len(packed) == packed_size(len(digits))
+            assert unpack_digits(packed) == digits
+
+    def test_layout(self):
+        """Test the nibble order and padding."""
+        assert pack_digits("14159") == b"\x14\x15\x9f"
+        assert pack_digits(b"1415") == b"\x14\x15"
+        assert unpack_digits(b"\x14\x15\x9f", 3) == "141"
+
+    def test_rejects_non_digits(self):
+        """Test that only decimal digits are packed."""
+        with pytest.raises(ValueError):
+            pack_digits("3.14")
+        with pytest.raises(ValueError):
+            pack_digits("1a")
+
+    def test_windows(self):
+        """Test that windows read from packed storage unpack to the same digits as the text."""
+        digits = "14159265358"
+        packed = pack_digits(digits)
+
+        for start in range(1, len(digits) + 3):
+            for length in range(1, 6):
+                first, last = packed_byte_range(start, length)
+                expected = digits[start - 1:start - 1 + length]
+                assert unpack_window(packed[first:last + 1], start, length, len(digits)) == expected
+
+        for length in range(1, len(digits) + 3):
+            assert unpack_window(packed[-(length // 2 + 1):], None, length, len(digits)) == digits[-length:]
@@ -0,0 +1,67 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.libs.bbp import pi_hex_digits
+from app.services.hex_digit_service import BLOCK_DIGITS, HexDigitService, HexDigitServiceBusy
+
+PI_HEX = "243f6a8885a308d313198a2e03707344a4093822299f31d0082efa98ec4e6c89452821e638d01377be5466cf34e90c6cc0ac29b7c97c50dd3f84d5b5b5470917"
+
+
+class TestHexDigitService:
+    """Test cases for the BBP hexadecimal digit service."""
+
+    def setup_method(self):
+        """Setup method run before each test."""
+        self.service = HexDigitService(workers=2, cache_size=2)
+
+    def teardown_method(self):
+        """Teardown method run after each test."""
+        self.service.shutdown()
+
+    def test_digits_across_blocks(self):
+        """Test digits from one block and spanning two blocks."""
+        assert asyncio.run(self.service.get_hex_digits(1, 16)) == PI_HEX[:16]
+        assert asyncio.run(self.service.get_hex_digits(60, 10)) == PI_HEX[59:69]
+        assert asyncio.run(self.service.get_hex_digits(5000, 8)) == pi_hex_digits(5000, 8)
+
+    def test_concurrent_requests_share_a_block(self):
+        """Test that concurrent requests within a block compute it once, and later ones hit the cache."""
+        async def read_many():
+            return await asyncio.gather(*(self.service.get_hex_digits(position, 4) for position in range(1, 20)))
+
+        with patch.object(self.service, "_compute_block", wraps=self.service._compute_block) as compute:
+            results = asyncio.run(read_many())
+            asyncio.run(self.service.get_hex_digits(3, 4))
+
+        assert results == [PI_HEX[position - 1:position + 3] for position in range(1, 20)]
+        compute.assert_called_once_with(0)
+
+    def test_cache_evicts_least_recently_used(self):
+        """Test that the cache keeps at most cache_size blocks."""
+        for block in range(3):
+            asyncio.run(self.service.get_hex_digits(block * BLOCK_DIGITS + 1, 1))
+
+        assert list(self.service._cache) == [1, 2]
+
+    def test_busy_beyond_max_pending_blocks(self):
+        """Test that new blocks beyond the most computed at once are rejected, while shared ones still wait."""
+        service = HexDigitService(workers=1, max_pending_blocks=1)
+
+        async def slow_compute_block(block):
+            await asyncio.sleep(0.05)
+            return PI_HEX[:BLOCK_DIGITS]
+
+        async def request_many():
+            first = asyncio.create_task(service.get_hex_digits(1, 4))
+            await asyncio.sleep(0.01)  # block 0 is being computed
+            with pytest.raises(HexDigitServiceBusy):
+                await service.get_hex_digits(BLOCK_DIGITS + 1, 4)
+            shared = await service.get_hex_digits(5, 4)
+            return await first, shared
+
+        with patch.object(service, "_compute_block", side_effect=slow_compute_block):
+            assert asyncio.run(request_many()) == (PI_HEX[:4], PI_HEX[4:8])
+            # once done, a request with more blocks than the limit runs alone
+            assert asyncio.run(service.get_hex_digits(BLOCK_DIGITS - 1, 8)) == PI_HEX[BLOCK_DIGITS - 2:BLOCK_DIGITS] + PI_HEX[:6]
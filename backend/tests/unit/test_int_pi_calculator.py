@@ -0,0 +1,40 @@
+import random
+
+from app.libs.bigint import divide
+from app.libs.int_pi_calculator import IntPiCalculator
+
+
+class TestIntPiCalculator:
+    """Test cases for the exact-integer Pi calculator."""
+
+    def setup_method(self):
+        """Setup method run before each test."""
+        self.calculator = IntPiCalculator(workers=1)
+
+    def test_calculate_pi_small_precision(self):
+        """Test calculating Pi to a small precision (10 places)."""
+        pi_value = self.calculator.calculate_pi(10)
+        assert self.calculator.verify_accuracy(pi_value, 10)
+        assert len(pi_value) == 12
+
+    def test_calculate_pi_increasing_precision(self):
+        """Test calculating Pi with increasing precision reusing the accumulated terms."""
+        for decimal_places in range(1, 300):
+            pi_value = self.calculator.calculate_pi(decimal_places)
+            assert len(pi_value) == decimal_places + 2
+        assert self.calculator.verify_accuracy(pi_value, 299)
+
+    def test_calculate_pi_large_precision(self):
+        """Test calculating Pi to a large precision (50000 places), which uses the Newton division."""
+        pi_value = self.calculator.calculate_pi(50000)
+        assert self.calculator.verify_accuracy(pi_value, 50000)
+        assert len(pi_value) == 50002
+
+
+def test_divide_matches_floor_division():
+    """Test the Newton division against the built-in one on large operands."""
+    rng = random.Random(42)
+    for _ in range(20):
+        divisor = rng.getrandbits(rng.randint(30000, 120000)) | 1
+        dividend = divisor * rng.getrandbits(rng.randint(30000, 120000)) + rng.randint(-1, 1)
+        assert divide(dividend, divisor) == dividend // divisor
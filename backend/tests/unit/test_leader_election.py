@@ -0,0 +1,83 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.repositories import redis_repository
+from app.repositories.redis_repository import RedisRepository
+from app.services.leader_election import LeaderElection
+
+
+class TestLeaderElection:
+    """Test cases for the calculation leader election."""
+
+    def setup_method(self):
+        """Setup method run before each test."""
+        self.pi_service = MagicMock()
+        self.repository = MagicMock()
+        self.election = LeaderElection(self.pi_service, self.repository, lease_ttl=3.0)
+
+    def test_disabled_election_leaves_writes_unfenced(self):
+        """Test that an election that is never started doesn't fence the writes, as nobody takes the lease."""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")  # the cache scripts are Lua
+        repository = RedisRepository("redis://localhost:6379/0")
+        repository._redis = fakeredis.FakeRedis()
+        repository._cache_script = repository._redis.register_script(redis_repository.CACHE_PI_SCRIPT)
+
+        LeaderElection(self.pi_service, repository)
+
+        assert repository.cache_pi("3.14", 2)
+        assert repository.get_decimal_places() == 2
+
+    def test_start_fences_writes(self):
+        """Test that the repository writes are fenced with this process's lease token once the election starts."""
+        self.repository.use_lease.assert_not_called()
+        self.repository.acquire_lease.return_value = False
+
+        self.election.start()
+        self.election.stop()
+
+        self.repository.use_lease.assert_called_once()
+
+    def test_acquire_starts_calculation(self):
+        """Test that acquiring the lease starts the calculation."""
+        self.repository.acquire_lease.return_value = True
+
+        self.election._elect()
+
+        assert self.election.is_leader
+        self.repository.acquire_lease.assert_called_once_with(3000)
+        self.pi_service.start_calculation.assert_called_once()
+
+    def test_follower_stays_read_only(self):
+        """Test that a process that doesn't get the lease doesn't calculate."""
+        self.repository.acquire_lease.return_value = False
+
+        self.election._elect()
+
+        assert not self.election.is_leader
+        self.pi_service.start_calculation.assert_not_called()
+
+    def test_lost_lease_stops_calculation(self):
+        """Test that failing to renew the lease stops the calculation."""
+        self.repository.acquire_lease.return_value = True
+        self.election._elect()
+
+        self.repository.renew_lease.return_value = True
+        self.election._elect()
+        self.pi_service.stop_calculation.assert_not_called()
+
+        self.repository.renew_lease.return_value = False
+        self.election._elect()
+        assert not self.election.is_leader
+        self.pi_service.stop_calculation.assert_called_once()
+
+    def test_stop_releases_lease(self):
+        """Test that stopping the leader hands the lease over."""
+        self.repository.acquire_lease.return_value = True
+        self.election._elect()
+
+        self.election.stop()
+
+        self.pi_service.stop_calculation.assert_called_once()
+        self.repository.release_lease.assert_called_once()
@@ -0,0 +1,112 @@
+import contextlib
+import os
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.libs.pi_calculator import PiCalculator
+from app.services import memory_budget
+from app.services.memory_budget import MemoryBudget, RssTracker, process_rss
+from app.services.pi_service import PiService
+
+MIB = 2**20
+
+
+def budget_calculator(workers=4):
+    """A calculator whose estimate is 100 MiB per worker, plus 100 MiB for a pooled merge."""
+    calculator = MagicMock()
+    calculator.workers = workers
+    calculator.worker_pids.return_value = []
+    calculator.estimate_peak_bytes.side_effect = \
+        lambda decimal_places, workers=None, pooled_merge=None: ((workers or 1) + bool(pooled_merge)) * 100 * MIB
+    return calculator
+
+
+class TestMemoryBudget:
+    """Test cases for keeping the calculation within a memory budget."""
+
+    def test_process_rss(self):
+        """Test reading the RSS of this process."""
+        assert process_rss(os.getpid()) > 0
+        assert process_rss(-1) is None
+
+    def test_tracker_calls_on_exceeded_once(self):
+        """Test that the tracker keeps the peak and reports going above the limit once."""
+        exceeded = MagicMock()
+        with RssTracker(lambda: [os.getpid()], interval=0.01, limit=1, on_exceeded=exceeded) as tracker:
+            data = bytearray(16 * MIB)
+            tracker._sample()
+
+        assert tracker.exceeded
+        assert tracker.peak_rss >= tracker.start_rss > 0
+        exceeded.assert_called_once()
+        del data
+
+    @patch("app.services.memory_budget.total_rss", return_value=100 * MIB)
+    def test_plan_most_parallel_setting_that_fits(self, _):
+        """Test that the plan lowers the workers and pools the merge only while it doesn't fit."""
+        calculator = budget_calculator()
+
+        assert MemoryBudget(1000 * MIB).plan(calculator, 1000) == 0
+        calculator.set_parallelism.assert_called_with(4, True)
+        assert MemoryBudget(500 * MIB).plan(calculator, 1000) == 1
+        calculator.set_parallelism.assert_called_with(4, False)
+        assert MemoryBudget(300 * MIB).plan(calculator, 1000) == 2
+        calculator.set_parallelism.assert_called_with(2, False)
+        assert MemoryBudget(300 * MIB).plan(calculator, 1000, min_setting=3) == 3
+        calculator.set_parallelism.assert_called_with(1, False)
+
+    @patch("app.services.memory_budget.total_rss", return_value=100 * MIB)
+    def test_plan_pauses_while_nothing_fits(self, _):
+        """Test that the plan waits while not even a serial step fits, until stopped."""
+        calculator = budget_calculator()
+        running = iter([True, False])
+
+        with patch.object(memory_budget, "PAUSE_RECHECK_INTERVAL", 0.001):
+            assert MemoryBudget(150 * MIB).plan(calculator, 1000, is_running=lambda: next(running)) is None
+            # without waiting it goes ahead with the least memory
+            assert MemoryBudget(150 * MIB).plan(calculator, 1000) == 3
+
+    def test_calibration_only_corrected_upwards(self):
+        """Test that a step peaking below its estimate doesn't lower the correction of an earlier one above it."""
+        budget = MemoryBudget()
+        estimate = 100 * MIB
+
+        for peak_bytes in (300 * MIB, 150 * MIB, 10 * MIB):
+            tracker = MagicMock(start_rss=0, peak_rss=peak_bytes, exceeded=False)
+            with patch.object(memory_budget, "RssTracker", return_value=contextlib.nullcontext(tracker)):
+                with budget.track(budget_calculator(), budget.estimate(budget_calculator(), 1000, 1, False)):
+                    pass
+            assert budget.estimate(budget_calculator(), 1000, 1, False) == 3 * estimate
+
+    def test_service_retries_with_less_parallelism(self):
+        """Test that a step whose pool was stopped for going above the budget is calculated again with less."""
+        budget = MemoryBudget(10**15)
+        budget.track = MagicMock(return_value=contextlib.nullcontext(MagicMock(exceeded=True)))
+        calculator = budget_calculator()
+        calculator.calculate_pi.side_effect = [BrokenProcessPool(), "3.14"]
+        service = PiService(calculator, MagicMock(), MagicMock(), memory_budget=budget)
+
+        assert service._calculate_within_budget(2, None) == "3.14"
+        assert [call.args for call in calculator.set_parallelism.call_args_list] == [(4, True), (4, False)]
+
+    def test_service_raises_broken_pool_within_budget(self):
+        """Test that a pool that broke for another reason isn't retried."""
+        budget = MemoryBudget(10**15)
+        budget.track = MagicMock(return_value=contextlib.nullcontext(MagicMock(exceeded=False)))
+        calculator = budget_calculator()
+        calculator.calculate_pi.side_effect = BrokenProcessPool()
+        service = PiService(calculator, MagicMock(), MagicMock(), memory_budget=budget)
+
+        with pytest.raises(BrokenProcessPool):
+            service._calculate_within_budget(2, None)
+
+    def test_service_calculates_real_step(self):
+        """Test a step of a real calculator through the budget, with its peak measured."""
+        calculator = PiCalculator(workers=2)
+        service = PiService(calculator, MagicMock(), MagicMock(), memory_budget=MemoryBudget(10**15, 0.01))
+        try:
+            assert service._calculate_within_budget(20000, None) == PiCalculator(workers=1).calculate_pi(20000)
+        finally:
+            calculator.shutdown()
@@ -25,4 +25,69 @@ class TestPiCalculator:
         pi_value = self.calculator.calculate_pi(10000)
         assert self.calculator.verify_accuracy(pi_value, 10000)
         assert len(pi_value) == 10002
-    
\ No newline at end of file
+    
+    def test_calculate_pi_increasing_precision(self):
+        """Test that reusing the accumulated terms gives the same digits as a fresh calculation."""
+        for decimal_places in range(1, 300):
+            pi_value = self.calculator.calculate_pi(decimal_places)
+            assert pi_value == PiCalculator().calculate_pi(decimal_places)
+        assert self.calculator.verify_accuracy(pi_value, 299)
+
+    def test_pop_stats(self):
+        """Test that the phases of a calculation are timed, and reset once read."""
+        self.calculator.calculate_pi(1000)
+        stats = self.calculator.pop_stats()
+        assert {"split", "division", "stringify"} <= stats.keys()
+        assert all(seconds >= 0 for seconds in stats.values())
+
+        self.calculator.calculate_pi(5000)
+        assert "merge" in self.calculator.pop_stats()
+        assert self.calculator.pop_stats() == {}
+
+    def test_pool_utilization(self):
+        """Test that a pooled split reports how busy the pool was."""
+        calculator = PiCalculator(workers=2)
+        try:
+            calculator.calculate_pi(10000)
+            assert 0 < calculator.pop_stats()["pool_utilization"] <= 1
+        finally:
+            calculator.shutdown()
+
+    def test_parallel_binary_split_matches_serial(self):
+        """Test that spreading the split across the worker pool gives the same P, Q, T as the serial split."""
+        calculator = PiCalculator(workers=3)
+        try:
+            assert calculator._parallel_binary_split(0, 500) == PiCalculator._binary_split(0, 500)
+            assert calculator._parallel_binary_split(500, 1000) == PiCalculator._binary_split(500, 1000)
+        finally:
+            calculator.shutdown()
+
+    def test_serial_merge_matches_pooled(self):
+        """Test that merging the pool's results in this process, with fewer workers, gives the same P, Q, T."""
+        calculator = PiCalculator(workers=4)
+        try:
+            calculator.set_parallelism(3, pooled_merge=False)
+            assert calculator._parallel_binary_split(0, 500) == PiCalculator._binary_split(0, 500)
+            assert len(calculator.worker_pids()) == 3
+        finally:
+            calculator.shutdown()
+
+    def test_estimate_peak_bytes(self):
+        """Test that the memory estimate grows with the precision and the workers, and is 0 once calculated."""
+        calculator = PiCalculator(workers=4)
+        serial = calculator.estimate_peak_bytes(100000, workers=1)
+
+        assert 0 < calculator.estimate_peak_bytes(10000, workers=1) < serial
+        assert serial < calculator.estimate_peak_bytes(100000, workers=4, pooled_merge=False)
+        assert calculator.estimate_peak_bytes(100000, workers=4, pooled_merge=False) < calculator.estimate_peak_bytes(100000)
+
+        calculator.set_parallelism(1)
+        calculator.calculate_pi(100000)
+        assert calculator.estimate_peak_bytes(100000) == 0
+        assert 0 < calculator.estimate_peak_bytes(120000) < serial
+
+    def test_calculate_pi_digits(self):
+        """Test returning only the decimal places after a known prefix."""
+        pi_value = self.calculator.calculate_pi(100)
+        assert self.calculator.calculate_pi_digits(120, 101) == self.calculator.calculate_pi(120)[102:]
+        assert self.calculator.calculate_pi_digits(100, 1) == pi_value[2:]
@@ -0,0 +1,291 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from prometheus_client import REGISTRY
+
+from app.repositories.reference_repository import ReferenceRepository
+from app.repositories.shared_buffer_repository import SharedBufferRepository
+from app.services.pi_service import PiService
+from app.services.precision_scheduler import PrecisionScheduler
+
+REFERENCE_FILE = "resources/compressed_1m_university_minnesota.txt"
+with open(REFERENCE_FILE) as f:
+    REFERENCE_PI = f.read().strip()
+
+
+class TestPiServiceReadCache:
+    """Test cases for serving Pi from the in-process cache."""
+
+    def setup_method(self):
+        """Setup method run before each test."""
+        self.async_repository = MagicMock()
+        self.async_repository.get_cached_pi = AsyncMock(return_value=("3.14159", 5))
+        self.async_repository.get_decimal_places = AsyncMock(return_value=5)
+        self.async_repository.get_pi_digits = AsyncMock(return_value=("1415", 5))
+        self.service = PiService(MagicMock(), MagicMock(), self.async_repository)
+
+    def test_concurrent_reads_fetch_once(self):
+        """Test that concurrent requests share a single fetch."""
+        async def read_many():
+            return await asyncio.gather(*(self.service.get_current_pi() for _ in range(20)))
+
+        results = asyncio.run(read_many())
+
+        assert all(result == ("3.14159", 5) for result in results)
+        assert self.async_repository.get_cached_pi.await_count == 1
+
+    def test_newer_version_refreshes(self):
+        """Test that a newer published version replaces the in-memory value."""
+        asyncio.run(self.service.get_current_pi())
+
+        self.async_repository.get_cached_pi.return_value = ("3.141592", 6)
+        self.service._latest_dp = 6
+
+        assert asyncio.run(self.service.get_current_pi()) == ("3.141592", 6)
+        assert asyncio.run(self.service.get_current_pi()) == ("3.141592", 6)
+        assert self.async_repository.get_cached_pi.await_count == 2
+
+    def test_digits_served_from_memory(self):
+        """Test that digit windows are sliced from the in-memory value when it is up to date."""
+        asyncio.run(self.service.get_current_pi())
+
+        assert asyncio.run(self.service.get_pi_digits(2, 3)) == ("415", 5)
+        assert asyncio.run(self.service.get_pi_digits(None, 2)) == ("59", 5)
+        assert asyncio.run(self.service.get_pi_digits(None, 10)) == ("14159", 5)
+        self.async_repository.get_pi_digits.assert_not_awaited()
+
+
+class TestPiServiceSharedBuffer:
+    """Test cases for serving Pi handed over through the shared buffer."""
+
+    def test_served_from_shared_buffer(self, tmp_path):
+        """Test that a published version is served without going to Redis."""
+        async_repository = MagicMock()
+        async_repository.get_cached_pi = AsyncMock(return_value=("3.14", 2))
+        async_repository.get_decimal_places = AsyncMock(return_value=2)
+        shared_buffer = SharedBufferRepository(str(tmp_path / "pi.buf"), 100)
+        service = PiService(MagicMock(), MagicMock(), async_repository, shared_buffer)
+
+        SharedBufferRepository(str(tmp_path / "pi.buf"), 100).publish("3.14159", 5)
+
+        assert asyncio.run(service.get_current_pi()) == ("3.14159", 5)
+        assert asyncio.run(service.get_pi_digits(2, 3)) == ("415", 5)
+        view, decimal_places = asyncio.run(service.get_current_pi_bytes())
+        assert isinstance(view, memoryview)  # handed out without copying
+        assert (bytes(view), decimal_places) == (b"3.14159", 5)
+        async_repository.get_cached_pi.assert_not_awaited()
+        async_repository.get_decimal_places.assert_not_awaited()
+
+
+class TestPiServiceReference:
+    """Test cases for seeding the cache from a reference file."""
+
+    def setup_method(self):
+        """Setup method run before each test."""
+        self.calculator = MagicMock()
+        self.calculator.calculate_pi.side_effect = lambda decimal_places: REFERENCE_PI[:decimal_places + 2]
+        self.repository = MagicMock()
+        self.repository.cache_pi.return_value = True
+        self.reference = ReferenceRepository(REFERENCE_FILE)
+        self.service = PiService(self.calculator, self.repository, MagicMock(), reference=self.reference)
+
+    def test_seeds_empty_cache(self):
+        """Test that an empty cache is seeded up to the end of the reference file."""
+        assert self.service._seed_from_reference(None) == 1183
+        self.repository.cache_pi.assert_called_once_with(REFERENCE_PI, 1183)
+
+    def test_keeps_longer_cache(self):
+        """Test that a cache going further than the reference file is left alone."""
+        assert self.service._seed_from_reference(2000) is None
+        self.repository.cache_pi.assert_not_called()
+
+    def test_rejects_mismatching_reference(self):
+        """Test that a reference file disagreeing with the calculator isn't used."""
+        self.calculator.calculate_pi.side_effect = lambda decimal_places: "3." + "0" * decimal_places
+
+        assert self.service._seed_from_reference(None) is None
+        self.repository.cache_pi.assert_not_called()
+
+
+class TestPiServiceMetrics:
+    """Test cases for the metrics of the calculation steps."""
+
+    def test_observe_step(self):
+        """Test that a step records its phases, the pool utilization and the growth rate."""
+        calculator = MagicMock()
+        calculator.pop_stats.return_value = {"split": 0.5, "division": 0.25, "pool_utilization": 0.75}
+        service = PiService(calculator, MagicMock(), MagicMock())
+        split_count = REGISTRY.get_sample_value("pi_calculation_phase_seconds_count", {"phase": "split"}) or 0
+
+        with patch("app.services.pi_service.time.monotonic", side_effect=[100.0, 110.0]):
+            service._observe_step(1000, 1.0)
+            service._observe_step(1500, 1.0)
+
+        assert REGISTRY.get_sample_value("pi_calculation_phase_seconds_count", {"phase": "split"}) == split_count + 2
+        assert REGISTRY.get_sample_value("pi_worker_pool_utilization") == 0.75
+        assert REGISTRY.get_sample_value("pi_decimal_places_growth_rate") == 50.0
+
+
+class TestPiServiceScheduling:
+    """Test cases for calculating in scheduled steps and revealing them as prefixes."""
+
+    def setup_method(self):
+        """Setup method run before each test."""
+        self.repository = MagicMock()
+        self.repository.get_decimal_places.return_value = None
+        self.repository.get_requested_decimal_places.return_value = None
+        self.repository.append_pi.return_value = True
+
+    def appended(self):
+        return [call.args for call in self.repository.append_pi.call_args_list]
+
+    def test_reveals_prefixes(self):
+        """Test that a step is published as longer and longer prefixes, each appended after the last."""
+        scheduler = PrecisionScheduler("time-budget", 100, time_budget=0.004)
+        service = PiService(MagicMock(), self.repository, MagicMock(), scheduler=scheduler)
+        service._is_calculating = True
+
+        with patch("app.services.pi_service.settings.PI_PUBLISH_INTERVAL", 0.001):
+            assert service._reveal(REFERENCE_PI[:52], 10, 50, None) == 50
+
+        assert self.appended() == [(REFERENCE_PI[12:22], 10, 20), (REFERENCE_PI[22:32], 20, 30),
+                                   (REFERENCE_PI[32:42], 30, 40), (REFERENCE_PI[42:52], 40, 50)]
+        assert service._current == (REFERENCE_PI[:52], 50)
+
+    def test_reveals_rest_when_next_step_is_done(self):
+        """Test that readers get the rest of a step at once when the next step is already calculated."""
+        scheduler = PrecisionScheduler("time-budget", 100, time_budget=10.0)
+        service = PiService(MagicMock(), self.repository, MagicMock(), scheduler=scheduler)
+        service._is_calculating = True
+        step = MagicMock()
+        step.done.return_value = True
+
+        assert service._reveal(REFERENCE_PI[:52], 10, 50, step) == 50
+        assert self.appended() == [(REFERENCE_PI[12:52], 10, 50)]
+
+    def test_calculates_in_scheduled_steps(self):
+        """Test that the loop only calculates the scheduled precisions and publishes all of them in order."""
+        calculator = MagicMock()
+        calculator.calculate_pi.side_effect = lambda decimal_places: REFERENCE_PI[:decimal_places + 2]
+        calculator.pop_stats.return_value = {}
+        calculator.estimate_peak_bytes.return_value = 0
+        scheduler = PrecisionScheduler("geometric", 300, growth=3.0)
+        service = PiService(calculator, self.repository, MagicMock(), scheduler=scheduler)
+        service._max_decimal_places = 300
+        service._is_calculating = True
+
+        with patch("app.services.pi_service.settings.PI_PUBLISH_INTERVAL", 0):
+            service._calculate_with_increasing_precision()
+
+        assert [call.args[0] for call in calculator.calculate_pi.call_args_list] == [1, 3, 9, 27, 81, 243, 300]
+        assert [args[1:] for args in self.appended()] == [(1, 3), (3, 9), (9, 27), (27, 81), (81, 243), (243, 300)]
+        assert "".join(args[0] for args in self.appended()) == REFERENCE_PI[3:302]
+
+
+    def test_calculates_requested_step_next(self):
+        """Test that decimal places requested on demand are the next step and are published at once."""
+        def calculate_pi(decimal_places):
+            time.sleep(0.02)
+            return REFERENCE_PI[:decimal_places + 2]
+
+        calculator = MagicMock()
+        calculator.calculate_pi.side_effect = calculate_pi
+        calculator.pop_stats.return_value = {}
+        calculator.estimate_peak_bytes.return_value = 0
+        self.repository.get_requested_decimal_places.return_value = 200
+        scheduler = PrecisionScheduler("geometric", 300, growth=3.0)
+        service = PiService(calculator, self.repository, MagicMock(), scheduler=scheduler)
+        service._max_decimal_places = 300
+        service._is_calculating = True
+
+        with patch("app.services.pi_service.settings.PI_PUBLISH_INTERVAL", 0.001):
+            service._calculate_with_increasing_precision()
+
+        assert [call.args[0] for call in calculator.calculate_pi.call_args_list] == [1, 200, 300]
+        assert self.appended()[0] == (REFERENCE_PI[3:202], 1, 200)
+        assert len(self.appended()) > 2  # the last step is spread out as usual
+        assert "".join(args[0] for args in self.appended()) == REFERENCE_PI[3:302]
+
+
+class TestPiServiceOnDemand:
+    """Test cases for calculating a requested precision on demand."""
+
+    def setup_method(self):
+        """Setup method run before each test."""
+        self.async_repository = MagicMock()
+        self.async_repository.get_cached_pi = AsyncMock(return_value=(REFERENCE_PI[:22], 20))
+        self.async_repository.get_decimal_places = AsyncMock(return_value=20)
+        self.calculator = MagicMock()
+        self.calculator.calculate_pi.side_effect = self.slow_calculate_pi
+        self.calculator.estimate_peak_bytes.return_value = 0
+        self.service = PiService(self.calculator, MagicMock(), self.async_repository)
+
+    @staticmethod
+    def slow_calculate_pi(decimal_places):
+        time.sleep(0.05)
+        return REFERENCE_PI[:decimal_places + 2]
+
+    def calculated(self):
+        return [call.args[0] for call in self.calculator.calculate_pi.call_args_list]
+
+    def test_published_prefix(self):
+        """Test that decimal places already published are served without calculating."""
+        assert asyncio.run(self.service.get_pi_on_demand(10, 1.0)) == REFERENCE_PI[:12]
+        assert self.calculated() == []
+
+    def test_concurrent_requests_share_calculations(self):
+        """Test that requests wait on the running calculation if it covers them, or share the next one."""
+        async def request_many():
+            first = asyncio.create_task(self.service.get_pi_on_demand(50, 5.0))
+            await asyncio.sleep(0.01)  # the calculation to 50 is running
+            others = await asyncio.gather(*(self.service.get_pi_on_demand(dp, 5.0) for dp in (40, 60, 70, 55)))
+            return [await first] + others
+
+        results = asyncio.run(request_many())
+
+        assert results == [REFERENCE_PI[:dp + 2] for dp in (50, 40, 60, 70, 55)]
+        assert self.calculated() == [50, 70]
+        assert asyncio.run(self.service.get_pi_on_demand(65, 5.0)) == REFERENCE_PI[:67]
+        assert self.calculated() == [50, 70]
+
+    def test_timeout(self):
+        """Test that a request stops waiting after the timeout, while the calculation goes on."""
+        async def request():
+            pi_value = await self.service.get_pi_on_demand(50, 0.01)
+            progress = self.service.get_on_demand_progress(50)
+            await asyncio.sleep(0.1)
+            return pi_value, progress, self.service.get_on_demand_progress(50)
+
+        pi_value, progress, finished = asyncio.run(request())
+
+        assert pi_value is None
+        assert progress.status == "calculating"
+        assert progress.available_dp == 20
+        assert finished.available_dp == 50
+
+    def test_worker_mode_requests_from_worker(self):
+        """Test that with a separate worker the request is handed to it instead of calculated in this process."""
+        async def publish(decimal_places):
+            # what the worker does with its next step, announced on the updates channel
+            self.async_repository.get_cached_pi.return_value = (REFERENCE_PI[:decimal_places + 2], decimal_places)
+            self.service._latest_dp = decimal_places
+
+        self.async_repository.request_decimal_places = AsyncMock(side_effect=publish)
+
+        with patch("app.services.pi_service.settings.PI_CALCULATION_MODE", "worker"):
+            assert asyncio.run(self.service.get_pi_on_demand(50, 5.0)) == REFERENCE_PI[:52]
+
+        self.async_repository.request_decimal_places.assert_awaited_once_with(50)
+        assert self.calculated() == []
+
+    def test_full_queue(self):
+        """Test that requests beyond the queue size don't wait, but their precision is still calculated."""
+        async def request():
+            pi_value = await self.service.get_pi_on_demand(50, 5.0)
+            await asyncio.sleep(0.1)
+            return pi_value
+
+        with patch("app.services.pi_service.settings.PI_ON_DEMAND_QUEUE_SIZE", 0):
+            assert asyncio.run(request()) is None
+        assert self.calculated() == [50]
@@ -0,0 +1,64 @@
+import random
+
+from app.libs.bbp import pi_hex_digits
+from app.libs.pi_calculator import PiCalculator
+from app.repositories.reference_repository import ReferenceRepository
+from app.services.pi_verifier import PiVerifier
+
+REFERENCE_FILE = "resources/compressed_1m_university_minnesota.txt"
+
+
+class TestPiVerifier:
+    """Test cases for the cheap Pi verification checks."""
+
+    def setup_method(self):
+        """Setup method run before each test."""
+        self.calculator = PiCalculator(workers=1)
+        self.pi = self.calculator.calculate_pi(2000)
+        self.verifier = PiVerifier(ReferenceRepository(REFERENCE_FILE), rng=random.Random(3))
+
+    def test_bbp_hex_digits(self):
+        """Test the BBP extraction against the known start of pi in hexadecimal."""
+        assert pi_hex_digits(1, 16) == "243f6a8885a308d3"
+        assert pi_hex_digits(9, 8) == "85a308d3"
+
+    def test_correct_pi_passes(self):
+        """Test that every check passes for correctly calculated digits."""
+        reference = self.verifier.check_reference(self.pi, 1000)
+        assert reference.passed and (reference.first, reference.last) == (1000, 1183)
+
+        assert self.verifier.check_bbp(self.pi).passed
+        assert self.verifier.check_bbp(self.pi, position=10**6).passed  # clamped to the last possible window
+
+        terms, P, Q, T = self.calculator.series_state()
+        assert self.verifier.check_checksum(2000, terms, P, Q, T).passed
+
+    def test_reference_reports_mismatches(self):
+        """Test that differing decimal places are reported."""
+        wrong = self.pi[:501] + "x" + self.pi[502:600] + "y" + self.pi[601:]
+
+        result = self.verifier.check_reference(wrong)
+
+        assert not result.passed
+        assert result.mismatches == (500, 599)
+
+    def test_reference_not_covering(self):
+        """Test that decimal places past the reference file aren't checked against it."""
+        assert self.verifier.check_reference(self.pi, 1500) is None
+        assert PiVerifier().check_reference(self.pi) is None
+
+    def test_bbp_catches_wrong_digit(self):
+        """Test that a wrong decimal place before the spot checked window is caught."""
+        digit = "1" if self.pi[701] != "1" else "2"
+        wrong = self.pi[:701] + digit + self.pi[702:]
+
+        result = self.verifier.check_bbp(wrong, position=1500)
+
+        assert not result.passed
+        assert result.mismatches
+
+    def test_checksum_catches_wrong_state(self):
+        """Test that a corrupted binary split state is caught."""
+        terms, P, Q, T = self.calculator.series_state()
+
+        assert not self.verifier.check_checksum(2000, terms, P, Q, T + 1).passed
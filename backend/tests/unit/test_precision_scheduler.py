@@ -0,0 +1,43 @@
+from app.services.precision_scheduler import MAX_BUDGET_SCALE, PrecisionScheduler
+
+
+class TestPrecisionScheduler:
+    """Test cases for the precision scheduler."""
+
+    def test_linear(self):
+        """Test that linear steps add the step size, up to the max."""
+        scheduler = PrecisionScheduler("linear", 100, step=30)
+        assert scheduler.next_decimal_places(1) == 31
+        assert scheduler.next_decimal_places(90) == 100
+
+    def test_geometric(self):
+        """Test that geometric steps multiply, but always add at least the step size."""
+        scheduler = PrecisionScheduler("geometric", 10**6, growth=2.0)
+        assert scheduler.next_decimal_places(1) == 2
+        assert scheduler.next_decimal_places(1000) == 2000
+
+    def test_time_budget(self):
+        """Test that time-budget steps scale with how far the last one was from the budget."""
+        scheduler = PrecisionScheduler("time-budget", 10**9, step=10, time_budget=1.0)
+        assert scheduler.next_decimal_places(100) == 110
+
+        scheduler.record(1000, 0.5)
+        assert scheduler.next_decimal_places(5000) == 7000
+
+        scheduler.record(1000, 4.0)
+        assert scheduler.next_decimal_places(5000) == 5250
+
+        scheduler.record(1000, 0.0)  # served from the calculator's headroom
+        assert scheduler.next_decimal_places(5000) == 5000 + 1000 * MAX_BUDGET_SCALE
+
+        scheduler.record(1000, 1000.0)
+        assert scheduler.next_decimal_places(5000) == 5250
+
+    def test_expected_duration(self):
+        """Test that the next step is expected to take the budget, or as long as the last one."""
+        assert PrecisionScheduler("time-budget", 100, time_budget=2.0).expected_duration == 2.0
+
+        scheduler = PrecisionScheduler("linear", 100)
+        assert scheduler.expected_duration == 0.0
+        scheduler.record(1, 0.25)
+        assert scheduler.expected_duration == 0.25
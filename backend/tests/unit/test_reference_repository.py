@@ -0,0 +1,33 @@
+from app.repositories.reference_repository import ReferenceRepository
+
+REFERENCE_FILE = "resources/compressed_1m_university_minnesota.txt"
+
+
+class TestReferenceRepository:
+    """Test cases for reading Pi from a reference file."""
+
+    def test_bundled_reference(self):
+        """Test reading the reference file shipped with the backend."""
+        reference = ReferenceRepository(REFERENCE_FILE)
+
+        assert reference.get_decimal_places() == 1183
+        assert reference.get_pi(5) == "3.14159"
+        assert reference.get_pi(1184) is None
+        assert reference.get_pi_digits(5, 5) == "92653"
+        assert reference.get_pi_digits(1181, 10) == "016"
+
+    def test_trailing_newline(self, tmp_path):
+        """Test that trailing whitespace isn't counted as decimal places."""
+        path = tmp_path / "pi.txt"
+        path.write_text("3.14159\n")
+
+        assert ReferenceRepository(str(path)).get_decimal_places() == 5
+
+    def test_invalid_files(self, tmp_path):
+        """Test that missing or malformed files aren't used."""
+        path = tmp_path / "pi.txt"
+        assert ReferenceRepository(str(path)).get_decimal_places() is None
+
+        for content in ["", "3.", "31415", "3.14x59"]:
+            path.write_text(content)
+            assert ReferenceRepository(str(path)).get_decimal_places() is None
@@ -0,0 +1,52 @@
+from app.repositories.shared_buffer_repository import SharedBufferRepository
+
+
+class TestSharedBufferRepository:
+    """Test cases for the memory-mapped Pi hand-off."""
+
+    def test_nothing_published(self, tmp_path):
+        """Test that a reader without a published value falls back to nothing."""
+        reader = SharedBufferRepository(str(tmp_path / "pi.buf"), 100)
+
+        assert reader.get_pi_view() == (None, None)
+        assert reader.get_decimal_places() is None
+
+    def test_publish_and_read(self, tmp_path):
+        """Test that a reader sees every version the writer publishes."""
+        path = str(tmp_path / "pi.buf")
+        writer = SharedBufferRepository(path, 100)
+        reader = SharedBufferRepository(path, 100)
+
+        assert writer.publish("3.14", 2)
+        view, decimal_places = reader.get_pi_view()
+        assert (bytes(view), decimal_places) == (b"3.14", 2)
+
+        assert writer.publish("3.14159", 5)
+        view, decimal_places = reader.get_pi_view()
+        assert (bytes(view), decimal_places) == (b"3.14159", 5)
+        assert reader.get_decimal_places() == 5
+
+    def test_never_goes_back(self, tmp_path):
+        """Test that a shorter value doesn't replace a longer one, e.g. from a restarted writer."""
+        path = str(tmp_path / "pi.buf")
+        SharedBufferRepository(path, 100).publish("3.14159", 5)
+
+        restarted = SharedBufferRepository(path, 100)
+        assert restarted.publish("3.14", 2)
+        assert restarted.publish("3.1415926", 7)
+
+        view, decimal_places = SharedBufferRepository(path, 100).get_pi_view()
+        assert (bytes(view), decimal_places) == (b"3.1415926", 7)
+
+    def test_reader_follows_grown_file(self, tmp_path):
+        """Test that a reader remaps the file after a writer grew it for more decimal places."""
+        path = str(tmp_path / "pi.buf")
+        SharedBufferRepository(path, 5).publish("3.14159", 5)
+        reader = SharedBufferRepository(path, 5)
+        reader.get_pi_view()
+
+        pi_value = "3.14159" + "2" * 195
+        SharedBufferRepository(path, 200).publish(pi_value, 200)
+
+        view, decimal_places = reader.get_pi_view()
+        assert (bytes(view), decimal_places) == (pi_value.encode(), 200)
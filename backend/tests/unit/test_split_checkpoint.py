@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+from app.libs.int_pi_calculator import IntPiCalculator
+from app.libs.pi_calculator import PiCalculator
+from app.libs.split_checkpoint import SplitCheckpoint, decode_split, encode_split, out_of_core_merge
+
+
+class TestSplitCheckpoint:
+    """Test cases for the binary split checkpoints and out-of-core merges."""
+
+    def test_encode_split(self):
+        """Test that binary split states round trip, with their signs."""
+        split = PiCalculator._binary_split(1, 2)
+        assert split[2] < 0
+        assert decode_split(encode_split(*split)) == split
+        assert decode_split(b"xx" + encode_split(0, -1, 255), 2) == (0, -1, 255)
+
+    def test_save_and_load(self, tmp_path):
+        """Test that the largest checkpoint is loaded and only smaller ones are replaced."""
+        checkpoint = SplitCheckpoint(str(tmp_path), interval=0)
+        assert checkpoint.load() is None
+        checkpoint.save(50, *PiCalculator._binary_split(0, 50))
+        checkpoint.save(80, *PiCalculator._binary_split(0, 80))
+
+        assert [path.name for path in tmp_path.iterdir()] == ["pqt_80.bin"]
+        assert checkpoint.load() == (80, *PiCalculator._binary_split(0, 80))
+
+        checkpoint.save(60, *PiCalculator._binary_split(0, 60))
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["pqt_60.bin", "pqt_80.bin"]
+        assert checkpoint.load() == (80, *PiCalculator._binary_split(0, 80))
+
+    def test_interval(self, tmp_path):
+        """Test that checkpoints aren't written more often than the interval."""
+        checkpoint = SplitCheckpoint(str(tmp_path), interval=60)
+
+        assert checkpoint.save(10, *PiCalculator._binary_split(0, 10))
+        assert not checkpoint.save(20, *PiCalculator._binary_split(0, 20))
+        assert checkpoint.save(20, *PiCalculator._binary_split(0, 20), force=True)
+
+    def test_corrupt_checkpoint_skipped(self, tmp_path):
+        """Test that a damaged checkpoint isn't resumed from."""
+        checkpoint = SplitCheckpoint(str(tmp_path), interval=0)
+        checkpoint.save(30, *PiCalculator._binary_split(0, 30))
+        path = tmp_path / "pqt_30.bin"
+        data = bytearray(path.read_bytes())
+        data[-1] ^= 1
+        path.write_bytes(bytes(data))
+
+        assert checkpoint.load() is None
+
+    def test_out_of_core_merge(self, tmp_path):
+        """Test that the out-of-core merge gives the same state and takes the operands from the caller."""
+        left, right = PiCalculator._binary_split(0, 200), PiCalculator._binary_split(200, 350)
+        operands = [*left, *right]
+
+        assert out_of_core_merge(operands, str(tmp_path)) == PiCalculator._merge(left, right)
+        assert operands == []
+        assert list(tmp_path.iterdir()) == []
+
+    def test_calculator_resumes(self, tmp_path):
+        """Test that a restarted calculator only splits the terms after its checkpoint."""
+        PiCalculator(workers=1, checkpoint=SplitCheckpoint(str(tmp_path), interval=0)).calculate_pi(1000)
+
+        calculator = IntPiCalculator(workers=1, checkpoint=SplitCheckpoint(str(tmp_path), interval=0))
+        with patch.object(calculator, "_parallel_binary_split", wraps=calculator._parallel_binary_split) as split:
+            pi = calculator.calculate_pi(2000)
+
+        assert pi == PiCalculator(workers=1).calculate_pi(2000)
+        terms = calculator._terms_needed(1000 + 10)
+        assert split.call_args.args[0] >= terms
+        assert "checkpoint" in calculator.pop_stats()
+
+    def test_calculator_resumes_past_request(self, tmp_path):
+        """Test that a restarted calculator asked for fewer digits resumes from the deeper checkpoint and keeps it."""
+        PiCalculator(workers=1, checkpoint=SplitCheckpoint(str(tmp_path), interval=0)).calculate_pi(3000)
+        saved = [path.name for path in tmp_path.iterdir()]
+
+        calculator = PiCalculator(workers=1, checkpoint=SplitCheckpoint(str(tmp_path), interval=0))
+        with patch.object(calculator, "_parallel_binary_split") as split:
+            pi = calculator.calculate_pi(1000)
+
+        assert pi == PiCalculator(workers=1).calculate_pi(1000)
+        split.assert_not_called()
+        assert [path.name for path in tmp_path.iterdir()] == saved
+
+    def test_calculator_merges_out_of_core(self, tmp_path):
+        """Test that a calculator past the size threshold merges out-of-core with the same result."""
+        calculator = PiCalculator(workers=1, checkpoint=SplitCheckpoint(str(tmp_path), out_of_core_bytes=1))
+
+        with patch("app.libs.split_checkpoint.out_of_core_merge", wraps=out_of_core_merge) as merge:
+            for decimal_places in (100, 1000, 3000):
+                assert calculator.calculate_pi(decimal_places) == PiCalculator(workers=1).calculate_pi(decimal_places)
+
+        assert merge.call_count == 2
@@ -0,0 +1,159 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+import redis
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # the job scripts are Lua
+
+from app.libs.pi_calculator import PiCalculator
+from app.libs.split_checkpoint import decode_split, encode_split
+from app.repositories import split_job_repository
+from app.repositories.split_job_repository import SplitJob, SplitJobRepository
+from app.services.split_coordinator import SplitCoordinator, run_job, work
+
+
+def _work_on(port, stopped):
+    """A split worker process on the fake Redis server of the test."""
+    work(SplitJobRepository(f"redis://127.0.0.1:{port}/0"), stopped)
+
+
+class TestSplitCoordinator:
+    """Test cases for the distributed binary split."""
+
+    def setup_method(self):
+        """Setup method run before each test."""
+        self.server = fakeredis.FakeServer()
+        self.repository = self.new_repository()
+
+    def new_repository(self, job_timeout=30.0):
+        """A repository on the fake Redis of the test, like another process or node would have."""
+        repository = SplitJobRepository("redis://localhost:6379/0", job_timeout=job_timeout)
+        repository._redis = fakeredis.FakeRedis(server=self.server)
+        repository._claim_script = repository._redis.register_script(split_job_repository.CLAIM_JOB_SCRIPT)
+        repository._requeue_script = repository._redis.register_script(split_job_repository.REQUEUE_JOB_SCRIPT)
+        return repository
+
+    def test_encode_split(self):
+        """Test that binary split results round trip, with their signs."""
+        split = PiCalculator._binary_split(1, 2)
+        assert split[2] < 0
+        assert decode_split(encode_split(*split)) == split
+        assert decode_split(encode_split(*PiCalculator._binary_split(0, 101))) == PiCalculator._binary_split(0, 101)
+        assert decode_split(encode_split(0, -1, 255)) == (0, -1, 255)
+
+    def test_matches_local_split(self):
+        """Test that the distributed split gives the same state as the local one, leaves of any size."""
+        coordinator = SplitCoordinator(self.repository, leaf_terms=7, min_terms=0)
+
+        assert coordinator.binary_split(0, 100) == PiCalculator._binary_split(0, 100)
+        assert coordinator.binary_split(100, 103) == PiCalculator._binary_split(100, 103)
+        assert self.repository._redis.keys("*") == []
+
+    def test_small_split_left_local(self):
+        """Test that a split below the min terms isn't distributed."""
+        coordinator = SplitCoordinator(self.repository, leaf_terms=7, min_terms=100)
+
+        assert coordinator.binary_split(0, 99) is None
+
+    def test_calculator_uses_split(self):
+        """Test that the calculator hands its large splits to the coordinator."""
+        coordinator = SplitCoordinator(self.repository, leaf_terms=5, min_terms=20)
+        calculator = PiCalculator(workers=1, split=coordinator.binary_split)
+
+        assert calculator.calculate_pi(1000) == PiCalculator(workers=1).calculate_pi(1000)
+
+    def test_workers_share_jobs(self):
+        """Test that worker threads compute the jobs of a split."""
+        stopped = threading.Event()
+        workers = [threading.Thread(target=work, args=(self.new_repository(), stopped)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        try:
+            coordinator = SplitCoordinator(self.repository, leaf_terms=3, min_terms=0)
+            assert coordinator.binary_split(0, 300) == PiCalculator._binary_split(0, 300)
+        finally:
+            stopped.set()
+            for worker in workers:
+                worker.join()
+
+    def test_dead_worker_job_retried(self):
+        """Test that the job of a worker that stopped renewing its lease is computed again."""
+        coordinator = SplitCoordinator(self.new_repository(job_timeout=0.2), leaf_terms=10, min_terms=0)
+        dead = self.new_repository(job_timeout=0.2)
+        original_start_run = coordinator._repository.start_run
+
+        def start_run(ranges):
+            run = original_start_run(ranges)
+            assert dead.claim_job("dead-worker") is not None  # claimed, then never completed or renewed
+            return run
+
+        coordinator._repository.start_run = start_run
+
+        assert coordinator.binary_split(0, 40) == PiCalculator._binary_split(0, 40)
+
+    def test_redis_error_retried(self):
+        """Test that a failed read of the results loses none of them."""
+        coordinator = SplitCoordinator(self.repository, leaf_terms=10, min_terms=0)
+        read_results = self.repository.read_results
+        failures = iter([True, False, True])
+
+        def flaky_read_results(run, skip):
+            results = read_results(run, skip)
+            if results and next(failures, False):
+                raise redis.ConnectionError("Connection closed by server.")
+            return results
+
+        self.repository.read_results = flaky_read_results
+
+        assert coordinator.binary_split(0, 40) == PiCalculator._binary_split(0, 40)
+
+    def test_failed_delete_loses_no_result(self):
+        """Test that results whose deletion fails, e.g. with its reply lost, are still merged."""
+        coordinator = SplitCoordinator(self.repository, leaf_terms=10, min_terms=0)
+        delete_results = self.repository.delete_results
+
+        def lost_reply_delete_results(run, indexes):
+            delete_results(run, indexes)
+            raise redis.ConnectionError("Connection closed by server.")
+
+        self.repository.delete_results = lost_reply_delete_results
+
+        assert coordinator.binary_split(0, 40) == PiCalculator._binary_split(0, 40)
+        assert self.repository._redis.keys("*") == []
+
+    def test_job_of_finished_run_dropped(self):
+        """Test that a retried copy of a job is dropped once its split is done."""
+        run = self.repository.start_run([(0, 5)])
+        job = self.repository.claim_job("worker")
+        self.repository.finish_run(run)
+
+        run_job(self.repository, job, "worker")
+
+        assert self.repository._redis.keys("*") == []
+        assert job == SplitJob(run, 0, 0, 5)
+
+    def test_worker_processes(self):
+        """Test a split over worker processes talking to Redis over TCP, as on other nodes."""
+        server = fakeredis.TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+        port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        context = multiprocessing.get_context("spawn")
+        stopped = context.Event()
+        processes = [context.Process(target=_work_on, args=(port, stopped)) for _ in range(2)]
+        for process in processes:
+            process.start()
+        try:
+            coordinator = SplitCoordinator(SplitJobRepository(f"redis://127.0.0.1:{port}/0"), leaf_terms=50, min_terms=0)
+            started = time.monotonic()
+            assert coordinator.binary_split(0, 2000) == PiCalculator._binary_split(0, 2000)
+            assert time.monotonic() - started < 60
+        finally:
+            stopped.set()
+            for process in processes:
+                process.join(10)
+            server.shutdown()
+            server.server_close()
@@ -1,5 +1,8 @@
 import { NextResponse } from 'next/server';
 
+// Last response from the backend, revalidated with its ETag so unchanged polls come back as 304s
+let cached: { etag: string; data: unknown } | null = null;
+
 export async function GET() {
     try {
         const baseUrl = process.env.API_BASE_URL;
@@ -12,14 +15,24 @@ export async function GET() {
             );
         }
 
+        const headers: Record<string, string> = {
+            'x-api-key': apiKey,
+            'Content-Type': 'application/json',
+        };
+        if (cached) {
+            headers['If-None-Match'] = cached.etag;
+        }
+
         const response = await fetch(`${baseUrl}/api/pi`, {
             method: 'GET',
-            headers: {
-                'x-api-key': apiKey,
-                'Content-Type': 'application/json',
-            },
+            headers,
+            cache: 'no-store',
         });
 
+        if (response.status === 304 && cached) {
+            return NextResponse.json(cached.data, { status: 200 });
+        }
+
         if (!response.ok) {
             return NextResponse.json(
                 { error: `API responded with status: ${response.status}` },
@@ -28,6 +41,10 @@ export async function GET() {
         }
 
         const data = await response.json();
+
+        const etag = response.headers.get('etag');
+        cached = etag ? { etag, data } : null;
+
         return NextResponse.json(data, { status: 200 });
     } catch (error) {
         console.error('Error fetching pi value:', error);